@@ -1,15 +1,52 @@
-from flask import Flask, render_template_string, request, jsonify
-import threading, webbrowser
+from flask import Flask, Response, g, render_template_string, request, jsonify
+import base64, binascii, itertools, json, math, os, re, threading, time, webbrowser
+from collections import OrderedDict
+
+from batch import run_batch
+from cache import ResultCache
+from engine import compile_machine, DEFAULT_MAX_CELLS, DEFAULT_MAX_SECONDS, DEFAULT_MAX_STEPS
+from equivalence import check_equivalence, exhaustive_corpus, random_corpus
+from history import DEFAULT_EVERY, HistoryStore, RunHistory
+from jobs import JobQueue, QueueFull
+import language
+import metrics
+from nondeterministic import DEFAULT_MAX_CONFIGS, DEFAULT_MAX_FRONTIER
+from precompressed import PrecompressedBody
+import references
+from snapshot import load_snapshot, snapshot_hash
+from store import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, DuplicateKey, MachineStore
+from validate import analyze_definition
+from verify import verify_machine
 
 app = Flask(__name__)
 
-# Biblioteca de máquinas de Turing predefinidas
+# Caché de veredictos compartido por las rutas de ejecución
+result_cache = ResultCache.from_env()
+run_history = HistoryStore()
+
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+
+@app.after_request
+def record_latency(response):
+    # Etiqueta con la plantilla de la ruta ('/machines/<key>'), no la URL, para acotar las series
+    rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.observe('tm_http_request_duration_seconds',
+                    (('route', rule), ('method', request.method), ('status', str(response.status_code))),
+                    time.perf_counter() - g.started)
+    return response
+
+# Biblioteca de máquinas de Turing predefinidas; se cargan en el almacén al primer uso
 MACHINE_LIBRARY = {
     "anbn": {
         "name": "L = {aⁿbⁿ | n ≥ 0}",
         "description": "Reconoce cadenas con el mismo número de 'a' seguidas del mismo número de 'b'",
         "examples": ["aabb", "aaabbb", "ab", ""],
         "alphabet": ["a", "b"],
+        "reference": references.anbn,
         "machine": {
             "states": ["q0", "q1", "q2", "q_check", "q_accept", "q_reject"],
             "start": "q0",
@@ -33,6 +70,7 @@ MACHINE_LIBRARY = {
         "description": "Reconoce cadenas que se leen igual de izquierda a derecha y de derecha a izquierda",
         "examples": ["aba", "abba", "aa", "a", ""],
         "alphabet": ["a", "b"],
+        "reference": references.palindrome,
         "machine": {
             "states": ["q0", "q1", "q2", "q3", "q4", "q_accept", "q_reject"],
             "start": "q0",
@@ -53,6 +91,7 @@ MACHINE_LIBRARY = {
         "description": "Reconoce cadenas con el mismo número de '0' seguidas del mismo número de '1'",
         "examples": ["0011", "000111", "01", ""],
         "alphabet": ["0", "1"],
+        "reference": references.zerononen,
         "machine": {
             "states": ["q0", "q1", "q2", "q_check", "q_accept", "q_reject"],
             "start": "q0",
@@ -76,6 +115,7 @@ MACHINE_LIBRARY = {
         "description": "Acepta cadenas con un número par de unos (0 es par)",
         "examples": ["11", "0110", "1111", "00", ""],
         "alphabet": ["0", "1"],
+        "reference": references.even_ones,
         "machine": {
             "states": ["q_even", "q_odd", "q_accept", "q_reject"],
             "start": "q_even",
@@ -93,6 +133,7 @@ MACHINE_LIBRARY = {
         "description": "Acepta cadenas con un número impar de unos",
         "examples": ["1", "011", "111", "01010"],
         "alphabet": ["0", "1"],
+        "reference": references.odd_ones,
         "machine": {
             "states": ["q_even", "q_odd", "q_accept", "q_reject"],
             "start": "q_even",
@@ -110,6 +151,7 @@ MACHINE_LIBRARY = {
         "description": "Reconoce cadenas que consisten en una palabra seguida de sí misma",
         "examples": ["0101", "1111", "00", ""],
         "alphabet": ["0", "1"],
+        "reference": references.ww,
         "machine": {
             "states": ["q0", "q1", "q2", "q3", "q4", "q5", "q_accept", "q_reject"],
             "start": "q0",
@@ -134,6 +176,7 @@ MACHINE_LIBRARY = {
         "description": "Reconoce cadenas con el mismo número de a's, b's y c's en ese orden",
         "examples": ["abc", "aabbcc", "aaabbbccc"],
         "alphabet": ["a", "b", "c"],
+        "reference": references.anbncn,
         "machine": {
             "states": ["q0", "q1", "q2", "q3", "q4", "q_accept", "q_reject"],
             "start": "q0",
@@ -151,6 +194,82 @@ MACHINE_LIBRARY = {
                 "q4": {"Y": ["Y", "R", "q4"], "Z": ["Z", "R", "q4"], "_": ["_", "N", "q_accept"], "a": ["X", "R", "q1"]}
             }
         }
+    },
+    "ww_2tape": {
+        "name": "L = {ww | w ∈ {0,1}*} (2 cintas)",
+        "description": "Copia la entrada en la segunda cinta, ubica la mitad retrocediendo dos celdas por cada una y compara las mitades en una pasada: pasos lineales",
+        "examples": ["0101", "1111", "0110", ""],
+        "alphabet": ["0", "1"],
+        "reference": references.ww,
+        "machine": {
+            "tapes": 2,
+            "states": ["q_copy", "q_back", "q_back2", "q_cmp", "q_accept", "q_reject"],
+            "start": "q_copy",
+            "accept": ["q_accept"],
+            "reject": ["q_reject"],
+            "blank": "_",
+            "transitions": {
+                "q_copy": {"0_": ["00", "RR", "q_copy"], "1_": ["11", "RR", "q_copy"], "__": ["__", "LL", "q_back"]},
+                "q_back": {"00": ["00", "LN", "q_back2"], "01": ["01", "LN", "q_back2"],
+                           "10": ["10", "LN", "q_back2"], "11": ["11", "LN", "q_back2"], "_0": ["_0", "RR", "q_cmp"],
+                           "_1": ["_1", "RR", "q_cmp"], "__": ["__", "RR", "q_cmp"]},
+                "q_back2": {"00": ["00", "LL", "q_back"], "01": ["01", "LL", "q_back"], "10": ["10", "LL", "q_back"],
+                            "11": ["11", "LL", "q_back"], "_0": ["_0", "NN", "q_reject"],
+                            "_1": ["_1", "NN", "q_reject"]},
+                "q_cmp": {"00": ["00", "RR", "q_cmp"], "11": ["11", "RR", "q_cmp"], "01": ["01", "NN", "q_reject"],
+                          "10": ["10", "NN", "q_reject"], "0_": ["0_", "NN", "q_accept"],
+                          "1_": ["1_", "NN", "q_accept"], "__": ["__", "NN", "q_accept"]}
+            }
+        }
+    },
+    "palindrome_2tape": {
+        "name": "Palíndromo sobre {a,b} (2 cintas)",
+        "description": "Copia la entrada en la segunda cinta y compara ambas recorriéndolas en sentidos opuestos: pasos lineales",
+        "examples": ["aba", "abba", "a", "ab", ""],
+        "alphabet": ["a", "b"],
+        "reference": references.palindrome,
+        "machine": {
+            "tapes": 2,
+            "states": ["q_copy", "q_rewind", "q_cmp", "q_accept", "q_reject"],
+            "start": "q_copy",
+            "accept": ["q_accept"],
+            "reject": ["q_reject"],
+            "blank": "_",
+            "transitions": {
+                "q_copy": {"a_": ["aa", "RR", "q_copy"], "b_": ["bb", "RR", "q_copy"], "__": ["__", "LL", "q_rewind"]},
+                "q_rewind": {"aa": ["aa", "LN", "q_rewind"], "ab": ["ab", "LN", "q_rewind"],
+                             "ba": ["ba", "LN", "q_rewind"], "bb": ["bb", "LN", "q_rewind"],
+                             "_a": ["_a", "RN", "q_cmp"], "_b": ["_b", "RN", "q_cmp"], "__": ["__", "RN", "q_cmp"]},
+                "q_cmp": {"aa": ["aa", "RL", "q_cmp"], "bb": ["bb", "RL", "q_cmp"], "ab": ["ab", "NN", "q_reject"],
+                          "ba": ["ba", "NN", "q_reject"], "__": ["__", "NN", "q_accept"]}
+            }
+        }
+    },
+    "anbncn_2tape": {
+        "name": "L = {aⁿbⁿcⁿ | n ≥ 1} (2 cintas)",
+        "description": "Copia las a's en la segunda cinta y las descuenta contra las b's y luego contra las c's: pasos lineales",
+        "examples": ["abc", "aabbcc", "aabbc"],
+        "alphabet": ["a", "b", "c"],
+        "reference": references.anbncn,
+        "machine": {
+            "tapes": 2,
+            "states": ["q0", "q_a", "q_b", "q_c", "q_accept", "q_reject"],
+            "start": "q0",
+            "accept": ["q_accept"],
+            "reject": ["q_reject"],
+            "blank": "_",
+            "transitions": {
+                "q0": {"a_": ["aa", "RR", "q_a"], "b_": ["b_", "NN", "q_reject"], "c_": ["c_", "NN", "q_reject"],
+                       "__": ["__", "NN", "q_reject"]},
+                "q_a": {"a_": ["aa", "RR", "q_a"], "b_": ["b_", "NL", "q_b"], "c_": ["c_", "NN", "q_reject"],
+                        "__": ["__", "NN", "q_reject"]},
+                "q_b": {"ba": ["ba", "RL", "q_b"], "c_": ["c_", "NR", "q_c"], "b_": ["b_", "NN", "q_reject"],
+                        "ca": ["ca", "NN", "q_reject"], "aa": ["aa", "NN", "q_reject"],
+                        "_a": ["_a", "NN", "q_reject"], "__": ["__", "NN", "q_reject"]},
+                "q_c": {"ca": ["ca", "RR", "q_c"], "__": ["__", "NN", "q_accept"], "c_": ["c_", "NN", "q_reject"],
+                        "_a": ["_a", "NN", "q_reject"], "aa": ["aa", "NN", "q_reject"], "ba": ["ba", "NN", "q_reject"]}
+            }
+        }
     }
 }
 
@@ -396,14 +515,17 @@ label{font-weight:600}
 <div id="tape" class="tape" style="min-height:72px;display:flex;align-items:center;justify-content:center;color:#94a3b8">
   Carga una cadena para comenzar
 </div>
+<div id="extraTapes"></div>
 
 <div class="controls">
+  <button id="backBtn" class="secondary">⏮ Paso atrás</button>
   <button id="stepBtn">⏯ Un Paso</button>
   <button id="playBtn">▶ Ejecutar</button>
   <button id="resetBtn" class="secondary">🔄 Reiniciar</button>
+  <button id="profileBtn" class="secondary">🔥 Perfilar en servidor</button>
   <div style="display:flex;align-items:center;gap:8px;margin-left:auto">
     <label style="font-size:13px">Velocidad:</label>
-    <input id="speed" type="range" min="100" max="2000" value="600" style="width:120px" />
+    <input id="speed" type="range" min="1" max="2000" value="600" style="width:120px" />
     <span id="speedLabel" style="font-size:13px;color:#64748b">600ms</span>
   </div>
 </div>
@@ -440,6 +562,12 @@ label{font-weight:600}
   </div>
 </div>
 
+<div id="profilePanel" style="display:none;margin-top:16px">
+  <h4 style="margin-bottom:8px">🔥 Mapa de calor de transiciones:</h4>
+  <p id="profileSummary" class="small" style="margin:0 0 8px 0"></p>
+  <div style="overflow-x:auto"><table id="profileTable" style="border-collapse:collapse;font-family:monospace;font-size:13px"></table></div>
+</div>
+
 <div id="finalExplanation" style="display:none;margin-top:16px;padding:14px;border-radius:8px;border-left:4px solid #3b82f6">
   <h4 style="margin-top:0;color:#1e40af">🔍 Explicación del Resultado</h4>
   <p id="explanationText" style="margin:0;font-size:14px"></p>
@@ -462,45 +590,82 @@ let stepsEl=document.getElementById('steps');
 let executionLog=document.getElementById('executionLog');
 let finalExplanation=document.getElementById('finalExplanation');
 let explanationText=document.getElementById('explanationText');
-let tm=null,runner=null;
+let tm=null;
 let currentMachine=null;
 let stepCount=0;
 let executionHistory=[];
+// Historial del servidor para retroceder: {id, steps} de la corrida cargada
+let serverRun=null;
 
 const speedInput = document.getElementById('speed');
 const speedLabel = document.getElementById('speedLabel');
 speedInput.oninput = () => speedLabel.innerText = speedInput.value + 'ms';
 
-// Cargar máquinas disponibles
-fetch('/machines').then(r=>r.json()).then(machines=>{
-  const gallery = document.getElementById('machineGallery');
-  gallery.innerHTML = ''; // Limpiar primero
-  for(let key in machines){
-    const m = machines[key];
-    const card = document.createElement('div');
-    card.className = 'machine-card';
-    card.innerHTML = `
-      <h3>${m.name}</h3>
-      <p>${m.description}</p>
-      <p class="small"><strong>Alfabeto:</strong> {${m.alphabet.join(', ')}}</p>
-      <div class="examples">
-        ${m.examples.map(ex => `<span class="example-badge">${ex === '' ? 'ε (vacía)' : ex}</span>`).join('')}
-      </div>
-    `;
-    card.onclick = () => selectMachine(key, m, card);
-    gallery.appendChild(card);
-  }
-}).catch(err => {
+// Cargar el catálogo por páginas: solo fichas; la definición se pide al elegir una máquina
+const gallery = document.getElementById('machineGallery');
+const moreBtn = document.createElement('button');
+moreBtn.className = 'secondary';
+moreBtn.innerText = 'Cargar más máquinas';
+moreBtn.style.gridColumn = '1/-1';
+let catalogNext = null;
+
+// Los textos del catálogo los escriben los usuarios: nunca se insertan como HTML
+function escapeHtml(value){
+  return String(value).replace(/[&<>"']/g, ch => ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'})[ch]);
+}
+function element(tag, text, className){
+  const el = document.createElement(tag);
+  if(text !== undefined) el.textContent = text;
+  if(className) el.className = className;
+  return el;
+}
+
+function loadMachines(after){
+  const url = '/machines?limit=20' + (after ? '&after=' + encodeURIComponent(after) : '');
+  return fetch(url).then(r=>r.json()).then(page=>{
+    if(!after) gallery.innerHTML = ''; // Limpiar primero
+    moreBtn.remove();
+    for(const m of page.machines){
+      const card = document.createElement('div');
+      card.className = 'machine-card';
+      card.appendChild(element('h3', m.name));
+      card.appendChild(element('p', m.description));
+      const info = element('p', undefined, 'small');
+      info.append(element('strong', 'Alfabeto:'), ` {${m.alphabet.join(', ')}}`);
+      if(m.author) info.append(' · ', element('strong', 'Autor:'), ' ' + m.author);
+      card.appendChild(info);
+      const examples = element('div', undefined, 'examples');
+      m.examples.forEach(ex => examples.appendChild(element('span', ex === '' ? 'ε (vacía)' : ex, 'example-badge')));
+      card.appendChild(examples);
+      card.onclick = () => selectMachine(m.key, card);
+      gallery.appendChild(card);
+    }
+    catalogNext = page.next;
+    if(catalogNext) gallery.appendChild(moreBtn);
+  });
+}
+moreBtn.onclick = () => loadMachines(catalogNext).catch(err => alert('Error al cargar más máquinas: ' + err));
+
+loadMachines(null).catch(err => {
   console.error('Error cargando máquinas:', err);
-  document.getElementById('machineGallery').innerHTML = '<p style="color:#dc2626">Error al cargar las máquinas. Recarga la página.</p>';
+  gallery.innerHTML = '<p style="color:#dc2626">Error al cargar las máquinas. Recarga la página.</p>';
 });
 
-function selectMachine(key, machine, cardEl){
+async function selectMachine(key, cardEl){
+  let machine;
+  try{
+    const resp = await fetch('/machines/' + encodeURIComponent(key));
+    machine = await resp.json();
+    if(!resp.ok) throw new Error(machine.error);
+  }catch(err){
+    alert('Error al cargar la máquina: ' + err.message);
+    return;
+  }
   // Remover selección previa
   document.querySelectorAll('.machine-card').forEach(c=>c.classList.remove('selected'));
   cardEl.classList.add('selected');
   
-  currentMachine = {key: key, ...machine};
+  currentMachine = machine;
   console.log('Máquina seleccionada:', currentMachine); 
   document.getElementById('currentMachineName').innerText = machine.name;
   document.getElementById('tmDef').value = JSON.stringify(machine.machine, null, 2);
@@ -525,6 +690,21 @@ function selectMachine(key, machine, cardEl){
 
 function parseTM(){try{return JSON.parse(document.getElementById('tmDef').value);}catch(e){alert('JSON inválido');return null}}
 function buildTape(input,blank){if(input==='') return [blank,blank]; return [blank,...input.split(''),blank,blank]}
+function arrows(moves){return [...moves].map(m=>m==='L'?'←':m==='R'?'→':'•').join('')}
+// Cintas 1..k-1 de las máquinas de varias cintas, debajo de la cinta de entrada
+function renderExtraTapes(){
+  const el=document.getElementById('extraTapes');
+  el.innerHTML='';
+  if(!tm)return;
+  tm.getExtraTapes().forEach(({tape,head},i)=>{
+    const row=document.createElement('div');
+    row.className='tape';
+    row.style.marginTop='6px';
+    row.title=`Cinta ${i+1}`;
+    tape.forEach((sym,j)=>row.appendChild(streamCell(sym,j===head)));
+    el.appendChild(row);
+  });
+}
 function renderTape(t,h){
   tapeEl.innerHTML='';
   for(let i=0;i<t.length;i++){
@@ -543,42 +723,66 @@ function renderTape(t,h){
   }
 }
 
-function createRunner(tmDef,input){
+// Igual que validate.alternatives: una regla es una terna o una lista de ternas ([] = sin regla)
+function alternatives(rule){
+  return Array.isArray(rule)&&rule.every(Array.isArray)?rule:[rule];
+}
+function createRunner(tmDef,input,initial){
   let blank=tmDef.blank||'_';
-  let tape=buildTape(input,blank);
-  let head=1;
-  let state=tmDef.start;
-  let halted=false;
+  let tape=initial?[...initial.tape]:buildTape(input,blank);
+  let head=initial?initial.head:1;
+  let state=initial?initial.state:tmDef.start;
+  // Máquinas de k cintas: las cintas 1..k-1 empiezan en blanco; se lee, escribe y mueve
+  // con palabras de k caracteres (la cinta 0 es la de entrada)
+  const k=tmDef.tapes||1;
+  let extra=[],extraHeads=[];
+  for(let i=1;i<k;i++){extra.push([blank,blank,blank]);extraHeads.push(1)}
+  let halted=initial?!!initial.halted:false;
   let lastDirection='N';
+  // Conjuntos de parada: consulta O(1) por paso en vez de indexOf sobre la lista
+  const acceptSet=new Set(tmDef.accept||[]);
+  const rejectSet=new Set(tmDef.reject||[]);
   
   return{
+    getDef(){return tmDef},
     getTape(){return tape},
+    getExtraTapes(){return extra.map((t,i)=>({tape:t,head:extraHeads[i]}))},
     getHead(){return head},
     getState(){return state},
     get lastDirection(){return lastDirection},
     step(){
       if(halted)return{halted:true};
-      let sym=tape[head]||blank;
-      let rules=(tmDef.transitions[state]&&tmDef.transitions[state][sym])||null;
+      let sym=(tape[head]||blank)+extra.map((t,i)=>t[extraHeads[i]]||blank).join('');
+      const row=tmDef.transitions[state];
+      // El servidor solo deja animar máquinas deterministas: a lo sumo hay una alternativa
+      let rules=row&&Object.prototype.hasOwnProperty.call(row,sym)?alternatives(row[sym])[0]:null;
       if(!rules){
         halted=true;
-        state='REJECT (no rule)';
+        state=`REJECT (sin regla δ(${state}, ${sym}))`;
         return{halted:true,result:'❌ REJECT'};
       }
-      tape[head]=rules[0];
-      let mv=rules[1];
+      tape[head]=rules[0][0];
+      let mv=rules[1][0];
       let next=rules[2];
-      lastDirection=mv;
+      lastDirection=rules[1];
       if(mv==='R')head++;
       else if(mv==='L')head--;
       state=next;
       if(head<0){tape.unshift(blank);head=0}
       if(head>=tape.length)tape.push(blank);
-      if(tmDef.accept.indexOf(state)!==-1){
+      extra.forEach((t,i)=>{
+        let h=extraHeads[i];
+        t[h]=rules[0][i+1];
+        h+=rules[1][i+1]==='R'?1:rules[1][i+1]==='L'?-1:0;
+        if(h<0){t.unshift(blank);h=0}
+        if(h>=t.length)t.push(blank);
+        extraHeads[i]=h;
+      });
+      if(acceptSet.has(state)){
         halted=true;
         return{halted:true,result:'✅ ACCEPT'};
       }
-      if(tmDef.reject.indexOf(state)!==-1){
+      if(rejectSet.has(state)){
         halted=true;
         return{halted:true,result:'❌ REJECT'};
       }
@@ -588,6 +792,7 @@ function createRunner(tmDef,input){
 }
 
 function updateStatus(){
+  renderExtraTapes();
   if(!tm)return;
   stateEl.innerText=tm.getState();
   positionEl.innerText=tm.getHead();
@@ -608,11 +813,11 @@ function addToLog(step, state, tape, head, action){
   
   logEntry.innerHTML = `
     <div style="color:#64748b;font-size:11px">Paso ${step}</div>
-    <div><strong style="color:#2563eb">Estado:</strong> ${state} | <strong style="color:#059669">Acción:</strong> ${action}</div>
-    <div style="color:#475569;margin-top:2px">Cinta: ${tapeStr}</div>
+    <div><strong style="color:#2563eb">Estado:</strong> ${escapeHtml(state)} | <strong style="color:#059669">Acción:</strong> ${escapeHtml(action)}</div>
+    <div style="color:#475569;margin-top:2px">Cinta: ${escapeHtml(tapeStr)}</div>
   `;
   
-  executionHistory.push({step, state, tape: [...tape], head, action});
+  executionHistory.push({step, state, head, action});
   executionLog.appendChild(logEntry);
   executionLog.scrollTop = executionLog.scrollHeight;
 }
@@ -630,7 +835,7 @@ function generateExplanation(result, inputStr){
     finalExplanation.style.borderLeftColor = '#22c55e';
     finalExplanation.style.background = '#f0fdf4';
 
-    let explanation = `✅ <strong>La cadena "${inputStr}" fue ACEPTADA</strong><br><br>`;
+    let explanation = `✅ <strong>La cadena "${escapeHtml(inputStr)}" fue ACEPTADA</strong><br><br>`;
 
     if(currentMachine && currentMachine.key === 'anbn'){
       explanation += `La máquina verificó exitosamente que hay el mismo número de 'a' que de 'b'. `;
@@ -667,7 +872,7 @@ function generateExplanation(result, inputStr){
     finalExplanation.style.borderLeftColor = '#ef4444';
     finalExplanation.style.background = '#fef2f2';
 
-    let explanation = `❌ <strong>La cadena "${inputStr}" fue RECHAZADA</strong><br><br>`;
+    let explanation = `❌ <strong>La cadena "${escapeHtml(inputStr)}" fue RECHAZADA</strong><br><br>`;
 
     if(currentMachine && currentMachine.key === 'anbn'){
       explanation += `La máquina detectó que no hay la misma cantidad de 'a' y 'b', `;
@@ -701,12 +906,25 @@ function generateExplanation(result, inputStr){
 }
 
 
-document.getElementById('startBtn').onclick = () => {
+document.getElementById('startBtn').onclick = async () => {
   let t = parseTM();
   if (!t) { alert('JSON inválido'); return; }
 
   let input = document.getElementById('inputStr').value.trim();
 
+  // El servidor valida la definición antes de simular: estados, símbolos, movimientos, parada
+  const check = await fetch('/validate', {method: 'POST', headers: {'Content-Type': 'application/json'},
+                                          body: JSON.stringify({machine: t, alphabet: currentMachine ? currentMachine.alphabet : null})})
+    .then(r => r.json());
+  if (!check.valid) {
+    finalExplanation.style.display = 'block';
+    finalExplanation.style.borderLeftColor = '#ef4444';
+    finalExplanation.style.background = '#fef2f2';
+    explanationText.innerHTML = `❌ <strong>La definición de la máquina no es válida.</strong><br><br>` +
+      check.errors.map(e => `• ${escapeHtml(e)}`).join('<br>');
+    return;
+  }
+
   // =============================================================
   // 🔍 NUEVO: VERIFICAR QUE LA CADENA USE SOLO EL ALFABETO VÁLIDO
   // =============================================================
@@ -723,8 +941,8 @@ document.getElementById('startBtn').onclick = () => {
 
       explanationText.innerHTML = `
         ❌ <strong>La cadena contiene símbolos NO válidos para esta máquina.</strong><br><br>
-        <strong>Alfabeto permitido:</strong> { ${alphabet.join(', ')} }<br>
-        <strong>Símbolos inválidos detectados:</strong> ${invalid.map(x => `'${x}'`).join(', ')}<br><br>
+        <strong>Alfabeto permitido:</strong> { ${escapeHtml(alphabet.join(', '))} }<br>
+        <strong>Símbolos inválidos detectados:</strong> ${escapeHtml(invalid.map(x => `'${x}'`).join(', '))}<br><br>
         La máquina no puede procesar la cadena porque contiene símbolos que no pertenecen 
         a su lenguaje de entrada.
       `;
@@ -735,7 +953,35 @@ document.getElementById('startBtn').onclick = () => {
   }
   // =============================================================
 
+  // Las máquinas no deterministas no se animan paso a paso: el servidor busca una rama que acepte
+  if (check.deterministic === false) {
+    tm = null;
+    serverRun = null;
+    executionLog.innerHTML = '';
+    const r = await fetch('/run', {method: 'POST', headers: {'Content-Type': 'application/json'},
+                                   body: JSON.stringify({machine: t, input: input})}).then(r => r.json());
+    if (r.error) { alert(r.error); return; }
+    const blank = t.blank || '_';
+    renderTape(r.tape === '' ? [blank] : r.tape.split(''), r.head);
+    stateEl.innerText = r.state;
+    positionEl.innerText = r.head + r.offset;
+    symbolEl.innerText = r.tape[r.head] || blank;
+    stepsEl.innerText = r.steps;
+    resultEl.innerText = r.result;
+    resultEl.style.color = r.result === 'ACCEPT' ? '#059669' : '#dc2626';
+    finalExplanation.style.display = 'block';
+    finalExplanation.style.borderLeftColor = r.result === 'ACCEPT' ? '#10b981' : '#ef4444';
+    finalExplanation.style.background = r.result === 'ACCEPT' ? '#f0fdf4' : '#fef2f2';
+    explanationText.innerHTML = `🔀 <strong>Máquina no determinista.</strong> El servidor exploró ` +
+      `${r.configurations} configuraciones en anchura (frontera máxima: ${r.max_frontier}).<br><br>` +
+      (r.result === 'ACCEPT' ? `✅ Una rama acepta en ${r.steps} pasos; la cinta mostrada es la de esa rama.`
+        : r.result === 'REJECT' ? '❌ Ninguna rama acepta: se agotaron las configuraciones alcanzables.'
+        : `⏱️ Se agotó el presupuesto (${r.budget}) sin encontrar una rama que acepte.`);
+    return;
+  }
+
   tm = createRunner(t, input);
+  serverRun = null;
   stepCount = 0;
   executionHistory = [];
   executionLog.innerHTML = '';
@@ -748,10 +994,10 @@ document.getElementById('startBtn').onclick = () => {
 
   // Log inicial
   addToLog(0, tm.getState(), tm.getTape(), tm.getHead(), 'Estado inicial - Cadena cargada');
+  for (const w of check.warnings) addToLog(0, tm.getState(), tm.getTape(), tm.getHead(), `⚠️ ${w}`);
 
-  if (runner) {
-    clearInterval(runner);
-    runner = null;
+  if (stream) {
+    cancelStream();
     document.getElementById('playBtn').innerText = '▶ Ejecutar';
   }
 };
@@ -759,6 +1005,7 @@ document.getElementById('startBtn').onclick = () => {
 
 document.getElementById('stepBtn').onclick=()=>{
   if(!tm){alert('⚠️ Primero carga una cadena');return;}
+  if(stream)stopStream();
   
   const prevState = tm.getState();
   const prevSymbol = tm.getTape()[tm.getHead()] || '_';
@@ -771,7 +1018,7 @@ document.getElementById('stepBtn').onclick=()=>{
   const writtenSymbol = tm.getTape()[prevHead] || '_';  // El símbolo escrito está en la posición ANTERIOR
   const direction = tm.lastDirection || 'N';
   
-  let action = `Lee '${prevSymbol}' → Escribe '${writtenSymbol}' → Mueve ${direction === 'L' ? '←' : direction === 'R' ? '→' : '•'} → Va a ${newState}`;
+  let action = `Lee '${prevSymbol}' → Escribe '${writtenSymbol}' → Mueve ${arrows(direction)} → Va a ${newState}`;
   
   renderTape(tm.getTape(),tm.getHead());
   updateStatus();
@@ -786,51 +1033,255 @@ document.getElementById('stepBtn').onclick=()=>{
   }
 };
 
-document.getElementById('playBtn').onclick=()=>{
-  if(!tm){alert('⚠️ Primero carga una cadena');return;}
-  if(runner){
-    clearInterval(runner);
-    runner=null;
-    document.getElementById('playBtn').innerText='▶ Ejecutar';
-    return;
-  }
+// Ejecución continua: el servidor corre la máquina y envía por SSE los cambios de cada
+// paso en lotes; el navegador los acumula y aplica una sola vez por cuadro de animación,
+// tocando solo las celdas que cambiaron.
+let stream=null;
+function cancelStream(){
+  if(!stream)return;
+  if(stream.source)stream.source.close();
+  if(stream.frame)cancelAnimationFrame(stream.frame);
+  stream=null;
+}
+function stopStream(){
+  if(!stream)return;
+  // Sincroniza el ejecutor local con lo que se ve, para poder seguir paso a paso
+  if(stream.source)
+    tm=createRunner(tm.getDef(),'',{tape:stream.tape,head:stream.head,state:stream.state,halted:!!stream.result});
+  cancelStream();
+  document.getElementById('playBtn').innerText='▶ Ejecutar';
+}
+
+// Las máquinas de varias cintas se ejecutan en el navegador (el flujo del servidor es de
+// una cinta), pero igual se dibuja una vez por cuadro con todos los pasos que tocaban
+function playLocal(){
+  const s=stream={frame:null,last:performance.now(),owed:0,logFrom:stepCount+1};
   document.getElementById('playBtn').innerText='⏸ Pausar';
-  runner=setInterval(()=>{
-    const prevState = tm.getState();
-    const prevSymbol = tm.getTape()[tm.getHead()] || '_';
-    const prevHead = tm.getHead();
-    
-    let r=tm.step();
-    stepCount++;
-    
-    const newState = tm.getState();
-    const writtenSymbol = tm.getTape()[prevHead] || '_';
-    const direction = tm.lastDirection || 'N';
-    
-    let action = `Lee '${prevSymbol}' → Escribe '${writtenSymbol}' → Mueve ${direction === 'L' ? '←' : direction === 'R' ? '→' : '•'} → Va a ${newState}`;
-    
+  const tick=now=>{
+    s.owed+=(now-s.last)/parseInt(speedInput.value);
+    s.last=now;
+    let r={halted:false};
+    while(s.owed>=1&&!r.halted){s.owed--;r=tm.step();stepCount++}
+    s.frame=null;
     renderTape(tm.getTape(),tm.getHead());
     updateStatus();
-    addToLog(stepCount, newState, tm.getTape(), tm.getHead(), action);
-    
+    if(s.logFrom<=stepCount){
+      addFrameToLog(s.logFrom,stepCount,tm.getState(),`Mueve ${arrows(tm.lastDirection)}`);
+      s.logFrom=stepCount+1;
+    }
     if(r.halted){
       resultEl.innerText=r.result;
       resultEl.style.color=r.result.includes('ACCEPT')?'#059669':'#dc2626';
-      clearInterval(runner);
-      runner=null;
-      document.getElementById('playBtn').innerText='▶ Ejecutar';
-      
-      const inputStr = document.getElementById('inputStr').value.trim() || 'ε (vacía)';
-      generateExplanation(r.result, inputStr);
+      stopStream();
+      const inputStr=document.getElementById('inputStr').value.trim()||'ε (vacía)';
+      generateExplanation(r.result,inputStr);
+      return;
     }
-  },parseInt(speedInput.value));
+    s.frame=requestAnimationFrame(tick);
+  };
+  s.frame=requestAnimationFrame(tick);
+}
+
+function streamCell(sym,isHead){
+  const c=document.createElement('div');
+  c.className='cell';
+  setCell(c,sym,isHead);
+  return c;
+}
+function setCell(c,sym,isHead){
+  if(isHead){
+    c.innerHTML='';
+    const hh=document.createElement('div');
+    hh.className='head';
+    hh.innerText=sym;
+    c.appendChild(hh);
+  }else{
+    c.innerText=sym;
+  }
+}
+
+function drawStream(){
+  const s=stream;
+  s.frame=null;
+  // Celdas agregadas a la izquierda o a la derecha desde el último cuadro
+  while(s.drawnBase<s.base){
+    s.drawnBase++;
+    tapeEl.insertBefore(streamCell(s.tape[s.base-s.drawnBase],false),tapeEl.firstChild);
+  }
+  while(tapeEl.children.length<s.tape.length)
+    tapeEl.appendChild(streamCell(s.tape[tapeEl.children.length],false));
+  const cells=tapeEl.children;
+  if(s.drawnHead!==null&&s.drawnHead+s.base!==s.head){
+    const i=s.drawnHead+s.base;
+    setCell(cells[i],s.tape[i],false);
+  }
+  for(const pos of s.dirty){
+    const i=pos+s.base;
+    if(i!==s.head)setCell(cells[i],s.tape[i],false);
+  }
+  s.dirty.clear();
+  setCell(cells[s.head],s.tape[s.head],true);
+  s.drawnHead=s.head-s.base;
+  cells[s.head].scrollIntoView({inline:'center',block:'nearest'});
+  stateEl.innerText=s.state;
+  positionEl.innerText=s.head;
+  symbolEl.innerText=s.tape[s.head];
+  stepsEl.innerText=stepCount;
+  if(s.logFrom<=stepCount){
+    addFrameToLog(s.logFrom,stepCount,s.state,s.lastAction);
+    s.logFrom=stepCount+1;
+  }
+  if(s.result)finishStream(s.result);
+}
+
+function finishStream(result){
+  const label=result==='ACCEPT'?'✅ ACCEPT':result==='REJECT'?'❌ REJECT':'⏱ '+result;
+  resultEl.innerText=label;
+  resultEl.style.color=result==='ACCEPT'?'#059669':'#dc2626';
+  stopStream();
+  const inputStr=document.getElementById('inputStr').value.trim()||'ε (vacía)';
+  generateExplanation(label,inputStr);
+}
+
+function addFrameToLog(from,to,state,action){
+  const logEntry=document.createElement('div');
+  logEntry.style.padding='6px';
+  logEntry.style.borderBottom='1px solid #e2e8f0';
+  logEntry.innerHTML=`
+    <div style="color:#64748b;font-size:11px">${from===to?'Paso '+to:'Pasos '+from+'–'+to}</div>
+    <div><strong style="color:#2563eb">Estado:</strong> ${escapeHtml(state)} | <strong style="color:#059669">Última acción:</strong> ${escapeHtml(action)}</div>
+  `;
+  executionHistory.push({step:to,state,action});
+  executionLog.appendChild(logEntry);
+  executionLog.scrollTop=executionLog.scrollHeight;
+}
+
+document.getElementById('playBtn').onclick=()=>{
+  if(!tm){alert('⚠️ Primero carga una cadena');return;}
+  if(stream){stopStream();return;}
+  if(resultEl.innerText!=='-')return;
+  const def=tm.getDef();
+  if((def.tapes||1)>1){playLocal();return;}
+  const blank=def.blank||'_';
+  const params=new URLSearchParams({
+    machine:JSON.stringify(def),
+    tape:JSON.stringify(tm.getTape()),
+    head:tm.getHead(),
+    state:tm.getState(),
+    rate:1000/parseInt(speedInput.value)
+  });
+  stream={
+    source:new EventSource('/stream?'+params),
+    tape:[...tm.getTape()],head:tm.getHead(),state:tm.getState(),
+    base:0,drawnBase:0,drawnHead:tm.getHead(),dirty:new Set(),
+    frame:null,logFrom:stepCount+1,lastAction:'',result:null,received:false
+  };
+  const s=stream;
+  document.getElementById('playBtn').innerText='⏸ Pausar';
+  s.source.onmessage=e=>{
+    const batch=JSON.parse(e.data);
+    s.received=true;
+    for(const [pos,write,move,next] of batch.deltas){
+      const i=pos+s.base;
+      const read=s.tape[i];
+      s.tape[i]=write;
+      s.dirty.add(pos);
+      s.head=i+(move==='R'?1:move==='L'?-1:0);
+      s.state=next;
+      if(s.head<0){s.tape.unshift(blank);s.base++;s.head=0}
+      if(s.head>=s.tape.length)s.tape.push(blank);
+      s.lastAction=`Lee '${read}' → Escribe '${write}' → Mueve ${arrows(move)} → Va a ${next}`;
+    }
+    stepCount=batch.step;
+    if(!s.frame)s.frame=requestAnimationFrame(drawStream);
+  };
+  s.source.addEventListener('done',e=>{
+    const done=JSON.parse(e.data);
+    s.source.close();
+    stepCount=done.steps;
+    s.result=done.result;
+    if(!s.frame)s.frame=requestAnimationFrame(drawStream);
+  });
+  s.source.onerror=()=>{
+    if(stream!==s||s.result)return;
+    if(!s.received)alert('⚠️ El servidor no pudo ejecutar la máquina');
+    stopStream();
+  };
+};
+
+// Retroceder un paso: el servidor guarda la corrida con puntos de control y reconstruye
+// el paso pedido, así el navegador no necesita copiar la cinta en cada paso.
+document.getElementById('backBtn').onclick=async()=>{
+  if(!tm||stepCount===0)return;
+  if(stream)stopStream();
+  const def=tm.getDef();
+  const blank=def.blank||'_';
+  if(!serverRun||serverRun.steps<stepCount){
+    const input=document.getElementById('inputStr').value.trim();
+    const r=await fetch('/runs',{method:'POST',headers:{'Content-Type':'application/json'},
+                                 body:JSON.stringify({machine:def,input:input,max_steps:Math.max(stepCount,10000)})});
+    serverRun=await r.json();
+    if(serverRun.error){alert(serverRun.error);serverRun=null;return;}
+  }
+  const r=await fetch(`/runs/${serverRun.id}/step/${stepCount-1}`);
+  const cfg=await r.json();
+  if(cfg.error){alert(cfg.error);serverRun=null;return;}
+  stepCount=cfg.step;
+  // La cinta llega recortada: se rellena con blancos para que el cabezal quede dentro
+  const left=Math.max(1,1-cfg.head),right=Math.max(1,cfg.head-cfg.tape.length+2);
+  const tape=[...Array(left).fill(blank),...cfg.tape.split(''),...Array(right).fill(blank)];
+  tm=createRunner(def,'',{tape:tape,head:cfg.head+left,state:cfg.state});
+  renderTape(tm.getTape(),tm.getHead());
+  updateStatus();
+  resultEl.innerText='-';
+  resultEl.style.color='#1e293b';
+  finalExplanation.style.display='none';
+  addToLog(stepCount, tm.getState(), tm.getTape(), tm.getHead(), `⏮ Retrocede al paso ${stepCount}`);
+};
+
+// Perfil del lado del servidor: tabla de transiciones coloreada según cuántas veces se usó cada una
+function renderProfile(tmDef, profile){
+  const symbols = [];
+  for(let st in tmDef.transitions)
+    for(let sym in tmDef.transitions[st])
+      if(!symbols.includes(sym)) symbols.push(sym);
+  const table = document.getElementById('profileTable');
+  let html = '<tr><th style="padding:4px 8px">Estado</th>' + symbols.map(s => `<th style="padding:4px 8px">${escapeHtml(s)}</th>`).join('') + '</tr>';
+  for(let st in tmDef.transitions){
+    html += `<tr><td style="padding:4px 8px;font-weight:600">${escapeHtml(st)}</td>`;
+    for(let sym of symbols){
+      const rule = tmDef.transitions[st][sym];
+      const heat = (profile.heatmap[st] || {})[sym] || 0;
+      const count = (profile.transitions.find(t => t.state === st && t.symbol === sym) || {count: 0}).count;
+      html += `<td title="${count} pasos" style="padding:4px 8px;border:1px solid #e2e8f0;background:rgba(239,68,68,${heat.toFixed(3)})">${rule ? escapeHtml(rule.join(',')) : '-'}</td>`;
+    }
+    html += '</tr>';
+  }
+  table.innerHTML = html;
+  document.getElementById('profileSummary').innerText =
+    `${profile.result} en ${profile.steps} pasos · ${Math.round(profile.steps_per_second || 0)} pasos/s · recorrido del cabezal: ${profile.travel} celdas`;
+  document.getElementById('profilePanel').style.display = 'block';
+}
+
+document.getElementById('profileBtn').onclick=()=>{
+  let t = parseTM();
+  if(!t) return;
+  const input = document.getElementById('inputStr').value.trim();
+  fetch('/profile', {method: 'POST', headers: {'Content-Type': 'application/json'},
+                     body: JSON.stringify({machine: t, input: input})})
+    .then(r => r.json())
+    .then(profile => {
+      if(profile.error){ alert(profile.error); return; }
+      renderProfile(t, profile);
+    });
 };
 
 document.getElementById('resetBtn').onclick=()=>{
   tm=null;
+  serverRun=null;
   stepCount=0;
   executionHistory=[];
-  if(runner){clearInterval(runner);runner=null;}
+  cancelStream();
   tapeEl.innerHTML='<div style="color:#94a3b8">Carga una cadena para comenzar</div>';
   stateEl.innerText='-';
   positionEl.innerText='-';
@@ -850,24 +1301,745 @@ document.getElementById('resetBtn').onclick=()=>{
 '''
 
 
+# La página no tiene contenido dinámico: se renderiza una sola vez
+_index_page = None
+
+
 @app.route('/')
 def index():
-    return render_template_string(PAGE)
+    global _index_page
+    if _index_page is None:
+        _index_page = PrecompressedBody(render_template_string(PAGE), 'text/html')
+    return _index_page.response(request)
+
+
+# Almacén de máquinas; se abre al primer uso para que cada worker de gunicorn tenga su conexión
+_machine_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _machine_store
+    with _store_lock:
+        if _machine_store is None:
+            store = MachineStore.from_env()
+            store.seed(MACHINE_LIBRARY, compile_machine)
+            _machine_store = store
+    return _machine_store
+
+
+# Máquinas ya compiladas por hash, para no recompilarlas en cada petición; acotado para que
+# la memoria no crezca con el catálogo
+COMPILED_CACHE_SIZE = 256
+_compiled_library = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def get_compiled(key):
+    """Retorna la máquina compilada del almacén con la clave dada"""
+    store = get_store()
+    digest = store.hash_of(key)
+    if digest is None:
+        raise ValueError(f"Máquina desconocida: {key!r}")
+    with _compiled_lock:
+        tm = _compiled_library.get(digest)
+        if tm is not None:
+            _compiled_library.move_to_end(digest)
+    if tm is not None:
+        metrics.inc('tm_cache_requests_total', (('cache', 'compiled'), ('outcome', 'hit')))
+        return tm
+    metrics.inc('tm_cache_requests_total', (('cache', 'compiled'), ('outcome', 'miss')))
+    tm = compile_machine(store.get(key)['machine'])
+    with _compiled_lock:
+        _compiled_library[digest] = tm
+        while len(_compiled_library) > COMPILED_CACHE_SIZE:
+            _compiled_library.popitem(last=False)
+    return tm
+
+
+def get_entry(key):
+    """Ficha y definición de la máquina ``key`` del almacén, o ``None``"""
+    return get_store().get(key) if isinstance(key, str) else None
+
+
+KEY_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+def register_machine(key, entry, author=None, replace=True):
+    """Valida y agrega o reemplaza una máquina del almacén; retorna su hash
+
+    Con ``replace=False`` una clave existente lanza ``DuplicateKey``.
+    """
+    if not isinstance(key, str) or not KEY_PATTERN.fullmatch(key):
+        raise ValueError('La clave debe tener de 1 a 64 letras, dígitos, - o _')
+    for field in ('name', 'description'):
+        if not isinstance(entry.get(field), str):
+            raise ValueError(f"'{field}' debe ser texto")
+    if not isinstance(entry.get('examples'), list) or not all(isinstance(x, str) for x in entry['examples']):
+        raise ValueError("'examples' debe ser una lista de cadenas")
+    if not isinstance(entry.get('alphabet'), list):
+        raise ValueError("'alphabet' debe ser una lista de símbolos")
+    report = analyze_definition(entry.get('machine'), entry['alphabet'])
+    if not report['valid']:
+        raise ValueError('Definición de máquina inválida: ' + '; '.join(report['errors']))
+    tm = compile_machine(entry['machine'])
+    get_store().put(key, entry, tm.hash, author, replace=replace)
+    return tm.hash
+
+
+# Páginas del catálogo ya serializadas y comprimidas, por versión del almacén y consulta
+CATALOG_PAGES = 64
+_catalog_pages = OrderedDict()
+_catalog_lock = threading.Lock()
 
 
 @app.route('/machines', methods=['GET'])
 def get_machines():
-    """Retorna el catálogo de máquinas disponibles"""
-    simplified = {}
-    for key, data in MACHINE_LIBRARY.items():
-        simplified[key] = {
-            'name': data['name'],
-            'description': data['description'],
-            'examples': data['examples'],
-            'alphabet': data['alphabet'],
-            'machine': data['machine']
-        }
-    return jsonify(simplified)
+    """Retorna una página de fichas del catálogo ('after', 'limit', 'alphabet', 'author')"""
+    args = request.args
+    try:
+        limit = max(int_param(args, 'limit', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE), 1)
+    except ValueError:
+        return jsonify({'error': "'limit' debe ser un entero"}), 400
+    store = get_store()
+    query = (store.version(), args.get('after'), limit, args.get('alphabet'), args.get('author'))
+    with _catalog_lock:
+        body = _catalog_pages.get(query)
+    if body is None:
+        machines, after = store.page(query[1], limit, query[3], query[4])
+        body = PrecompressedBody(app.json.dumps({'machines': machines, 'next': after}), 'application/json',
+                                 cache_control='public, max-age=60')
+        with _catalog_lock:
+            _catalog_pages[query] = body
+            while len(_catalog_pages) > CATALOG_PAGES:
+                _catalog_pages.popitem(last=False)
+    return body.response(request)
+
+
+@app.route('/machines/<key>', methods=['GET'])
+def get_machine(key):
+    """Retorna la ficha y la definición completa de una máquina"""
+    entry = get_entry(key)
+    if entry is None:
+        return jsonify({'error': f'Máquina desconocida: {key!r}'}), 404
+    entry['has_reference'] = entry.pop('reference') is not None
+    resp = jsonify(entry)
+    resp.add_etag()
+    return resp.make_conditional(request)
+
+
+def json_body():
+    """Cuerpo JSON de la petición: ``{}`` si no hay, ``ValueError`` si no es un objeto"""
+    data = request.get_json(silent=True)
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError('El cuerpo debe ser un objeto JSON')
+    return data
+
+
+def int_param(params, name, default, limit=None):
+    """Entero ``params[name]`` (o ``default``), acotado a ``limit``; ``ValueError`` si no es un entero"""
+    try:
+        number = int(params.get(name, default))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"'{name}' debe ser un entero") from None
+    return number if limit is None else min(number, limit)
+
+
+def float_param(params, name, default):
+    """Número finito ``params[name]`` (o ``default``); ``ValueError`` si no lo es"""
+    try:
+        number = float(params.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' debe ser un número") from None
+    if not math.isfinite(number):
+        raise ValueError(f"'{name}' debe ser un número finito")
+    return number
+
+
+def symbols_param(params, name, default):
+    """Lista de cadenas ``params[name]`` (o ``default``); ``ValueError`` si es otra cosa"""
+    value = params.get(name, default)
+    if not isinstance(value, list) or not all(isinstance(x, str) for x in value):
+        raise ValueError(f"'{name}' debe ser una lista de cadenas")
+    return value
+
+
+@app.route('/machines', methods=['POST'])
+def submit_machine():
+    """Agrega una máquina al catálogo ('key', 'name', 'description', 'examples', 'alphabet', 'machine', 'author')
+
+    Requiere ``TM_STORE_PATH``: sin él el catálogo vive en la memoria de cada
+    worker y una máquina agregada desaparecería o solo la vería un worker.
+    """
+    if not get_store().persistent:
+        return jsonify({'error': 'El catálogo no es persistente: defina TM_STORE_PATH para agregar máquinas'}), 503
+    try:
+        data = json_body()
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    key, author = data.get('key'), data.get('author')
+    if author is not None and not (isinstance(author, str) and 0 < len(author) <= 64):
+        return jsonify({'error': "'author' debe ser texto de 1 a 64 caracteres"}), 400
+    entry = {field: data.get(field) for field in ('name', 'description', 'examples', 'alphabet', 'machine')}
+    try:
+        # 'author' lo declara el cliente y no prueba nada: una clave registrada no se reemplaza
+        digest = register_machine(key, entry, author, replace=False)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except DuplicateKey:
+        return jsonify({'error': f'La clave {key!r} ya existe'}), 409
+    return jsonify({'key': key, 'hash': digest}), 201
+
+
+def machine_from_request(data):
+    """Obtiene la máquina compilada indicada por 'key' o definida en 'machine'"""
+    if 'machine' in data:
+        return compile_machine(data['machine'])
+    key = data.get('key')
+    if not isinstance(key, str):
+        raise ValueError(f"Máquina desconocida: {key!r}")
+    return get_compiled(key)
+
+
+def machine_label(data):
+    """Etiqueta 'machine' de las métricas: la clave del almacén, o 'adhoc' para definiciones enviadas"""
+    if 'machine' in data or not isinstance(data.get('key'), str):
+        return 'adhoc'
+    return metrics.machine_label(data['key'])
+
+
+def bounded_seconds(value, limit):
+    """Segundos pedidos por el cliente, acotados a ``limit``; ``ValueError`` si no es un número positivo finito"""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Tiempo inválido: {value!r}') from None
+    if not math.isfinite(seconds) or seconds <= 0:
+        raise ValueError(f'Tiempo inválido: {value!r}')
+    return min(seconds, limit)
+
+
+def run_budget(params):
+    """``(max_cells, max_seconds)`` de una sola ejecución, acotados a los valores por defecto"""
+    max_cells = int_param(params, 'max_cells', DEFAULT_MAX_CELLS, DEFAULT_MAX_CELLS)
+    return max_cells, bounded_seconds(params.get('max_seconds', DEFAULT_MAX_SECONDS), DEFAULT_MAX_SECONDS)
+
+
+# Tiempo máximo de las rutas que ejecutan muchas entradas (lotes, lenguajes, verificación, equivalencia)
+BULK_MAX_SECONDS = 30.0
+
+
+def bulk_budget(params):
+    """``(max_cells, max_seconds)``: celdas por entrada y tiempo total pedidos, acotados"""
+    max_cells = int_param(params, 'max_cells', DEFAULT_MAX_CELLS, DEFAULT_MAX_CELLS)
+    return max_cells, bounded_seconds(params.get('max_seconds', BULK_MAX_SECONDS), BULK_MAX_SECONDS)
+
+
+@app.route('/validate', methods=['POST'])
+def validate_machine():
+    """Valida una definición y retorna errores, advertencias, estados alcanzables y transiciones muertas"""
+    try:
+        data = json_body()
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    if 'machine' in data:
+        definition, alphabet = data['machine'], data.get('alphabet')
+    elif get_entry(data.get('key')) is not None:
+        entry = get_entry(data['key'])
+        definition, alphabet = entry['machine'], entry['alphabet']
+    else:
+        return jsonify({'error': f"Máquina desconocida: {data.get('key')!r}"}), 400
+    if alphabet is not None and not isinstance(alphabet, list):
+        return jsonify({'error': "'alphabet' debe ser una lista de símbolos"}), 400
+    return jsonify(analyze_definition(definition, alphabet))
+
+
+@app.route('/run', methods=['POST'])
+def run_machine():
+    """Ejecuta una máquina en el servidor y retorna veredicto, pasos y cinta final
+
+    Los ciclos se detectan salvo con 'detect_loops': false, que es lo que
+    permite usar los modos 'rle', 'accelerate' y 'codegen' (no detectan ciclos).
+    """
+    try:
+        data = json_body()
+        tm = machine_from_request(data)
+        max_steps = int_param(data, 'max_steps', DEFAULT_MAX_STEPS, DEFAULT_MAX_STEPS)
+        max_cells, max_seconds = run_budget(data)
+        options = {}
+        if not tm.deterministic:
+            options['max_frontier'] = int_param(data, 'max_frontier', DEFAULT_MAX_FRONTIER, DEFAULT_MAX_FRONTIER)
+            options['max_configs'] = int_param(data, 'max_configs', DEFAULT_MAX_CONFIGS, DEFAULT_MAX_CONFIGS)
+            if data.get('parallel'):
+                options['workers'] = os.cpu_count()
+        result, seconds = result_cache.run_timed(tm, str(data.get('input', '')), max_steps,
+                                                 rle=bool(data.get('rle', False)),
+                                                 accelerate=bool(data.get('accelerate', False)),
+                                                 codegen=bool(data.get('codegen', False)),
+                                                 detect_loops=bool(data.get('detect_loops', True)),
+                                                 max_cells=max_cells, max_seconds=max_seconds,
+                                                 **options)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    metrics.record_run(machine_label(data), result['steps'], seconds)
+    return jsonify(result)
+
+
+@app.route('/profile', methods=['POST'])
+def profile_machine():
+    """Ejecuta con contadores por transición y retorna el perfil y el mapa de calor"""
+    try:
+        data = json_body()
+        tm = machine_from_request(data)
+        max_steps = int_param(data, 'max_steps', DEFAULT_MAX_STEPS, DEFAULT_MAX_STEPS)
+        max_cells, max_seconds = run_budget(data)
+        result = tm.profile(str(data.get('input', '')), max_steps=max_steps,
+                            max_cells=max_cells, max_seconds=max_seconds)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    return jsonify(result)
+
+
+@app.route('/cache', methods=['GET'])
+def cache_stats():
+    """Retorna tamaño y aciertos/fallos del caché de veredictos"""
+    return jsonify(result_cache.stats())
+
+
+def collect_metrics():
+    """Valores que ya llevan otros módulos, leídos solo cuando se consultan las métricas"""
+    values = [('tm_cache_requests_total', (('cache', 'result'), ('outcome', 'hit')), result_cache.hits),
+              ('tm_cache_requests_total', (('cache', 'result'), ('outcome', 'miss')), result_cache.misses)]
+    if _job_queue is not None:
+        stats = _job_queue.stats()
+        values += [('tm_jobs_running', (), stats['running']), ('tm_jobs_queued', (), stats['queued'])]
+    return values
+
+
+metrics.register_collector(collect_metrics)
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Retorna las métricas de todos los workers en el formato de texto de Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/trace', methods=['POST'])
+def trace_machine():
+    """Transmite la ejecución paso a paso como JSON delimitado por líneas (NDJSON)"""
+    try:
+        data = json_body()
+        tm = machine_from_request(data)
+        every = max(1, int_param(data, 'every', 1))
+        max_steps = int_param(data, 'max_steps', DEFAULT_MAX_STEPS, DEFAULT_MAX_STEPS)
+        # El plazo incluye el tiempo que el cliente tarda en leer el flujo
+        max_cells, max_seconds = bulk_budget(data)
+        records = tm.trace(str(data.get('input', '')), every=every, max_steps=max_steps,
+                           max_cells=max_cells, max_seconds=max_seconds)
+        first = next(records)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    def generate():
+        yield json.dumps(first, ensure_ascii=False) + '\n'
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+# El flujo en vivo envía a lo sumo un lote por cuadro; el navegador los dibuja con requestAnimationFrame
+STREAM_FRAME = 1 / 30
+STREAM_MAX_RATE = 100_000
+# Celdas en blanco que la cabeza puede tener a cada lado de la cinta enviada
+STREAM_HEAD_MARGIN = 64
+# Duración máxima de una conexión de flujo en vivo
+STREAM_MAX_SECONDS = 600.0
+
+
+@app.route('/stream', methods=['GET'])
+def stream_machine():
+    """Ejecuta desde la configuración mostrada y envía por SSE lotes de cambios al ritmo pedido"""
+    args = request.args
+    try:
+        if 'machine' in args:
+            tm = compile_machine(json.loads(args['machine']))
+        else:
+            tm = machine_from_request({'key': args.get('key')})
+        config = tm.initial_config(json.loads(args.get('tape', '[]')))
+        config.state = tm.state_index[args.get('state', tm.states[tm.start])]
+        config.halt = tm.halt[config.state]
+        head = int_param(args, 'head', 0)
+        if not -STREAM_HEAD_MARGIN <= head < len(config.tape.cells) + STREAM_HEAD_MARGIN:
+            raise ValueError(f'La cabeza está fuera de la cinta: {head}')
+        config.head = config.tape.grow(head)
+        rate = float(args.get('rate', 1))
+        if not math.isfinite(rate) or rate <= 0:
+            raise ValueError(f"Ritmo inválido: {args.get('rate')!r}")
+        rate = min(max(rate, 0.1), STREAM_MAX_RATE)
+        max_steps = int_param(args, 'max_steps', DEFAULT_MAX_STEPS, DEFAULT_MAX_STEPS)
+        max_cells = int_param(args, 'max_cells', DEFAULT_MAX_CELLS, DEFAULT_MAX_CELLS)
+    except KeyError as exc:
+        return jsonify({'error': f"Estado desconocido: {exc.args[0]!r}"}), 400
+    except (TypeError, ValueError) as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    def generate():
+        records = tm.trace(max_steps=max_steps, config=config,
+                           max_cells=max_cells, max_seconds=STREAM_MAX_SECONDS)
+        next(records)
+        owed = 0.0
+        deadline = time.monotonic()
+        while True:
+            owed += rate * STREAM_FRAME
+            count = int(owed)
+            owed -= count
+            deltas = []
+            for record in itertools.islice(records, count):
+                if 'result' in record:
+                    if deltas:
+                        yield f"data: {json.dumps({'deltas': deltas, 'step': record['steps']})}\n\n"
+                    yield f"event: done\ndata: {json.dumps(record)}\n\n"
+                    return
+                deltas.append([record['pos'], record['write'], record['move'], record['state']])
+            if deltas:
+                yield f"data: {json.dumps({'deltas': deltas, 'step': record['step']})}\n\n"
+            deadline += STREAM_FRAME
+            time.sleep(max(0.0, deadline - time.monotonic()))
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# Un historial guarda unos 15 bytes por paso: 10⁶ pasos son ~15 MB más los puntos de control
+HISTORY_MAX_STEPS = 1_000_000
+
+
+@app.route('/runs', methods=['POST'])
+def create_run():
+    """Ejecuta guardando el historial para consultar cualquier paso (201)"""
+    try:
+        data = json_body()
+        tm = machine_from_request(data)
+        max_steps = int_param(data, 'max_steps', HISTORY_MAX_STEPS, HISTORY_MAX_STEPS)
+        # RunHistory sube 'every' a MIN_EVERY y lo duplica si los puntos de control ocupan demasiado
+        every = int_param(data, 'every', DEFAULT_EVERY)
+        max_cells, max_seconds = run_budget(data)
+        history = RunHistory(tm, str(data.get('input', '')), max_steps, every, max_cells, max_seconds)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    run_id = run_history.add(history)
+    return jsonify({'id': run_id, **history.summary()}), 201, {'Location': f'/runs/{run_id}'}
+
+
+@app.route('/runs/<run_id>', methods=['GET'])
+def get_run(run_id):
+    """Retorna pasos, veredicto y puntos de control de un historial"""
+    history = run_history.get(run_id)
+    if history is None:
+        return jsonify({'error': 'Historial desconocido'}), 404
+    return jsonify({'id': run_id, **history.summary()})
+
+
+@app.route('/runs/<run_id>/step/<int:n>', methods=['GET'])
+def get_run_step(run_id, n):
+    """Reconstruye la configuración del paso n (hacia adelante o hacia atrás)"""
+    history = run_history.get(run_id)
+    if history is None:
+        return jsonify({'error': 'Historial desconocido'}), 404
+    try:
+        return jsonify(history.view(n))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+
+BATCH_MAX_INPUTS = 100_000
+
+
+def batch_inputs():
+    """Lee las entradas de un lote: lista JSON en 'inputs', o una por línea en el cuerpo.
+
+    Lanza ``ValueError`` si no es una lista de cadenas o pasa de ``BATCH_MAX_INPUTS``.
+    """
+    if request.is_json:
+        data = request.get_json(silent=True)
+        inputs = data.get('inputs', []) if isinstance(data, dict) else None
+        if not isinstance(inputs, list):
+            raise ValueError("'inputs' debe ser una lista de cadenas")
+    else:
+        ndjson = request.mimetype == 'application/x-ndjson'
+        inputs = []
+        for line in request.stream:
+            line = line.decode('utf-8').rstrip('\r\n')
+            if ndjson:
+                if line.strip():
+                    inputs.append(json.loads(line))
+            else:
+                inputs.append(line)
+            if len(inputs) > BATCH_MAX_INPUTS:
+                break
+    if len(inputs) > BATCH_MAX_INPUTS:
+        raise ValueError(f'Demasiadas entradas: el límite es {BATCH_MAX_INPUTS}')
+    if not all(isinstance(x, str) for x in inputs):
+        raise ValueError("'inputs' debe ser una lista de cadenas")
+    return inputs
+
+
+def batch_response(tm, label):
+    try:
+        inputs = batch_inputs()
+        max_steps = int_param(request.args, 'max_steps', DEFAULT_MAX_STEPS, DEFAULT_MAX_STEPS)
+        max_cells, max_seconds = bulk_budget(request.args)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    started = time.perf_counter()
+    results = run_batch(tm, inputs, max_steps=max_steps, max_cells=max_cells, max_seconds=max_seconds)
+    # El tiempo es el de pared del lote completo, repartido entre las entradas
+    seconds = (time.perf_counter() - started) / max(1, len(results))
+    for r in results:
+        if 'steps' in r:
+            metrics.record_run(label, r['steps'], seconds)
+    return jsonify({'results': results})
+
+
+@app.route('/machines/<key>/batch', methods=['POST'])
+def run_library_batch(key):
+    """Ejecuta una máquina de la biblioteca sobre un lote de entradas"""
+    if key not in get_store():
+        return jsonify({'error': f'Máquina desconocida: {key!r}'}), 404
+    return batch_response(get_compiled(key), metrics.machine_label(key))
+
+
+@app.route('/batch', methods=['POST'])
+def run_adhoc_batch():
+    """Ejecuta una definición enviada en el cuerpo JSON ('machine') sobre 'inputs'"""
+    try:
+        tm = compile_machine(json_body().get('machine'))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    return batch_response(tm, 'adhoc')
+
+
+# Los trabajos existen para corridas más largas que las de /run, pero también tienen tope
+JOB_MAX_STEPS = 100 * DEFAULT_MAX_STEPS
+JOB_MAX_CELLS = 1 << 26
+# Prioridad de los trabajos de la API; un cliente solo puede pedir una menor (un número mayor)
+JOB_PRIORITY = 10
+
+# Cola de trabajos largos; se crea al primer uso para que sus hilos nazcan
+# dentro del worker de gunicorn y no en el proceso maestro antes del fork
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    global _job_queue
+    # Dos peticiones simultáneas no deben crear dos colas con sus propios hilos
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(checkpoint_dir=os.environ.get('TM_CHECKPOINT_DIR') or None,
+                                  checkpoint_every=float(os.environ.get('TM_CHECKPOINT_EVERY', 30)))
+    return _job_queue
+
+
+def config_from_snapshot(data):
+    """Máquina y configuración de la instantánea en base64 de 'snapshot'.
+
+    La máquina es la de 'key'/'machine' o, si no se indica, la de la
+    biblioteca con el mismo hash.
+    """
+    try:
+        blob = base64.b64decode(data['snapshot'], validate=True)
+    except (binascii.Error, TypeError):
+        raise ValueError('La instantánea no es base64 válido') from None
+    if 'machine' in data or 'key' in data:
+        tm = machine_from_request(data)
+    else:
+        digest = snapshot_hash(blob)
+        key = get_store().key_for_hash(digest)
+        if key is None:
+            raise ValueError('La instantánea es de una máquina que no está en la biblioteca')
+        tm = get_compiled(key)
+    return tm, load_snapshot(tm, blob, max_cells=JOB_MAX_CELLS)
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Encola una ejecución larga y retorna su id (202)
+
+    El cupo por cliente se cuenta por dirección de origen: un encabezado que
+    elige el cliente permitiría abrir cupos nuevos a voluntad. Detrás de un
+    proxy hay que configurar ``ProxyFix`` para que ``remote_addr`` sea la del
+    cliente y no la del proxy.
+    """
+    client = request.remote_addr or 'anonymous'
+    try:
+        data = json_body()
+        if 'snapshot' in data:
+            tm, config = config_from_snapshot(data)
+        else:
+            tm, config = machine_from_request(data), None
+        max_steps = int_param(data, 'max_steps', DEFAULT_MAX_STEPS, JOB_MAX_STEPS)
+        max_cells = int_param(data, 'max_cells', DEFAULT_MAX_CELLS, JOB_MAX_CELLS)
+        job = get_job_queue().submit(tm, str(data.get('input', '')), max_steps,
+                                     client=client, priority=max(int_param(data, 'priority', JOB_PRIORITY), JOB_PRIORITY),
+                                     config=config, max_cells=max_cells)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except QueueFull as exc:
+        return jsonify({'error': str(exc)}), 429, {'Retry-After': '5'}
+    return jsonify(job.to_dict()), 202, {'Location': f'/jobs/{job.id}'}
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Retorna progreso y resultado de un trabajo"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo desconocido'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/snapshot', methods=['GET'])
+def get_job_snapshot(job_id):
+    """Retorna la instantánea binaria de la configuración actual de un trabajo"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo desconocido'}), 404
+    blob = job.snapshot()
+    if blob is None:
+        return jsonify({'error': 'El trabajo no tiene una configuración en curso'}), 409
+    return Response(blob, mimetype='application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename="{job_id}.tms"'})
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancela un trabajo en espera o en ejecución"""
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo desconocido'}), 404
+    return jsonify(job.to_dict())
+
+
+# Máximo de cadenas que se enumeran en una petición HTTP (la CLI no tiene límite)
+LANGUAGE_LIMIT = 1 << 20
+# Longitud máxima de las cadenas de los corpus aleatorios
+RANDOM_MAX_LENGTH = 1 << 12
+
+
+def exhaustive_length(params, alphabet, default):
+    """'max_length' de un corpus exhaustivo sobre ``alphabet``; ``ValueError`` si pasa de ``LANGUAGE_LIMIT`` cadenas"""
+    max_length = int_param(params, 'max_length', default)
+    if max_length < 0:
+        raise ValueError("'max_length' no puede ser negativo")
+    # Cada longitud aporta al menos una cadena; se deja de sumar al pasar el límite
+    total, count = 0, 1
+    for _ in range(min(max_length, LANGUAGE_LIMIT) + 1):
+        total += count
+        if total > LANGUAGE_LIMIT:
+            raise ValueError(f'Demasiadas cadenas: el límite es {LANGUAGE_LIMIT}')
+        count *= len(alphabet)
+    return max_length
+
+
+def language_response(tm, alphabet, data):
+    try:
+        max_length = exhaustive_length(data, alphabet, 8)
+        max_steps = int_param(data, 'max_steps', language.DEFAULT_MAX_STEPS, DEFAULT_MAX_STEPS)
+        max_cells, max_seconds = bulk_budget(data)
+        stats = language.enumerate_language(tm, alphabet, max_length, max_steps=max_steps, workers=os.cpu_count(),
+                                            max_cells=max_cells, max_seconds=max_seconds)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    return jsonify({**stats.summary(), 'accepted_strings': stats.accepted_strings})
+
+
+@app.route('/machines/<key>/language', methods=['POST'])
+def library_language(key):
+    """Enumera las cadenas aceptadas por una máquina de la biblioteca hasta 'max_length'"""
+    entry = get_entry(key)
+    if entry is None:
+        return jsonify({'error': f'Máquina desconocida: {key!r}'}), 404
+    try:
+        data = json_body()
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    return language_response(get_compiled(key), entry['alphabet'], data)
+
+
+@app.route('/language', methods=['POST'])
+def adhoc_language():
+    """Enumera las cadenas aceptadas por la definición 'machine' sobre 'alphabet'"""
+    try:
+        data = json_body()
+        tm = compile_machine(data.get('machine'))
+        alphabet = symbols_param(data, 'alphabet', [])
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    return language_response(tm, alphabet, data)
+
+
+@app.route('/machines/<key>/verify', methods=['POST'])
+def verify_library_machine(key):
+    """Compara una máquina de la biblioteca con su predicado de referencia"""
+    entry = get_entry(key)
+    if entry is None:
+        return jsonify({'error': f'Máquina desconocida: {key!r}'}), 404
+    if not entry.get('reference'):
+        return jsonify({'error': f'La máquina {key!r} no tiene predicado de referencia'}), 400
+    try:
+        data = json_body()
+        max_length = exhaustive_length(data, entry['alphabet'], 10)
+        random_count = int_param(data, 'random', 10_000, LANGUAGE_LIMIT)
+        max_steps = int_param(data, 'max_steps', 1_000_000, DEFAULT_MAX_STEPS)
+        max_cells, max_seconds = bulk_budget(data)
+        report = verify_machine(get_compiled(key), entry['reference'], entry['alphabet'],
+                                max_length=max_length, random_count=random_count,
+                                random_max_length=int_param(data, 'random_max_length', 64, RANDOM_MAX_LENGTH),
+                                seed=int_param(data, 'seed', 0), max_steps=max_steps, workers=os.cpu_count(),
+                                max_cells=max_cells, max_seconds=max_seconds)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    return jsonify(report)
+
+
+def machine_from_spec(spec):
+    """Compila una máquina dada como clave de la biblioteca o como definición"""
+    if isinstance(spec, str):
+        entry = get_entry(spec)
+        if entry is None:
+            raise ValueError(f"Máquina desconocida: {spec!r}")
+        return get_compiled(spec), entry['alphabet']
+    return compile_machine(spec), None
+
+
+@app.route('/equivalence', methods=['POST'])
+def equivalence():
+    """Compara dos máquinas ('a' y 'b': clave o definición) sobre un corpus de entradas"""
+    try:
+        data = json_body()
+        a, alphabet_a = machine_from_spec(data.get('a'))
+        b, alphabet_b = machine_from_spec(data.get('b'))
+        alphabet = symbols_param(data, 'alphabet', None) if data.get('alphabet') else alphabet_a or alphabet_b or []
+        if 'inputs' in data:
+            corpus = symbols_param(data, 'inputs', [])
+        elif 'random' in data:
+            corpus = random_corpus(alphabet, int_param(data, 'random', 0, LANGUAGE_LIMIT),
+                                   int_param(data, 'max_length', 8, RANDOM_MAX_LENGTH), int_param(data, 'seed', 0))
+        else:
+            corpus = exhaustive_corpus(alphabet, exhaustive_length(data, alphabet, 8))
+        max_cells, max_seconds = bulk_budget(data)
+        report = check_equivalence(a, b, corpus,
+                                   max_steps=int_param(data, 'max_steps', 100_000, DEFAULT_MAX_STEPS),
+                                   slowdown=float_param(data, 'slowdown', 1.0), workers=os.cpu_count(),
+                                   max_cells=max_cells, max_seconds=max_seconds)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    return jsonify(report)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,92 @@
+"""Ejecución por lotes: una máquina compilada sobre miles de entradas.
+
+La máquina se compila una vez por lote en el proceso principal y se envía
+(serializada con pickle) junto con cada bloque de entradas a un pool de
+procesos, de modo que el trabajo escala con el número de núcleos. Dentro de
+cada bloque, si NumPy está instalado, las entradas avanzan a la vez en el
+motor vectorizado de ``lockstep``.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import lockstep
+from engine import BUDGET_EXCEEDED, DEFAULT_MAX_STEPS
+
+# Por debajo de este tamaño el costo de repartir supera al de ejecutar aquí
+MIN_PARALLEL_BATCH = 256
+
+_pool = None
+
+
+def get_pool():
+    """Pool de procesos compartido, creado la primera vez que se necesita."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _pool
+
+
+def run_verdicts(tm, inputs, max_steps, max_cells=None, deadline=None):
+    """``[(veredicto, pasos), ...]`` de ``tm`` sobre ``inputs``; ``ValueError`` si alguna es inválida.
+
+    ``max_cells`` limita la cinta de cada entrada y ``deadline`` (un instante
+    de ``time.monotonic``, que en Linux comparten los procesos del pool) todo
+    el lote: las entradas que no terminan a tiempo quedan ``BUDGET_EXCEEDED``.
+    """
+    if lockstep.available() and tm.deterministic and tm.tapes == 1 and len(inputs) >= lockstep.MIN_LANES:
+        return lockstep.run_lockstep(tm, inputs, max_steps, max_cells, deadline)
+    results = []
+    for text in inputs:
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                results.append((BUDGET_EXCEEDED, 0))
+                continue
+        r = tm.run(text, max_steps=max_steps, max_cells=max_cells, max_seconds=remaining)
+        results.append((r['result'], r['steps']))
+    return results
+
+
+def _run_chunk(tm, inputs, max_steps, max_cells=None, deadline=None):
+    try:
+        verdicts = run_verdicts(tm, inputs, max_steps, max_cells, deadline)
+    except ValueError:
+        pass  # alguna entrada inválida: se ejecutan una por una para reportar el error de cada una
+    else:
+        return [{'input': text, 'result': result, 'steps': steps}
+                for text, (result, steps) in zip(inputs, verdicts)]
+    results = []
+    for text in inputs:
+        try:
+            [(result, steps)] = run_verdicts(tm, [text], max_steps, max_cells, deadline)
+        except ValueError as exc:
+            results.append({'input': text, 'error': str(exc)})
+        else:
+            results.append({'input': text, 'result': result, 'steps': steps})
+    return results
+
+
+def run_batch(tm, inputs, max_steps=DEFAULT_MAX_STEPS, workers=None, max_cells=None, max_seconds=None):
+    """Ejecuta ``tm`` sobre cada cadena de ``inputs`` y retorna veredicto y pasos por entrada.
+
+    ``max_cells`` limita la cinta de cada entrada y ``max_seconds`` el lote
+    completo (ver ``run_verdicts``).
+    """
+    inputs = list(inputs)
+    workers = workers or os.cpu_count() or 1
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    if len(inputs) < MIN_PARALLEL_BATCH or workers == 1:
+        return _run_chunk(tm, inputs, max_steps, max_cells, deadline)
+
+    # Varios bloques por proceso para equilibrar entradas de distinta longitud
+    size = max(1, -(-len(inputs) // (workers * 4)))
+    chunks = [inputs[i:i + size] for i in range(0, len(inputs), size)]
+    pool = get_pool()
+    results = []
+    n = len(chunks)
+    for part in pool.map(_run_chunk, [tm] * n, chunks, [max_steps] * n, [max_cells] * n, [deadline] * n):
+        results.extend(part)
+    return results
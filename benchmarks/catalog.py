@@ -0,0 +1,115 @@
+"""Benchmark de /machines bajo gunicorn: página precalculada vs. la misma página sin caché.
+
+Levanta la aplicación con gunicorn en un puerto local, registra una ruta
+``/machines-uncached`` que hace la misma consulta paginada de fichas que
+``/machines`` pero la vuelve a pedir al almacén y a serializar con
+``jsonify`` en cada petición, y mide peticiones por segundo con varios
+clientes concurrentes. Así la diferencia es solo la del caché de páginas y
+la compresión previa, no la de devolver menos datos.
+
+Uso (desde la raíz del repositorio)::
+
+    python -m benchmarks.catalog --workers 4 --clients 32 --seconds 5
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import threading
+import time
+
+from flask import jsonify, request
+
+from app import app, get_store, int_param
+from store import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+
+@app.route('/machines-uncached', methods=['GET'])
+def get_machines_uncached():
+    args = request.args
+    limit = max(int_param(args, 'limit', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE), 1)
+    machines, after = get_store().page(args.get('after'), limit, args.get('alphabet'), args.get('author'))
+    return jsonify({'machines': machines, 'next': after})
+
+
+def serve(port, workers):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'127.0.0.1:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('loglevel', 'warning')
+
+        def load(self):
+            return app
+
+    Server().run()
+
+
+def measure(port, path, clients, seconds, headers):
+    counts = [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def client(i):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        while time.perf_counter() < deadline:
+            conn.request('GET', path, headers=headers)
+            conn.getresponse().read()
+            counts[i] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / seconds
+
+
+def wait_ready(port, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/machines')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('gunicorn no respondió a tiempo')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=serve, args=(args.port, args.workers), daemon=True)
+    server.start()
+    try:
+        wait_ready(args.port)
+        conn = http.client.HTTPConnection('127.0.0.1', args.port)
+        conn.request('GET', '/machines')
+        etag = conn.getresponse().getheader('ETag')
+
+        cases = {
+            'uncached': ('/machines-uncached', {}),
+            'cached': ('/machines', {}),
+            'cached_gzip': ('/machines', {'Accept-Encoding': 'gzip'}),
+            'conditional_304': ('/machines', {'If-None-Match': etag}),
+        }
+        results = {name: measure(args.port, path, args.clients, args.seconds, headers)
+                   for name, (path, headers) in cases.items()}
+        results['speedup'] = results['cached'] / results['uncached']
+        print(json.dumps(results, indent=2))
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""Suite de benchmarks del simulador sobre las máquinas de la biblioteca.
+
+Cada máquina se ejecuta sobre entradas de tamaño creciente en cada modo del
+motor (intérprete, acelerado, vigilado, cinta RLE, código generado) y se registran pasos por
+segundo, tiempo y memoria pico. El modo ``naive`` es la referencia del motor
+compilado: recorre los diccionarios de la definición en cada paso, como lo
+haría un intérprete directo. Con ``--http`` también se mide ``/run``,
+``/machines`` y ``/`` bajo gunicorn con varios clientes concurrentes. Con
+``--multitape`` se compara cada máquina de una cinta con su variante de dos
+cintas sobre las mismas entradas (reducción de pasos y de tiempo). Con
+``--lockstep`` se mide un lote de entradas aleatorias entrada por entrada y en
+el motor vectorizado (requiere NumPy).
+
+Uso (desde la raíz del repositorio)::
+
+    python -m benchmarks.suite -o resultados.json
+    python -m benchmarks.suite --full --http -o resultados.json
+    python -m benchmarks.suite --multitape --machines ww palindrome anbncn
+    python -m benchmarks.suite --lockstep --machines even_ones anbn palindrome
+    python -m benchmarks.suite --baseline resultados.json   # marca regresiones
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# El caché de veredictos ocultaría el costo del motor en las pruebas HTTP
+os.environ.setdefault('TM_CACHE_SIZE', '0')
+
+import lockstep  # noqa: E402
+from app import MACHINE_LIBRARY, get_compiled  # noqa: E402
+
+
+def _word(n, seed=0):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('01') for _ in range(n))
+
+
+# Entrada de tamaño n (en el lenguaje, cuando la máquina lo permite) para cada máquina
+INPUTS = {
+    'anbn': lambda n: 'a' * n + 'b' * n,
+    'palindrome': lambda n: ('ab' * n)[:n] + ('ab' * n)[:n][::-1],
+    'zerononen': lambda n: '0' * n + '1' * n,
+    'even_ones': lambda n: '1' * (2 * n),
+    'odd_ones': lambda n: '1' * (2 * n + 1),
+    'ww': lambda n: _word(n) * 2,
+    'anbncn': lambda n: 'a' * n + 'b' * n + 'c' * n,
+}
+# Las variantes de dos cintas deciden el mismo lenguaje sobre las mismas entradas
+MULTITAPE = {'ww': 'ww_2tape', 'palindrome': 'palindrome_2tape', 'anbncn': 'anbncn_2tape'}
+INPUTS.update({multi: INPUTS[single] for single, multi in MULTITAPE.items()})
+
+QUICK_SIZES = [10, 100, 500]
+FULL_SIZES = {
+    'anbn': [10, 100, 1000, 10_000],
+    'zerononen': [10, 100, 1000, 10_000],
+    'palindrome': [10, 100, 1000, 2000],
+    'ww': [10, 100, 1000, 2000],
+    'anbncn': [10, 100, 1000, 2000],
+    'ww_2tape': [10, 100, 1000, 2000],
+    'palindrome_2tape': [10, 100, 1000, 2000],
+    'anbncn_2tape': [10, 100, 1000, 2000],
+    'even_ones': [10, 1000, 100_000, 1_000_000],
+    'odd_ones': [10, 1000, 100_000, 1_000_000],
+}
+
+def naive_run(definition, text, max_steps):
+    """Intérprete directo sobre la definición (diccionarios y lista de símbolos), sin compilar."""
+    blank = definition.get('blank', '_')
+    transitions = definition['transitions']
+    accept, reject = set(definition.get('accept', [])), set(definition.get('reject', []))
+    tape = list(text) or [blank]
+    head, state, steps = 0, definition['start'], 0
+    while steps < max_steps:
+        if state in accept:
+            return {'result': 'ACCEPT', 'steps': steps}
+        if state in reject:
+            return {'result': 'REJECT', 'steps': steps}
+        rule = transitions.get(state, {}).get(tape[head])
+        if rule is None:
+            return {'result': 'REJECT', 'steps': steps}
+        write, move, state = rule
+        tape[head] = write
+        steps += 1
+        if move == 'R':
+            head += 1
+            if head == len(tape):
+                tape.append(blank)
+        elif move == 'L':
+            if head == 0:
+                tape.insert(0, blank)
+            else:
+                head -= 1
+    return {'result': 'BUDGET_EXCEEDED', 'steps': steps}
+
+
+# Modos del motor: cada uno recibe (máquina compilada, entrada) y retorna el resultado.
+# Las máquinas de varias cintas solo tienen los modos intérprete y vigilado.
+MODES = {
+    'naive': lambda tm, text: naive_run(tm.definition, text, 10 ** 9),
+    'interpreter': lambda tm, text: tm.run(text, max_steps=10 ** 9),
+    'accelerated': lambda tm, text: tm.run(text, max_steps=10 ** 9, accelerate=True),
+    'guarded': lambda tm, text: tm.run(text, max_steps=10 ** 9, detect_loops=True),
+    'rle': lambda tm, text: tm.run(text, max_steps=10 ** 9, rle=True),
+    'codegen': lambda tm, text: tm.run(text, max_steps=10 ** 9, codegen=True),
+}
+
+# Cada caso se repite hasta acumular este tiempo y se toma la mejor vuelta
+MIN_TIME = 0.2
+
+
+def bench_case(run, tm, text):
+    best = float('inf')
+    total = 0.0
+    while total < MIN_TIME:
+        started = time.perf_counter()
+        result = run(tm, text)
+        elapsed = time.perf_counter() - started
+        best = min(best, elapsed)
+        total += elapsed
+    # La memoria se mide en una vuelta aparte: tracemalloc distorsiona los tiempos
+    tracemalloc.start()
+    run(tm, text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'result': result['result'],
+        'steps': result['steps'],
+        'seconds': best,
+        'steps_per_second': result['steps'] / best if best else None,
+        'peak_bytes': peak,
+    }
+
+
+def bench_engine(keys, modes, full):
+    records = []
+    for key in keys:
+        tm = get_compiled(key)
+        for n in (FULL_SIZES[key] if full else QUICK_SIZES):
+            text = INPUTS[key](n)
+            for mode in modes:
+                if tm.tapes > 1 and mode in ('naive', 'accelerated', 'rle', 'codegen'):
+                    continue
+                record = {'machine': key, 'mode': mode, 'n': n, **bench_case(MODES[mode], tm, text)}
+                records.append(record)
+                print(f"{key:11} {mode:12} n={n:<8} {record['steps']:>12} pasos "
+                      f"{record['seconds']:9.4f}s {record['steps_per_second'] or 0:14.0f} pasos/s",
+                      file=sys.stderr)
+    return records
+
+
+def bench_multitape(keys, full):
+    """Compara cada máquina de una cinta con su variante de dos cintas."""
+    records = []
+    for single in keys:
+        multi = MULTITAPE.get(single)
+        if multi is None:
+            continue
+        one, two = get_compiled(single), get_compiled(multi)
+        for n in (FULL_SIZES[single] if full else QUICK_SIZES):
+            text = INPUTS[single](n)
+            a = bench_case(MODES['interpreter'], one, text)
+            b = bench_case(MODES['interpreter'], two, text)
+            record = {
+                'machine': single, 'variant': multi, 'n': n,
+                'result_1': a['result'], 'result_2': b['result'],
+                'steps_1': a['steps'], 'steps_2': b['steps'],
+                'seconds_1': a['seconds'], 'seconds_2': b['seconds'],
+                'step_reduction': a['steps'] / b['steps'] if b['steps'] else None,
+                'speedup': a['seconds'] / b['seconds'] if b['seconds'] else None,
+            }
+            records.append(record)
+            print(f"{single:11} n={n:<6} {a['steps']:>10} → {b['steps']:>8} pasos "
+                  f"(×{record['step_reduction'] or 0:.1f})  {a['seconds']:8.4f}s → {b['seconds']:8.4f}s "
+                  f"(×{record['speedup'] or 0:.1f})  {a['result']}/{b['result']}", file=sys.stderr)
+    return records
+
+
+def bench_lockstep(keys, full):
+    """Lote de entradas aleatorias: ``tm.run`` por entrada contra ``lockstep.run_lockstep``."""
+    if not lockstep.available():
+        print('--lockstep requiere NumPy', file=sys.stderr)
+        return []
+    count, max_length = (100_000, 256) if full else (20_000, 64)
+    records = []
+    for key in keys:
+        tm = get_compiled(key)
+        if tm.tapes > 1:
+            continue
+        rng = random.Random(0)
+        alphabet = MACHINE_LIBRARY[key]['alphabet']
+        inputs = [''.join(rng.choices(alphabet, k=rng.randint(0, max_length))) for _ in range(count)]
+        started = time.perf_counter()
+        expected = [(r['result'], r['steps']) for r in (tm.run(text, max_steps=1_000_000) for text in inputs)]
+        loop = time.perf_counter() - started
+        started = time.perf_counter()
+        got = lockstep.run_lockstep(tm, inputs, 1_000_000)
+        vector = time.perf_counter() - started
+        steps = sum(s for _, s in expected)
+        record = {
+            'machine': key, 'inputs': count, 'max_length': max_length, 'steps': steps,
+            'seconds_loop': loop, 'seconds_lockstep': vector,
+            'steps_per_second_loop': steps / loop, 'steps_per_second_lockstep': steps / vector,
+            'speedup': loop / vector, 'identical': got == expected,
+        }
+        records.append(record)
+        print(f"{key:11} {count} entradas  {loop:8.3f}s → {vector:8.3f}s (×{record['speedup']:.1f})  "
+              f"{record['steps_per_second_lockstep'] / 1e6:7.1f} M pasos/s"
+              f"{'' if record['identical'] else '  ¡RESULTADOS DISTINTOS!'}", file=sys.stderr)
+    return records
+
+
+def bench_http(keys, clients, seconds, workers, port):
+    import http.client
+    import multiprocessing
+    import threading
+
+    from benchmarks.catalog import serve, wait_ready
+
+    server = multiprocessing.Process(target=serve, args=(port, workers), daemon=True)
+    server.start()
+    records = []
+    try:
+        wait_ready(port)
+
+        def load(method, path, body):
+            latencies = []
+            deadline = time.perf_counter() + seconds
+
+            def client():
+                conn = http.client.HTTPConnection('127.0.0.1', port)
+                headers = {'Content-Type': 'application/json'} if body else {}
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    conn.request(method, path, body=body, headers=headers)
+                    conn.getresponse().read()
+                    latencies.append(time.perf_counter() - started)
+                conn.close()
+
+            threads = [threading.Thread(target=client) for _ in range(clients)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            latencies.sort()
+            return {
+                'requests_per_second': len(latencies) / seconds,
+                'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else None,
+                'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+            }
+
+        cases = [('GET', '/', None), ('GET', '/machines', None)]
+        for key in keys:
+            body = json.dumps({'key': key, 'input': INPUTS[key](QUICK_SIZES[1])})
+            cases.append(('POST', f'/run#{key}', body))
+        for method, path, body in cases:
+            record = {'endpoint': f'{method} {path}', 'clients': clients,
+                      **load(method, path.split('#')[0], body)}
+            records.append(record)
+            print(f"{record['endpoint']:24} {record['requests_per_second']:10.1f} req/s "
+                  f"p50={record['p50_ms']:.2f}ms p99={record['p99_ms']:.2f}ms", file=sys.stderr)
+    finally:
+        server.terminate()
+    return records
+
+
+def compare(records, baseline, tolerance):
+    """Lista las regresiones de ``records`` respecto de ``baseline`` (mismo formato)."""
+    regressions = []
+    previous = {(r['machine'], r['mode'], r['n']): r for r in baseline.get('engine', [])}
+    for r in records.get('engine', []):
+        old = previous.get((r['machine'], r['mode'], r['n']))
+        if old is None or not old['steps_per_second']:
+            continue
+        if r['steps_per_second'] < old['steps_per_second'] * (1 - tolerance):
+            regressions.append({**r, 'metric': 'steps_per_second', 'baseline': old['steps_per_second']})
+        if r['peak_bytes'] > old['peak_bytes'] * (1 + tolerance):
+            regressions.append({**r, 'metric': 'peak_bytes', 'baseline': old['peak_bytes']})
+    previous = {r['endpoint']: r for r in baseline.get('http', [])}
+    for r in records.get('http', []):
+        old = previous.get(r['endpoint'])
+        if old and r['requests_per_second'] < old['requests_per_second'] * (1 - tolerance):
+            regressions.append({**r, 'metric': 'requests_per_second', 'baseline': old['requests_per_second']})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks del simulador')
+    parser.add_argument('--machines', nargs='*', default=list(INPUTS))
+    parser.add_argument('--modes', nargs='*', default=list(MODES))
+    parser.add_argument('--full', action='store_true', help='tamaños grandes (aⁿbⁿ hasta n=10⁴, |w| hasta 2000)')
+    parser.add_argument('--http', action='store_true', help='medir también los endpoints bajo gunicorn')
+    parser.add_argument('--multitape', action='store_true',
+                        help='comparar las máquinas de una cinta con sus variantes de dos cintas')
+    parser.add_argument('--lockstep', action='store_true',
+                        help='comparar lotes entrada por entrada contra el motor vectorizado (NumPy)')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('-o', '--output', help='archivo JSON de resultados')
+    parser.add_argument('--baseline', help='resultados previos contra los que comparar')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    keys = [k for k in args.machines if k in MACHINE_LIBRARY]
+    results = {
+        'python': sys.version.split()[0],
+        'full': args.full,
+        'engine': bench_engine(keys, args.modes, args.full),
+    }
+    if args.multitape:
+        results['multitape'] = bench_multitape(keys, args.full)
+    if args.lockstep:
+        results['lockstep'] = bench_lockstep(keys, args.full)
+    if args.http:
+        results['http'] = bench_http(keys, args.clients, args.seconds, args.workers, args.port)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        json.dump({'regressions': regressions}, sys.stdout, indent=2)
+        print()
+        sys.exit(1 if regressions else 0)
+    if not args.output:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Caché de veredictos indexado por hash de máquina y cadena de entrada.
+
+Por defecto vive en memoria de cada proceso (LRU con TTL opcional). Si se
+indica un archivo, los resultados se guardan en SQLite y se comparten entre
+todos los workers de gunicorn de la máquina.
+
+Configuración por variables de entorno (ver ``from_env``):
+
+* ``TM_CACHE_SIZE``: número máximo de resultados (0 desactiva el caché).
+* ``TM_CACHE_TTL``: segundos de validez de cada resultado (sin límite si no se indica).
+* ``TM_CACHE_PATH``: archivo SQLite compartido.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def result_key(tm, text, options):
+    """Clave del resultado de ejecutar ``tm`` sobre ``text`` con las opciones (límites, modo) dadas."""
+    canonical = json.dumps(options, sort_keys=True) + '\0' + text
+    return f'{tm.hash}:{hashlib.sha256(canonical.encode("utf-8")).hexdigest()}'
+
+
+class _MemoryStore:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is not None:
+                self.items.move_to_end(key)
+            return item
+
+    def put(self, key, value, stored):
+        with self.lock:
+            self.items[key] = (value, stored)
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class _SQLiteStore:
+    # Cada cuántas escrituras se recorta la tabla al tamaño máximo
+    EVICT_EVERY = 64
+
+    def __init__(self, path, maxsize):
+        self.path = path
+        self.maxsize = maxsize
+        self.local = threading.local()
+        self.writes = 0
+
+    def _conn(self):
+        # Una conexión por hilo y por proceso: las conexiones no sobreviven a un fork
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS results ('
+                         'key TEXT PRIMARY KEY, value TEXT NOT NULL, stored REAL NOT NULL, used REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+            self.local.conn, self.local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute('SELECT value, stored FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE results SET used = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0]), row[1]
+
+    def put(self, key, value, stored):
+        conn = self._conn()
+        conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                     (key, json.dumps(value), stored, stored))
+        self.writes += 1
+        if self.writes % self.EVICT_EVERY == 0:
+            conn.execute('DELETE FROM results WHERE key IN ('
+                         'SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)', (self.maxsize,))
+
+    def delete(self, key):
+        self._conn().execute('DELETE FROM results WHERE key = ?', (key,))
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+
+class ResultCache:
+    """Caché LRU/TTL de resultados de ``CompiledMachine.run`` con contadores de aciertos."""
+
+    def __init__(self, maxsize=4096, ttl=None, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.store = _SQLiteStore(path, maxsize) if path else _MemoryStore(maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        ttl = os.environ.get('TM_CACHE_TTL')
+        return cls(maxsize=int(os.environ.get('TM_CACHE_SIZE', 4096)),
+                   ttl=float(ttl) if ttl else None,
+                   path=os.environ.get('TM_CACHE_PATH') or None)
+
+    def get(self, key):
+        item = self.store.get(key) if self.maxsize else None
+        if item is not None:
+            value, stored = item
+            if self.ttl is None or time.time() - stored < self.ttl:
+                self.hits += 1
+                return value
+            self.store.delete(key)
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        if self.maxsize:
+            self.store.put(key, value, time.time())
+
+    def run(self, tm, text, max_steps, **options):
+        """Retorna el resultado guardado o ejecuta ``tm.run`` y lo guarda."""
+        return self.run_timed(tm, text, max_steps, **options)[0]
+
+    def run_timed(self, tm, text, max_steps, **options):
+        """Como ``run``, pero retorna ``(resultado, segundos)``; ``segundos`` es ``None`` si fue un acierto."""
+        key = result_key(tm, text, dict(options, max_steps=max_steps))
+        result = self.get(key)
+        if result is not None:
+            return result, None
+        started = time.perf_counter()
+        result = tm.run(text, max_steps=max_steps, **options)
+        seconds = time.perf_counter() - started
+        # Agotar el tiempo depende de la carga del servidor, no de la entrada
+        if result.get('budget') != 'time':
+            self.put(key, result)
+        return result, seconds
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.store),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'shared': self.path is not None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,134 @@
+"""Backend que genera código Python especializado para cada máquina.
+
+En vez de recorrer la tabla, cada estado se vuelve un bloque ``while`` con
+una rama por símbolo y las constantes (símbolo escrito, movimiento, estado
+siguiente) escritas en el código. Los autolazos van primero y hacen
+``continue`` sin salir del bloque, así que un barrido no paga el despacho por
+estado; solo cambiar de estado vuelve a la cadena de ``if state == ...``.
+Tampoco se escribe la celda cuando el símbolo no cambia ni se mueve el
+cabezal con ``N``.
+
+La fuente se compila una vez con ``compile()`` y el objeto de código se
+guarda por hash de máquina. El resultado (veredicto, pasos, cinta) es
+idéntico al de ``CompiledMachine.run``; se respetan los límites de pasos,
+celdas y tiempo, pero no hay detección de ciclos.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from engine import CLOCK_EVERY, HALT_REJECT, NO_RULE
+from tape import Tape
+
+# Máquinas distintas cuyo código se conserva por proceso
+CACHE_SIZE = 256
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _emit_step(out, pad, write, read, move):
+    if write != read:
+        out.append(f'{pad}cells[head] = {write}')
+    if move:
+        out.append(f'{pad}head += {move}')
+    out.append(f'{pad}steps += 1')
+
+
+def _emit_grow(out, pad):
+    out.append(f'{pad}if not 0 <= head < n:')
+    out.append(f'{pad}    if 2 * n > max_cells:')
+    out.append(f"{pad}        return None, steps, state, head, 'tape'")
+    out.append(f'{pad}    head = tape.grow(head)')
+    out.append(f'{pad}    n = len(cells)')
+
+
+def generate_source(tm):
+    """Fuente de ``run(tape, max_steps, max_cells, deadline)`` para la máquina compilada ``tm``.
+
+    La función retorna ``(halt, pasos, estado, cabezal, presupuesto)`` con el
+    cabezal como índice en ``tape.cells``; ``halt`` es ``None`` si se agotó
+    un presupuesto.
+    """
+    nsym = tm.nsym
+    out = [
+        f'# {tm.hash}',
+        'def run(tape, max_steps, max_cells, deadline):',
+        '    cells = tape.cells',
+        '    n = len(cells)',
+        '    head = 0',
+        '    steps = 0',
+        f'    state = {tm.start}',
+        # Un solo límite por paso: el menor entre el de pasos y la próxima consulta del reloj
+        f'    limit = max_steps if deadline is None else min(max_steps, {CLOCK_EVERY})',
+        '    while True:',
+    ]
+    first = True
+    for state in range(len(tm.states)):
+        if tm.halt[state]:
+            continue
+        row = state * nsym
+        rules = [(sym, tm.table[row + sym]) for sym in range(nsym) if tm.table[row + sym][2] != NO_RULE]
+        out.append(f"        {'if' if first else 'elif'} state == {state}:")
+        first = False
+        out.append('            while True:')
+        out.append('                if steps >= limit:')
+        out.append('                    if steps >= max_steps:')
+        out.append("                        return None, steps, state, head, 'steps'")
+        out.append('                    if time.monotonic() > deadline:')
+        out.append("                        return None, steps, state, head, 'time'")
+        out.append(f'                    limit = min(max_steps, steps + {CLOCK_EVERY})')
+        out.append('                sym = cells[head]')
+        # Autolazos primero: son los pasos más frecuentes (barridos)
+        rules.sort(key=lambda r: r[1][2] != row)
+        keyword = 'if'
+        for sym, (write, move, nxt) in rules:
+            out.append(f'                {keyword} sym == {sym}:')
+            keyword = 'elif'
+            pad = ' ' * 20
+            _emit_step(out, pad, write, sym, move)
+            if nxt < 0:
+                target = -2 - nxt
+                out.append(f'{pad}return {tm.halt[target]}, steps, {target}, head, None')
+                continue
+            if nxt != row:
+                out.append(f'{pad}state = {nxt // nsym}')
+            if move:
+                _emit_grow(out, pad)
+            out.append(f"{pad}{'continue' if nxt == row else 'break'}")
+        pad = ' ' * 16 if keyword == 'if' else ' ' * 20
+        if keyword == 'elif':
+            out.append('                else:')
+        out.append(f'{pad}return {HALT_REJECT}, steps, state, head, None')
+    if first:
+        # Solo estados de parada: ``run_generated`` resuelve el caso sin llamar a la función
+        out.append('        pass')
+    return '\n'.join(out) + '\n'
+
+
+def get_runner(tm):
+    """Función generada para ``tm``; se compila la primera vez que se pide cada hash."""
+    with _lock:
+        entry = _cache.get(tm.hash)
+        if entry is not None:
+            _cache.move_to_end(tm.hash)
+            return entry[1]
+    code = compile(generate_source(tm), f'<tm {tm.hash[:12]}>', 'exec')
+    namespace = {'time': time}
+    exec(code, namespace)
+    with _lock:
+        _cache[tm.hash] = (code, namespace['run'])
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return namespace['run']
+
+
+def run_generated(tm, text, max_steps, max_cells=None, max_seconds=None):
+    """Como ``tm.run(text, max_steps)`` pero con el código generado."""
+    tape = Tape(tm.encode(text))
+    if tm.halt[tm.start]:
+        return tm._result(tm.halt[tm.start], 0, tm.start, tape, 0)
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    halt, steps, state, head, budget = get_runner(tm)(tape, max_steps, max_cells or float('inf'), deadline)
+    return tm._result(halt, steps, state, tape, head - tape.origin, budget)
@@ -0,0 +1,881 @@
+"""Motor de simulación de Máquinas de Turing del lado del servidor.
+
+Una definición con la forma usada en ``MACHINE_LIBRARY`` (``states``,
+``transitions``, ``accept``, ``reject``, ``blank``) se compila una sola vez
+a tablas indexadas por enteros; la ejecución recorre esas tablas sin
+búsquedas en diccionarios ni comparaciones de cadenas por paso.
+"""
+
+import hashlib
+import json
+import random
+import re
+import time
+
+from tape import RunLengthTape, Tape
+from validate import alternatives, analyze_definition, is_nondeterministic
+
+ACCEPT = 'ACCEPT'
+REJECT = 'REJECT'
+LOOP = 'LOOP'
+BUDGET_EXCEEDED = 'BUDGET_EXCEEDED'
+
+# Movimientos del cabezal
+MOVES = {'L': -1, 'R': 1, 'N': 0}
+
+# Tipo de estado en la tabla ``halt``; ``HALT_LOOP`` solo se usa en los resultados
+RUNNING, HALT_ACCEPT, HALT_REJECT, HALT_LOOP = 0, 1, 2, 3
+VERDICTS = {HALT_ACCEPT: ACCEPT, HALT_REJECT: REJECT, HALT_LOOP: LOOP}
+
+# Código de ``siguiente`` para pares (estado, símbolo) sin transición
+NO_RULE = -1
+
+# Cómo se muestra en la cinta un símbolo de entrada fuera del alfabeto (ver ``CompiledMachine.encode``)
+FOREIGN = '\ufffd'
+
+DEFAULT_MAX_STEPS = 10_000_000
+DEFAULT_MAX_CELLS = 1 << 22
+DEFAULT_MAX_SECONDS = 5.0
+
+# Cada cuántos pasos el ciclo vigilado consulta el reloj
+CLOCK_EVERY = 1 << 14
+
+
+def machine_hash(definition):
+    """Hash canónico de una definición: independiente del orden de las claves."""
+    canonical = json.dumps(definition, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class Configuration:
+    """Configuración reanudable: estado, cabezal (índice en ``tape.cells``), cinta y pasos.
+
+    ``halt`` es ``RUNNING`` mientras la máquina no se haya detenido.
+    """
+
+    __slots__ = ('state', 'head', 'tape', 'steps', 'halt')
+
+    def __init__(self, state, head, tape, steps=0, halt=RUNNING):
+        self.state = state
+        self.head = head
+        self.tape = tape
+        self.steps = steps
+        self.halt = halt
+
+    def __getstate__(self):
+        return (self.state, self.head, self.tape.cells, self.tape.origin, self.steps, self.halt)
+
+    def __setstate__(self, data):
+        self.state, self.head, cells, origin, self.steps, self.halt = data
+        self.tape = Tape(cells)
+        self.tape.origin = origin
+
+
+class CompiledMachine:
+    """Máquina compilada a tablas planas indexadas por ``estado * nsym + símbolo``.
+
+    El símbolo blanco siempre tiene índice 0, así que una cinta nueva es
+    simplemente ``bytearray(n)``. Las transiciones inexistentes tienen
+    ``next == -1``.
+    """
+
+    tapes = 1
+    deterministic = True
+
+    def __init__(self, definition):
+        # La validación va primero: el resto del constructor supone una definición bien formada
+        self.analysis = analyze_definition(definition)
+        if not self.analysis['valid']:
+            raise ValueError('Definición de máquina inválida: ' + '; '.join(self.analysis['errors']))
+        blank = definition.get('blank', '_')
+        transitions = definition.get('transitions', {})
+
+        states = list(definition.get('states', []))
+        for name in [definition['start'], *definition.get('accept', []), *definition.get('reject', [])]:
+            if name not in states:
+                states.append(name)
+        symbols = [blank]
+        for state, rules in transitions.items():
+            if state not in states:
+                states.append(state)
+            for sym, rule in rules.items():
+                for write, move, nxt in alternatives(rule):
+                    for s in (sym, write):
+                        if s not in symbols:
+                            symbols.append(s)
+                    if nxt not in states:
+                        states.append(nxt)
+        if len(symbols) > 255:
+            raise ValueError('La máquina usa más de 255 símbolos de cinta')
+
+        self.definition = definition
+        self.hash = machine_hash(definition)
+        self.blank = blank
+        self.states = states
+        # La última columna es la de los símbolos de entrada fuera del alfabeto: no tiene reglas
+        self.symbols = symbols + [FOREIGN]
+        self.state_index = {s: i for i, s in enumerate(states)}
+        self.symbol_index = {s: i for i, s in enumerate(symbols)}
+        self.nsym = nsym = len(self.symbols)
+        self.start = self.state_index[definition['start']]
+
+        self.halt = bytearray(len(states))
+        for name in definition.get('accept', []):
+            self.halt[self.state_index[name]] = HALT_ACCEPT
+        for name in definition.get('reject', []):
+            self.halt[self.state_index[name]] = HALT_REJECT
+
+        # Cada celda de ``table`` es ``(escribir, mover, siguiente)``. Para que el
+        # ciclo principal haga una sola comparación por paso, ``siguiente`` es
+        # el desplazamiento de fila (``estado * nsym``) cuando el estado destino
+        # sigue ejecutando, ``-2 - estado`` cuando es de parada y ``NO_RULE``
+        # cuando no existe transición.
+        self.table = [(0, 0, NO_RULE)] * (len(states) * nsym)
+        for state, rules in transitions.items():
+            base = self.state_index[state] * nsym
+            for sym, rule in rules.items():
+                for write, move, nxt in alternatives(rule):
+                    target = self.state_index[nxt]
+                    code = -2 - target if self.halt[target] else target * nsym
+                    self.table[base + self.symbol_index[sym]] = (self.symbol_index[write], MOVES[move], code)
+
+        self.sweeps = self._find_sweeps()
+
+    def _find_sweeps(self):
+        """Detecta los barridos: autolazos que reescriben el mismo símbolo y mueven el cabezal.
+
+        Para cada estado y dirección, los símbolos con ``δ(q, x) = (x, d, q)``
+        forman un conjunto; mientras el cabezal lea símbolos de ese conjunto la
+        máquina solo avanza en ``d``. ``sweeps[fila + x]`` es ``(d, símbolos,
+        patrón)`` para esos pares y ``None`` para el resto.
+        """
+        nsym = self.nsym
+        sweeps = [None] * len(self.table)
+        for state in range(len(self.states)):
+            row = state * nsym
+            for d in (-1, 1):
+                loop = bytes(x for x in range(nsym)
+                             if self.table[row + x] == (x, d, row) and not self.halt[state])
+                if not loop:
+                    continue
+                stop = re.compile(b'[^' + b''.join(re.escape(bytes((x,))) for x in loop) + b']')
+                for x in loop:
+                    sweeps[row + x] = (d, loop, stop)
+        return sweeps
+
+    def encode(self, text):
+        """Convierte una cadena de entrada en una cinta de índices de símbolo.
+
+        Los símbolos que no están en el alfabeto de cinta van a la última
+        columna, que no tiene reglas: como en el simulador del navegador, la
+        máquina rechaza al leerlos. En la cinta del resultado se muestran como
+        ``FOREIGN``.
+        """
+        index, foreign = self.symbol_index, self.nsym - 1
+        return bytearray(index.get(ch, foreign) for ch in text)
+
+    def decode(self, cells):
+        """Convierte índices de símbolo de vuelta a texto."""
+        symbols = self.symbols
+        return ''.join(symbols[c] for c in cells)
+
+    def run(self, text, max_steps=DEFAULT_MAX_STEPS, rle=False, accelerate=False,
+            detect_loops=False, max_cells=None, max_seconds=None, codegen=False):
+        """Ejecuta la máquina sobre ``text`` y retorna el veredicto y la cinta final.
+
+        Un paso es una transición aplicada; si no hay regla para el par
+        (estado, símbolo) la máquina rechaza sin contar ese paso. Con
+        ``rle=True`` la cinta se guarda comprimida por corridas; con
+        ``accelerate=True`` los barridos de autolazos se ejecutan en bloque
+        (solo sobre la cinta densa). ``detect_loops``, ``max_cells`` y
+        ``max_seconds`` activan el ciclo vigilado (ver ``_run_guarded``). Los
+        modos ``rle``, ``accelerate`` y ``codegen`` (el código generado para
+        esta máquina, ver ``codegen``) respetan los límites de pasos, celdas y
+        tiempo pero no detectan ciclos: con ``detect_loops`` se usa el ciclo
+        vigilado en su lugar, porque es el único que puede responder ``LOOP``.
+        """
+        if detect_loops:
+            return self._run_guarded(text, max_steps, detect_loops, max_cells, max_seconds)
+        if rle:
+            return self._run_rle(text, max_steps, max_cells, max_seconds)
+        if accelerate:
+            return self._run_accelerated(text, max_steps, max_cells, max_seconds)
+        if codegen:
+            from codegen import run_generated  # codegen importa este módulo
+            return run_generated(self, text, max_steps, max_cells, max_seconds)
+        if max_cells or max_seconds:
+            return self._run_guarded(text, max_steps, detect_loops, max_cells, max_seconds)
+        tape = Tape(self.encode(text))
+        cells = tape.cells
+        n = len(cells)
+        head = 0
+        state = self.start
+        table, nsym = self.table, self.nsym
+
+        steps = 0
+        if self.halt[state]:
+            return self._result(self.halt[state], steps, state, tape, 0)
+
+        row = state * nsym
+        for steps in range(1, max_steps + 1):
+            write, move, nxt = table[row + cells[head]]
+            if nxt < 0:
+                break
+            cells[head] = write
+            head += move
+            row = nxt
+            if not 0 <= head < n:
+                head = tape.grow(head)
+                n = len(cells)
+        else:
+            return self._result(None, steps, row // nsym, tape, head - tape.origin)
+
+        if nxt == NO_RULE:
+            return self._result(HALT_REJECT, steps - 1, row // nsym, tape, head - tape.origin)
+        cells[head] = write
+        state = -2 - nxt
+        return self._result(self.halt[state], steps, state, tape, head + move - tape.origin)
+
+    def initial_config(self, text):
+        """Configuración inicial para ``text``."""
+        return Configuration(self.start, 0, Tape(self.encode(text)), halt=self.halt[self.start])
+
+    def advance(self, config, max_steps):
+        """Ejecuta hasta ``max_steps`` pasos más sobre ``config`` (que se modifica) y la retorna.
+
+        Permite ejecutar una corrida larga por tramos, consultando el progreso
+        o cancelando entre uno y otro.
+        """
+        if config.halt:
+            return config
+        tape = config.tape
+        cells = tape.cells
+        n = len(cells)
+        head = config.head
+        table, nsym = self.table, self.nsym
+        row = config.state * nsym
+        done = 0
+        for done in range(1, max_steps + 1):
+            write, move, nxt = table[row + cells[head]]
+            if nxt < 0:
+                if nxt == NO_RULE:
+                    done -= 1
+                    config.halt = HALT_REJECT
+                else:
+                    cells[head] = write
+                    head += move
+                    row = (-2 - nxt) * nsym
+                    config.halt = self.halt[-2 - nxt]
+                break
+            cells[head] = write
+            head += move
+            row = nxt
+            if not 0 <= head < n:
+                head = tape.grow(head)
+                n = len(cells)
+        config.state = row // nsym
+        config.head = head
+        config.steps += done
+        return config
+
+    def result(self, config, budget='steps'):
+        """Resultado (como el de ``run``) de una configuración; ``budget`` es el límite que la detuvo."""
+        return self._result(config.halt or None, config.steps, config.state, config.tape,
+                            config.head - config.tape.origin, budget)
+
+    def _run_guarded(self, text, max_steps, detect_loops, max_cells, max_seconds):
+        """Ciclo con presupuestos de pasos, celdas y tiempo, y detección de ciclos.
+
+        Se mantiene una huella de la cinta que se actualiza en O(1) por paso
+        (suma de ``símbolo * peso[posición]`` con pesos aleatorios), y se
+        aplica el algoritmo de Brent: la configuración (estado, cabezal,
+        huella) se guarda en los pasos potencia de dos y cada paso se compara
+        con la guardada. Si coinciden se verifica la cinta completa antes de
+        responder ``LOOP``, así que el veredicto es exacto. También se
+        reconoce en O(1) el barrido infinito sobre blancos fuera de la cinta.
+        """
+        tape = Tape(self.encode(text))
+        cells = tape.cells
+        n = len(cells)
+        head = 0
+        state = self.start
+        table, nsym, sweeps = self.table, self.nsym, self.sweeps
+        max_cells = max_cells or float('inf')
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+
+        if self.halt[state]:
+            return self._result(self.halt[state], 0, state, tape, 0)
+
+        rand = random.Random(0).getrandbits
+        weights = [rand(61) for _ in range(n)]
+        fingerprint = sum(c * w for c, w in zip(cells, weights))
+        row = state * nsym
+        saved_row, saved_pos, saved_fp = row, 0, fingerprint
+        saved_tape = self._normalized(tape)
+        # Próximo paso en que toca guardar configuración (Brent) o mirar el reloj
+        next_save = 1 if detect_loops else max_steps + 1
+        next_clock = CLOCK_EVERY if deadline is not None else max_steps + 1
+        next_check = min(next_save, next_clock)
+
+        steps = 0
+        for steps in range(1, max_steps + 1):
+            write, move, nxt = table[row + cells[head]]
+            if nxt < 0:
+                break
+            fingerprint += (write - cells[head]) * weights[head]
+            cells[head] = write
+            head += move
+            row = nxt
+            if not 0 <= head < n:
+                sweep = sweeps[row]
+                if sweep is not None and sweep[0] == move:
+                    # Autolazo sobre blanco hacia afuera de la cinta: nunca vuelve
+                    return self._result(HALT_LOOP, steps, row // nsym, tape, head - tape.origin)
+                if 2 * n > max_cells:
+                    return self._result(None, steps, row // nsym, tape, head - tape.origin, budget='tape')
+                origin = tape.origin
+                head = tape.grow(head)
+                extra = len(cells) - n
+                if tape.origin != origin:
+                    weights[:0] = [rand(61) for _ in range(extra)]
+                else:
+                    weights.extend(rand(61) for _ in range(extra))
+                n = len(cells)
+            if (fingerprint == saved_fp and row == saved_row and head - tape.origin == saved_pos
+                    and detect_loops and self._normalized(tape) == saved_tape):
+                return self._result(HALT_LOOP, steps, row // nsym, tape, head - tape.origin)
+            if steps >= next_check:
+                if steps == next_save:
+                    saved_row, saved_pos, saved_fp = row, head - tape.origin, fingerprint
+                    saved_tape = self._normalized(tape)
+                    next_save *= 2
+                if steps == next_clock:
+                    if time.monotonic() > deadline:
+                        return self._result(None, steps, row // nsym, tape, head - tape.origin, budget='time')
+                    next_clock += CLOCK_EVERY
+                next_check = min(next_save, next_clock)
+        else:
+            return self._result(None, steps, row // nsym, tape, head - tape.origin)
+
+        if nxt == NO_RULE:
+            return self._result(HALT_REJECT, steps - 1, row // nsym, tape, head - tape.origin)
+        cells[head] = write
+        state = -2 - nxt
+        return self._result(self.halt[state], steps, state, tape, head + move - tape.origin)
+
+    @staticmethod
+    def _normalized(tape):
+        """Contenido no blanco de la cinta junto con la posición donde empieza."""
+        cells, start = tape.export()
+        stripped = cells.lstrip(b'\0')
+        if not stripped:
+            return b'', 0
+        return stripped.rstrip(b'\0'), start + len(cells) - len(stripped)
+
+    def profile(self, text, max_steps=DEFAULT_MAX_STEPS, max_cells=None, max_seconds=None):
+        """Ejecuta con contadores por transición y retorna dónde se gastan los pasos.
+
+        El único costo extra por paso es incrementar ``counts[i]`` en una
+        lista indexada como ``table``. El recorrido del cabezal y los pasos por
+        estado se derivan de esos contadores al final; el tiempo por estado se
+        estima repartiendo el tiempo total según los pasos, porque en este
+        intérprete todos los pasos cuestan lo mismo. ``max_cells`` y
+        ``max_seconds`` se revisan como en ``_run_guarded``.
+        """
+        tape = Tape(self.encode(text))
+        cells = tape.cells
+        n = len(cells)
+        head = 0
+        state = self.start
+        table, nsym = self.table, self.nsym
+        counts = [0] * len(table)
+        max_cells = max_cells or float('inf')
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        next_clock = CLOCK_EVERY if deadline is not None else max_steps + 1
+        started = time.perf_counter()
+
+        steps = 0
+        if self.halt[state]:
+            result = self._result(self.halt[state], steps, state, tape, 0)
+        else:
+            row = state * nsym
+            # Un código de fila (>= 0) al salir del ciclo significa que se agotó un presupuesto
+            nxt, budget = row, 'steps'
+            for steps in range(1, max_steps + 1):
+                i = row + cells[head]
+                write, move, nxt = table[i]
+                if nxt < 0:
+                    break
+                counts[i] += 1
+                cells[head] = write
+                head += move
+                row = nxt
+                if not 0 <= head < n:
+                    if 2 * n > max_cells:
+                        budget = 'tape'
+                        break
+                    head = tape.grow(head)
+                    n = len(cells)
+                if steps == next_clock:
+                    if time.monotonic() > deadline:
+                        budget = 'time'
+                        break
+                    next_clock += CLOCK_EVERY
+            if nxt >= 0:
+                result = self._result(None, steps, row // nsym, tape, head - tape.origin, budget)
+            elif nxt == NO_RULE:
+                result = self._result(HALT_REJECT, steps - 1, row // nsym, tape, head - tape.origin)
+            else:
+                counts[i] += 1
+                cells[head] = write
+                state = -2 - nxt
+                result = self._result(self.halt[state], steps, state, tape, head + move - tape.origin)
+        elapsed = time.perf_counter() - started
+        return {**result, **self._profile_report(counts, result['steps'], elapsed)}
+
+    def _profile_report(self, counts, steps, elapsed):
+        nsym = self.nsym
+        hottest = max(counts, default=0) or 1
+        transitions, states, heatmap = [], {}, {}
+        for state_id, name in enumerate(self.states):
+            row = state_id * nsym
+            state_steps = state_travel = 0
+            for sym in range(nsym):
+                count = counts[row + sym]
+                if not count:
+                    continue
+                travel = count * abs(self.table[row + sym][1])
+                state_steps += count
+                state_travel += travel
+                transitions.append({'state': name, 'symbol': self.symbols[sym], 'count': count,
+                                    'share': count / steps})
+                heatmap.setdefault(name, {})[self.symbols[sym]] = count / hottest
+            if state_steps:
+                states[name] = {'steps': state_steps, 'share': state_steps / steps,
+                                'seconds': elapsed * state_steps / steps, 'travel': state_travel}
+        transitions.sort(key=lambda t: -t['count'])
+        return {
+            'seconds': elapsed,
+            'steps_per_second': steps / elapsed if elapsed else None,
+            'travel': sum(s['travel'] for s in states.values()),
+            'states': states,
+            'transitions': transitions,
+            'heatmap': heatmap,
+        }
+
+    def _run_accelerated(self, text, max_steps, max_cells=None, max_seconds=None):
+        """Como ``run`` pero ejecuta cada barrido completo en una sola operación.
+
+        El barrido se resuelve buscando el siguiente símbolo que no pertenece
+        al conjunto del autolazo (``re`` hacia la derecha, ``rstrip`` por
+        ventanas crecientes hacia la izquierda); los pasos se suman igual que
+        si se hubieran ejecutado uno a uno. Los presupuestos de celdas y
+        tiempo se revisan como en ``_run_guarded``; un barrido sobre blancos
+        que sale de la cinta nunca termina y se reporta como presupuesto
+        ``'tape'`` al llegar al borde.
+        """
+        tape = Tape(self.encode(text))
+        cells = tape.cells
+        n = len(cells)
+        head = 0
+        state = self.start
+        table, nsym, sweeps = self.table, self.nsym, self.sweeps
+        max_cells = max_cells or float('inf')
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        next_clock = CLOCK_EVERY if deadline is not None else float('inf')
+
+        if self.halt[state]:
+            return self._result(self.halt[state], 0, state, tape, 0)
+
+        row = state * nsym
+        steps = 0
+        while steps < max_steps:
+            if steps >= next_clock:
+                if time.monotonic() > deadline:
+                    return self._result(None, steps, row // nsym, tape, head - tape.origin, budget='time')
+                next_clock = steps + CLOCK_EVERY
+            i = row + cells[head]
+            sweep = sweeps[i]
+            if sweep is not None:
+                d, loop, stop = sweep
+                if d > 0:
+                    m = stop.search(cells, head)
+                    k = (m.start() if m else n) - head
+                else:
+                    end, width = head + 1, 64
+                    while True:
+                        lo = max(0, end - width)
+                        rest = cells[lo:end].rstrip(loop)
+                        if rest:
+                            k = head - (lo + len(rest) - 1)
+                            break
+                        if lo == 0:
+                            k = head + 1
+                            break
+                        end, width = lo, width * 2
+                remaining = max_steps - steps
+                if k >= remaining:
+                    # El barrido no termina dentro del presupuesto de pasos
+                    steps = max_steps
+                    head += d * remaining
+                    break
+                if 0 in loop and not 0 <= head + d * k < n:
+                    # Recorre blancos para siempre: la cinta crecería sin límite
+                    return self._result(None, steps + k, row // nsym, tape, head + d * k - tape.origin,
+                                        budget='tape')
+                steps += k
+                head += d * k
+                if not 0 <= head < n:
+                    if 2 * n > max_cells:
+                        return self._result(None, steps, row // nsym, tape, head - tape.origin, budget='tape')
+                    head = tape.grow(head)
+                    n = len(cells)
+                continue
+
+            write, move, nxt = table[i]
+            if nxt < 0:
+                if nxt == NO_RULE:
+                    return self._result(HALT_REJECT, steps, row // nsym, tape, head - tape.origin)
+                cells[head] = write
+                state = -2 - nxt
+                return self._result(self.halt[state], steps + 1, state, tape, head + move - tape.origin)
+            steps += 1
+            cells[head] = write
+            head += move
+            row = nxt
+            if not 0 <= head < n:
+                if 2 * n > max_cells:
+                    return self._result(None, steps, row // nsym, tape, head - tape.origin, budget='tape')
+                head = tape.grow(head)
+                n = len(cells)
+        return self._result(None, steps, row // nsym, tape, head - tape.origin)
+
+    def _run_rle(self, text, max_steps, max_cells=None, max_seconds=None):
+        """Como ``run`` sobre una ``RunLengthTape``.
+
+        Las celdas visitadas (``tape.size``) y el reloj se revisan cada
+        ``CLOCK_EVERY`` pasos, así que la cinta puede pasar de ``max_cells``
+        en a lo sumo ese número de celdas.
+        """
+        tape = RunLengthTape(self.encode(text))
+        state = self.start
+        table, nsym = self.table, self.nsym
+        read, write_cell, move_head = tape.read, tape.write, tape.move
+        max_cells = max_cells or float('inf')
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        next_check = CLOCK_EVERY
+
+        steps = 0
+        if self.halt[state]:
+            return self._result(self.halt[state], steps, state, tape, 0)
+
+        row = state * nsym
+        for steps in range(1, max_steps + 1):
+            write, move, nxt = table[row + read()]
+            if nxt == NO_RULE:
+                return self._result(HALT_REJECT, steps - 1, row // nsym, tape, tape.pos)
+            write_cell(write)
+            move_head(move)
+            if nxt < 0:
+                state = -2 - nxt
+                return self._result(self.halt[state], steps, state, tape, tape.pos)
+            row = nxt
+            if steps == next_check:
+                if tape.size > max_cells:
+                    return self._result(None, steps, row // nsym, tape, tape.pos, budget='tape')
+                if deadline is not None and time.monotonic() > deadline:
+                    return self._result(None, steps, row // nsym, tape, tape.pos, budget='time')
+                next_check += CLOCK_EVERY
+        return self._result(None, steps, row // nsym, tape, tape.pos)
+
+    def trace(self, text='', every=1, max_steps=DEFAULT_MAX_STEPS, config=None, max_cells=None, max_seconds=None):
+        """Generador de pasos: produce solo el cambio de cada paso, no la cinta completa.
+
+        Cada registro tiene el número de paso, la posición escrita (relativa al
+        primer símbolo de la entrada), el símbolo escrito, el movimiento y el
+        nuevo estado. Con ``every > 1`` solo se produce uno de cada ``every``
+        pasos; el último registro siempre es el veredicto, con ``budget`` si
+        es ``BUDGET_EXCEEDED``. Si se da ``config`` se continúa desde esa
+        configuración (que se modifica) en vez de empezar con ``text``.
+        ``max_cells`` y ``max_seconds`` se revisan como en ``_run_guarded``;
+        el plazo incluye el tiempo que el consumidor tarda en pedir registros.
+        """
+        if config is None:
+            config = self.initial_config(text)
+        tape = config.tape
+        cells = tape.cells
+        n = len(cells)
+        head = config.head
+        table, nsym, halt = self.table, self.nsym, self.halt
+        symbols, states = self.symbols, self.states
+        moves = {-1: 'L', 0: 'N', 1: 'R'}
+        max_cells = max_cells or float('inf')
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        next_clock = config.steps + CLOCK_EVERY if deadline is not None else float('inf')
+
+        state = config.state
+        first = steps = config.steps
+        yield {'step': steps, 'state': states[state], 'head': head - tape.origin}
+        if halt[state]:
+            yield {'result': VERDICTS[halt[state]], 'steps': steps}
+            return
+
+        row = state * nsym
+        verdict, budget = BUDGET_EXCEEDED, 'steps'
+        for steps in range(first + 1, first + max_steps + 1):
+            write, move, nxt = table[row + cells[head]]
+            if nxt == NO_RULE:
+                steps -= 1
+                verdict = REJECT
+                break
+            pos = head - tape.origin
+            cells[head] = write
+            head += move
+            state = nxt // nsym if nxt >= 0 else -2 - nxt
+            if steps % every == 0 or nxt < 0:
+                yield {'step': steps, 'pos': pos, 'write': symbols[write],
+                       'move': moves[move], 'state': states[state]}
+            if nxt < 0:
+                verdict = VERDICTS[halt[state]]
+                break
+            row = nxt
+            if not 0 <= head < n:
+                if 2 * n > max_cells:
+                    budget = 'tape'
+                    break
+                head = tape.grow(head)
+                n = len(cells)
+            if steps >= next_clock:
+                if time.monotonic() > deadline:
+                    budget = 'time'
+                    break
+                next_clock += CLOCK_EVERY
+        config.state, config.head, config.steps = state, head, steps
+        yield {'result': verdict, 'steps': steps, **({'budget': budget} if verdict == BUDGET_EXCEEDED else {})}
+
+    def _result(self, halt, steps, state, tape, head, budget='steps'):
+        """Arma el resultado; ``head`` es la posición relativa al inicio de la entrada."""
+        verdict = VERDICTS.get(halt, BUDGET_EXCEEDED)
+        cells, start = tape.export()
+        left = len(cells) - len(cells.lstrip(b'\0'))
+        right = len(cells.rstrip(b'\0'))
+        if left >= right:
+            # Cinta en blanco: se ubica en el cabezal para no depender del buffer
+            left = right = head - start
+        return {
+            'result': verdict,
+            'steps': steps,
+            'state': self.states[state],
+            'head': head - start - left,
+            'tape': self.decode(cells[left:right]),
+            'offset': start + left,
+            **({'budget': budget} if verdict == BUDGET_EXCEEDED else {}),
+        }
+
+
+class MultiTapeMachine:
+    """Máquina de ``k`` cintas, cada una con su propio cabezal.
+
+    En la definición, ``"tapes": k`` y cada transición se escribe como en una
+    cinta pero con palabras de ``k`` caracteres: ``δ(q, "a_") = ["aa", "RR",
+    "q"]`` lee ``a`` en la cinta 0 y blanco en la 1, escribe ``a`` en ambas y
+    mueve los dos cabezales a la derecha. La entrada va en la cinta 0 y las
+    demás empiezan en blanco.
+
+    La tabla es un diccionario indexado por ``estado * nsym**k + código`` con
+    ``código = Σ símbolo_i * nsym**i`` (la tabla densa crecería como
+    ``nsym**k``); ``siguiente`` se codifica igual que en ``CompiledMachine``.
+    Solo hay ejecución directa con presupuestos de pasos, celdas y tiempo:
+    los modos RLE, acelerado, la detección de ciclos y las herramientas que
+    recorren la tabla de una cinta no aplican.
+    """
+
+    deterministic = True
+
+    def __init__(self, definition):
+        self.analysis = analyze_definition(definition)
+        if not self.analysis['valid']:
+            raise ValueError('Definición de máquina inválida: ' + '; '.join(self.analysis['errors']))
+        self.tapes = k = definition['tapes']
+        blank = definition.get('blank', '_')
+        transitions = definition.get('transitions', {})
+
+        states = list(definition.get('states', []))
+        for name in [definition['start'], *definition.get('accept', []), *definition.get('reject', [])]:
+            if name not in states:
+                states.append(name)
+        symbols = [blank]
+        for state, rules in transitions.items():
+            if state not in states:
+                states.append(state)
+            for read, rule in rules.items():
+                for write, _, nxt in alternatives(rule):
+                    for s in read + write:
+                        if s not in symbols:
+                            symbols.append(s)
+                    if nxt not in states:
+                        states.append(nxt)
+        if len(symbols) > 255:
+            raise ValueError('La máquina usa más de 255 símbolos de cinta')
+
+        self.definition = definition
+        self.hash = machine_hash(definition)
+        self.blank = blank
+        self.states = states
+        # La última columna es la de los símbolos de entrada fuera del alfabeto: no tiene reglas
+        self.symbols = symbols + [FOREIGN]
+        self.state_index = {s: i for i, s in enumerate(states)}
+        self.symbol_index = {s: i for i, s in enumerate(symbols)}
+        self.nsym = nsym = len(self.symbols)
+        self.weights = [nsym ** i for i in range(k)]
+        self.stride = stride = nsym ** k
+        self.start = self.state_index[definition['start']]
+
+        self.halt = bytearray(len(states))
+        for name in definition.get('accept', []):
+            self.halt[self.state_index[name]] = HALT_ACCEPT
+        for name in definition.get('reject', []):
+            self.halt[self.state_index[name]] = HALT_REJECT
+
+        self.table = {}
+        for state, rules in transitions.items():
+            base = self.state_index[state] * stride
+            for read, rule in rules.items():
+                for write, move, nxt in alternatives(rule):
+                    target = self.state_index[nxt]
+                    code = sum(self.symbol_index[s] * w for s, w in zip(read, self.weights))
+                    self.table[base + code] = (
+                        tuple(self.symbol_index[s] for s in write),
+                        tuple(MOVES[m] for m in move),
+                        -2 - target if self.halt[target] else target * stride,
+                    )
+
+    encode = CompiledMachine.encode
+    decode = CompiledMachine.decode
+
+    def run(self, text, max_steps=DEFAULT_MAX_STEPS, rle=False, accelerate=False,
+            detect_loops=False, max_cells=None, max_seconds=None, codegen=False):
+        """Ejecuta sobre ``text`` con los mismos veredictos y conteo de pasos que ``CompiledMachine.run``.
+
+        ``detect_loops`` se ignora; ``rle``, ``accelerate`` y ``codegen`` no
+        existen para varias cintas.
+        """
+        if rle or accelerate or codegen:
+            raise ValueError('Los modos RLE, acelerado y de código generado solo admiten máquinas de una cinta')
+        tapes = [Tape(self.encode(text))] + [Tape() for _ in range(self.tapes - 1)]
+        cells = [t.cells for t in tapes]
+        heads = [0] * self.tapes
+        lanes = range(self.tapes)
+        weights = self.weights
+        get = self.table.get
+        stride = self.stride
+        max_cells = max_cells or float('inf')
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        next_clock = CLOCK_EVERY if deadline is not None else max_steps + 1
+
+        state = self.start
+        if self.halt[state]:
+            return self._result(self.halt[state], 0, state, tapes, heads)
+        if self.tapes == 2:
+            return self._run_two(tapes, max_steps, max_cells, deadline)
+
+        row = state * stride
+        halt = None
+        budget = 'steps'
+        steps = 0
+        while steps < max_steps:
+            code = row
+            for i in lanes:
+                code += cells[i][heads[i]] * weights[i]
+            rule = get(code)
+            if rule is None:
+                halt = HALT_REJECT
+                break
+            writes, moves, nxt = rule
+            steps += 1
+            for i in lanes:
+                h = heads[i]
+                cells[i][h] = writes[i]
+                h += moves[i]
+                if not 0 <= h < len(cells[i]):
+                    if nxt >= 0 and 2 * sum(map(len, cells)) > max_cells:
+                        heads[i] = h
+                        return self._result(None, steps, nxt // stride, tapes, heads, budget='tape')
+                    h = tapes[i].grow(h)
+                heads[i] = h
+            if nxt < 0:
+                state = -2 - nxt
+                return self._result(self.halt[state], steps, state, tapes, heads)
+            row = nxt
+            if steps == next_clock:
+                if time.monotonic() > deadline:
+                    budget = 'time'
+                    break
+                next_clock += CLOCK_EVERY
+        return self._result(halt, steps, row // stride, tapes, heads, budget)
+
+    def _run_two(self, tapes, max_steps, max_cells, deadline):
+        """El ciclo de ``run`` desenrollado para dos cintas, el caso común."""
+        t0, t1 = tapes
+        c0, c1 = t0.cells, t1.cells
+        n0, n1 = len(c0), len(c1)
+        h0 = h1 = 0
+        nsym, stride, get = self.nsym, self.stride, self.table.get
+        row = self.start * stride
+        next_clock = CLOCK_EVERY if deadline is not None else max_steps + 1
+        halt = None
+        budget = 'steps'
+        steps = 0
+        while steps < max_steps:
+            rule = get(row + c0[h0] + c1[h1] * nsym)
+            if rule is None:
+                halt = HALT_REJECT
+                break
+            (w0, w1), (m0, m1), nxt = rule
+            steps += 1
+            c0[h0] = w0
+            c1[h1] = w1
+            h0 += m0
+            h1 += m1
+            if not (0 <= h0 < n0 and 0 <= h1 < n1):
+                if nxt >= 0 and 2 * (n0 + n1) > max_cells:
+                    return self._result(None, steps, nxt // stride, tapes, [h0, h1], budget='tape')
+                h0, h1 = t0.grow(h0), t1.grow(h1)
+                n0, n1 = len(c0), len(c1)
+            if nxt < 0:
+                state = -2 - nxt
+                return self._result(self.halt[state], steps, state, tapes, [h0, h1])
+            row = nxt
+            if steps == next_clock:
+                if time.monotonic() > deadline:
+                    budget = 'time'
+                    break
+                next_clock += CLOCK_EVERY
+        return self._result(halt, steps, row // stride, tapes, [h0, h1], budget)
+
+    def _result(self, halt, steps, state, tapes, heads, budget='steps'):
+        """Como ``CompiledMachine._result``; ``tape``/``head``/``offset`` son los de la cinta 0
+        y ``tapes`` trae las ``k`` cintas. ``heads`` son índices en cada buffer."""
+        views = [CompiledMachine._result(self, halt, steps, state, tape, head - tape.origin, budget)
+                 for tape, head in zip(tapes, heads)]
+        first = views[0]
+        first['tapes'] = [{'tape': v['tape'], 'head': v['head'], 'offset': v['offset']} for v in views]
+        return first
+
+    def _single_tape_only(self, *args, **kwargs):
+        raise ValueError('Esta operación solo admite máquinas de una cinta')
+
+    profile = trace = initial_config = advance = result = _single_tape_only
+
+
+def compile_machine(definition):
+    """Compila una definición de máquina; lanza ``ValueError`` si es inválida."""
+    try:
+        if isinstance(definition, dict) and definition.get('tapes', 1) != 1:
+            return MultiTapeMachine(definition)
+        if is_nondeterministic(definition):
+            from nondeterministic import NondeterministicMachine
+            return NondeterministicMachine(definition)
+        return CompiledMachine(definition)
+    except (AttributeError, KeyError, TypeError) as exc:
+        raise ValueError(f'Definición de máquina inválida: {exc}') from None
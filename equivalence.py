@@ -0,0 +1,185 @@
+"""Comparación diferencial de dos definiciones de máquina.
+
+Ambas máquinas se ejecutan sobre el mismo corpus (todas las cadenas hasta
+una longitud, cadenas aleatorias o una lista dada) repartido en bloques por
+el pool de procesos de ``batch``. Apenas un bloque encuentra una
+discrepancia se cancelan los bloques posteriores; solo se espera a los
+anteriores, que podrían contener una discrepancia más temprana.
+
+Uso como script::
+
+    python equivalence.py palindrome nuevo_palindromo.json --max-length 14
+    python equivalence.py ww ww.json --random 1000000 --max-length 40
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+
+from batch import get_pool, run_verdicts
+from engine import ACCEPT, REJECT, compile_machine
+
+DEFAULT_MAX_STEPS = 100_000
+CHUNK_SIZE = 2048
+# Cuántos ejemplos de regresión de pasos se reportan
+MAX_REGRESSIONS = 10
+
+
+def exhaustive_corpus(alphabet, max_length):
+    """Todas las cadenas sobre ``alphabet`` de longitud 0..``max_length``, por longitud."""
+    for n in range(max_length + 1):
+        for p in itertools.product(alphabet, repeat=n):
+            yield ''.join(p)
+
+
+def random_corpus(alphabet, count, max_length, seed=0):
+    """``count`` cadenas aleatorias de longitud uniforme en 0..``max_length``."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield ''.join(rng.choices(alphabet, k=rng.randint(0, max_length)))
+
+
+def _check_chunk(a, b, start, inputs, max_steps, slowdown, max_cells=None, deadline=None):
+    report = {'checked': 0, 'undecided': 0, 'steps_a': 0, 'steps_b': 0,
+              'regressions': [], 'regression_count': 0, 'disagreement': None}
+    verdicts = zip(run_verdicts(a, inputs, max_steps, max_cells, deadline),
+                   run_verdicts(b, inputs, max_steps, max_cells, deadline))
+    for index, (text, ((result_a, steps_a), (result_b, steps_b))) in enumerate(zip(inputs, verdicts), start):
+        report['checked'] += 1
+        if result_a not in (ACCEPT, REJECT) or result_b not in (ACCEPT, REJECT):
+            report['undecided'] += 1
+            continue
+        if result_a != result_b:
+            # El reporte incluye la configuración final completa, así que se repite esta entrada
+            # con lo que queda del plazo (y al menos un instante, porque 0 significa sin plazo)
+            report['disagreement'] = {'index': index, 'input': text}
+            for name, tm in (('a', a), ('b', b)):
+                max_seconds = max(deadline - time.monotonic(), 1e-3) if deadline is not None else None
+                report['disagreement'][name] = tm.run(text, max_steps=max_steps, max_cells=max_cells,
+                                                      max_seconds=max_seconds)
+            break
+        report['steps_a'] += steps_a
+        report['steps_b'] += steps_b
+        if steps_b > steps_a * slowdown:
+            report['regression_count'] += 1
+            if len(report['regressions']) < MAX_REGRESSIONS:
+                report['regressions'].append({'input': text, 'steps_a': steps_a, 'steps_b': steps_b})
+    return report
+
+
+def check_equivalence(a, b, corpus, max_steps=DEFAULT_MAX_STEPS, slowdown=1.0, workers=None,
+                      max_cells=None, max_seconds=None):
+    """Compara las máquinas compiladas ``a`` y ``b`` sobre ``corpus`` (un iterable de cadenas).
+
+    Retorna la primera discrepancia en el orden del corpus (o ``None``), los
+    pasos totales de cada máquina y las entradas donde ``b`` usa más de
+    ``slowdown`` veces los pasos de ``a``. ``max_cells`` limita la cinta de
+    cada entrada y ``max_seconds`` la comparación completa: al vencer el
+    plazo no se reparten más bloques y el reporte agrega ``'budget': 'time'``.
+    """
+    started = time.perf_counter()
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    timed_out = False
+    workers = workers or os.cpu_count() or 1
+    pool = get_pool() if workers > 1 else None
+    corpus = iter(corpus)
+    total = {'checked': 0, 'undecided': 0, 'steps_a': 0, 'steps_b': 0,
+             'regression_count': 0, 'regressions': []}
+    disagreement = None
+
+    def merge(report):
+        for key in ('checked', 'undecided', 'steps_a', 'steps_b', 'regression_count'):
+            total[key] += report[key]
+        total['regressions'].extend(report['regressions'][:MAX_REGRESSIONS - len(total['regressions'])])
+
+    start = 0
+    pending = deque()
+    in_flight = workers * 4 if pool is not None else 1
+    while True:
+        # Mantener un número acotado de bloques en vuelo para no materializar el corpus
+        while disagreement is None and len(pending) < in_flight:
+            if deadline is not None and time.monotonic() > deadline:
+                timed_out = True
+                break
+            chunk = list(itertools.islice(corpus, CHUNK_SIZE))
+            if not chunk:
+                break
+            if pool is None:
+                pending.append(_check_chunk(a, b, start, chunk, max_steps, slowdown, max_cells, deadline))
+            else:
+                pending.append(pool.submit(_check_chunk, a, b, start, chunk, max_steps, slowdown,
+                                           max_cells, deadline))
+            start += len(chunk)
+        if not pending:
+            break
+        item = pending.popleft()
+        report = item if pool is None else item.result()
+        merge(report)
+        if report['disagreement'] is not None:
+            disagreement = report['disagreement']
+            for later in pending:
+                if pool is not None:
+                    later.cancel()
+            pending.clear()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'equivalent': disagreement is None,
+        'first_disagreement': disagreement,
+        **total,
+        'seconds': elapsed,
+        'inputs_per_second': total['checked'] / elapsed if elapsed else None,
+        **({'budget': 'time'} if timed_out else {}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara el lenguaje aceptado por dos máquinas')
+    parser.add_argument('a', help='clave de MACHINE_LIBRARY o archivo JSON (referencia)')
+    parser.add_argument('b', help='clave de MACHINE_LIBRARY o archivo JSON (candidata)')
+    parser.add_argument('--alphabet', help='símbolos de entrada (por defecto, el de la biblioteca)')
+    parser.add_argument('--max-length', type=int, default=10)
+    parser.add_argument('--random', type=int, metavar='N', help='usar N cadenas aleatorias en vez del corpus exhaustivo')
+    parser.add_argument('--inputs', help='archivo con una cadena por línea')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-steps', type=int, default=DEFAULT_MAX_STEPS)
+    parser.add_argument('--slowdown', type=float, default=1.0,
+                        help='reportar entradas donde b usa más de este factor de pasos que a')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    alphabet = args.alphabet
+    machines = []
+    for name in (args.a, args.b):
+        if name.endswith('.json'):
+            with open(name, encoding='utf-8') as f:
+                machines.append(compile_machine(json.load(f)))
+        else:
+            from app import MACHINE_LIBRARY
+            machines.append(compile_machine(MACHINE_LIBRARY[name]['machine']))
+            alphabet = alphabet or MACHINE_LIBRARY[name]['alphabet']
+
+    if args.inputs:
+        with open(args.inputs, encoding='utf-8') as f:
+            corpus = [line.rstrip('\n') for line in f]
+    elif not alphabet:
+        parser.error('--alphabet es obligatorio cuando ninguna máquina es de la biblioteca')
+    elif args.random:
+        corpus = random_corpus(list(alphabet), args.random, args.max_length, args.seed)
+    else:
+        corpus = exhaustive_corpus(list(alphabet), args.max_length)
+
+    report = check_equivalence(*machines, corpus, max_steps=args.max_steps,
+                               slowdown=args.slowdown, workers=args.workers)
+    json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    sys.exit(0 if report['equivalent'] else 1)
+
+
+if __name__ == '__main__':
+    main()
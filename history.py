@@ -0,0 +1,167 @@
+"""Historial de una corrida para navegar paso a paso hacia adelante y hacia atrás.
+
+En vez de copiar la cinta en cada paso se guarda una configuración completa
+cada ``every`` pasos y, por paso, solo el cambio: posición, símbolo leído,
+símbolo escrito, movimiento y nuevo estado (unos 15 bytes en arreglos
+compactos). La memoria es O(pasos / every × cinta + pasos); ``every`` es al
+menos ``MIN_EVERY`` y, si los puntos de control pasan de
+``MAX_CHECKPOINT_BYTES``, se descarta uno de cada dos y ``every`` se
+duplica, así que un historial no guarda más que eso en cintas copiadas.
+
+El paso n se reconstruye desde el punto de control anterior aplicando a lo
+sumo ``every - 1`` cambios. Además se conserva un cursor con la última
+configuración reconstruida: avanzar o retroceder un paso desde ahí cuesta
+O(1), porque retroceder es deshacer un cambio (se restaura el símbolo leído).
+"""
+
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+
+from engine import CLOCK_EVERY, HALT_REJECT, NO_RULE, Configuration
+
+DEFAULT_EVERY = 1024
+MIN_EVERY = 64
+# Bytes de cinta copiados en los puntos de control de un historial
+MAX_CHECKPOINT_BYTES = 1 << 24
+
+
+class RunHistory:
+    def __init__(self, tm, text, max_steps, every=DEFAULT_EVERY, max_cells=None, max_seconds=None):
+        self.tm = tm
+        self.every = max(every, MIN_EVERY)
+        self.checkpoints = []
+        self.pos = array('q')
+        self.read = bytearray()
+        self.write = bytearray()
+        self.move = bytearray()  # movimiento + 1, para que quepa en un byte
+        self.state = array('I')
+        config = tm.initial_config(text)
+        budget = self._record(config, max_steps, max_cells or float('inf'),
+                              time.monotonic() + max_seconds if max_seconds else None)
+        self.steps = config.steps
+        self.result = tm.result(config, budget)
+        self._cursor = None
+        self._lock = threading.Lock()
+
+    def _record(self, config, max_steps, max_cells, deadline):
+        """Ejecuta registrando los cambios; retorna el presupuesto que la detuvo ('steps', 'tape' o 'time')."""
+        tm = self.tm
+        table, nsym, halt, every = tm.table, tm.nsym, tm.halt, self.every
+        tape = config.tape
+        cells = tape.cells
+        n = len(cells)
+        head, state = config.head, config.state
+        checkpoints = self.checkpoints
+        log_pos, log_read, log_write = self.pos.append, self.read.append, self.write.append
+        log_move, log_state = self.move.append, self.state.append
+
+        steps = 0
+        budget = 'steps'
+        next_clock = CLOCK_EVERY if deadline is not None else float('inf')
+        checkpoints.append(Configuration(state, head, tape.copy()))
+        stored = n
+        while not config.halt and steps < max_steps:
+            if steps and steps % every == 0:
+                checkpoints.append(Configuration(state, head, tape.copy(), steps))
+                stored += n
+                while stored > MAX_CHECKPOINT_BYTES and len(checkpoints) > 1:
+                    # Los que quedan son los de los múltiplos de 2 × every
+                    del checkpoints[1::2]
+                    every *= 2
+                    stored = sum(len(c.tape.cells) for c in checkpoints)
+            sym = cells[head]
+            write, move, nxt = table[state * nsym + sym]
+            if nxt == NO_RULE:
+                config.halt = HALT_REJECT
+                break
+            log_pos(head - tape.origin)
+            log_read(sym)
+            log_write(write)
+            log_move(move + 1)
+            cells[head] = write
+            head += move
+            steps += 1
+            state = nxt // nsym if nxt >= 0 else -2 - nxt
+            log_state(state)
+            config.halt = halt[state]
+            if not 0 <= head < n:
+                if 2 * n > max_cells:
+                    budget = 'tape'
+                    break
+                head = tape.grow(head)
+                n = len(cells)
+            if steps >= next_clock:
+                if time.monotonic() > deadline:
+                    budget = 'time'
+                    break
+                next_clock += CLOCK_EVERY
+        config.state, config.head, config.steps = state, head, steps
+        self.every = every
+        return budget
+
+    def at(self, n):
+        """Configuración en el paso ``n`` (0 ≤ n ≤ ``steps``); no debe modificarse."""
+        if not 0 <= n <= self.steps:
+            raise ValueError(f'El paso debe estar entre 0 y {self.steps}')
+        cursor = self._cursor
+        if cursor is None or not (n - self.every < cursor.steps < n + self.every):
+            base = self.checkpoints[min(n // self.every, len(self.checkpoints) - 1)]
+            cursor = Configuration(base.state, base.head, base.tape.copy(), base.steps)
+        tape = cursor.tape
+        while cursor.steps < n:
+            i = cursor.steps
+            index = tape.grow(self.pos[i] + tape.origin)
+            tape.cells[index] = self.write[i]
+            cursor.head = tape.grow(index + self.move[i] - 1)
+            cursor.state = self.state[i]
+            cursor.steps += 1
+        while cursor.steps > n:
+            cursor.steps -= 1
+            i = cursor.steps
+            index = tape.grow(self.pos[i] + tape.origin)
+            tape.cells[index] = self.read[i]
+            cursor.head = index
+            cursor.state = self.state[i - 1] if i else self.checkpoints[0].state
+        self._cursor = cursor
+        return cursor
+
+    def view(self, n):
+        """Paso ``n`` con el formato de ``run``; ``result`` es ``None`` salvo en el último paso."""
+        with self._lock:
+            view = self.tm.result(self.at(n))
+        view.pop('budget', None)
+        view['result'] = self.result['result'] if n == self.steps else None
+        view['step'] = n
+        return view
+
+    def summary(self):
+        return {'steps': self.steps, 'every': self.every, 'checkpoints': len(self.checkpoints),
+                'result': self.result['result'],
+                **({'budget': self.result['budget']} if 'budget' in self.result else {})}
+
+
+class HistoryStore:
+    """Historiales en memoria del proceso; se descartan los menos usados al pasar de ``max_runs``."""
+
+    def __init__(self, max_runs=32):
+        self.max_runs = max_runs
+        self.runs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, history):
+        run_id = uuid.uuid4().hex
+        with self.lock:
+            self.runs[run_id] = history
+            while len(self.runs) > self.max_runs:
+                self.runs.popitem(last=False)
+        return run_id
+
+    def get(self, run_id):
+        with self.lock:
+            history = self.runs.get(run_id)
+            if history is not None:
+                self.runs.move_to_end(run_id)
+            return history
@@ -0,0 +1,259 @@
+"""Cola de trabajos asíncronos para simulaciones largas.
+
+Un trabajo se ejecuta por tramos de ``slice_steps`` pasos en el pool de
+procesos de ``batch`` (``CompiledMachine.advance`` sobre una
+``Configuration`` serializable), así que el proceso web solo espera
+resultados y las rutas interactivas siguen respondiendo. Entre tramos se
+actualiza el progreso y se atiende la cancelación.
+
+La cola tiene un número fijo de despachadores, prioridades (menor número,
+mayor prioridad), un tope de trabajos en espera y un tope de trabajos
+activos por cliente. Los trabajos viven en la memoria del proceso: con
+varios workers de gunicorn hace falta afinidad de sesión o un solo worker
+para consultar un trabajo.
+
+Con ``checkpoint_dir`` cada trabajo guarda su definición al encolarse y una
+instantánea (``snapshot``) de su configuración cada ``checkpoint_every``
+segundos. Al crear la cola se reencolan los trabajos que quedaron en el
+directorio, así que un reinicio del proceso solo pierde el último intervalo.
+Cada directorio debe pertenecer a una sola cola.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+from batch import get_pool
+from engine import compile_machine
+from snapshot import dump_snapshot, read_snapshot, save_snapshot
+
+QUEUED, RUNNING, DONE, CANCELLED, FAILED = 'queued', 'running', 'done', 'cancelled', 'failed'
+
+
+class QueueFull(Exception):
+    """La cola o el cupo del cliente está lleno; el cliente debe reintentar más tarde."""
+
+
+def _advance_slice(tm, config, steps):
+    return tm.advance(config, steps)
+
+
+class Job:
+    def __init__(self, tm, text, max_steps, client, priority, config=None, job_id=None, max_cells=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.tm = tm
+        self.text = text
+        self.config = config
+        self.max_steps = max_steps
+        self.max_cells = max_cells
+        self.client = client
+        self.priority = priority
+        self.status = QUEUED
+        self.steps = config.steps if config is not None else 0
+        self.checkpoint_steps = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = self.finished = None
+        self.cancel_requested = False
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'priority': self.priority,
+            'steps': self.steps,
+            'checkpoint_steps': self.checkpoint_steps,
+            'max_steps': self.max_steps,
+            'max_cells': self.max_cells,
+            'progress': min(1.0, self.steps / self.max_steps) if self.max_steps else None,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'result': self.result,
+            'error': self.error,
+        }
+
+    def snapshot(self):
+        """Instantánea binaria de la última configuración conocida (``None`` si aún no empezó)."""
+        config, tm = self.config, self.tm
+        if config is None or tm is None:
+            return None
+        return dump_snapshot(tm, config)
+
+
+class JobQueue:
+    def __init__(self, workers=None, max_queued=256, per_client=4, slice_steps=1_000_000, keep_finished=1024,
+                 checkpoint_dir=None, checkpoint_every=30.0):
+        self.max_queued = max_queued
+        self.per_client = per_client
+        self.slice_steps = slice_steps
+        self.keep_finished = keep_finished
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.jobs = {}
+        self.finished = []
+        self.heap = []
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+        self.active_by_client = {}
+        self.running = 0
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            self._recover()
+        for _ in range(workers or os.cpu_count() or 1):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, tm, text, max_steps, client='anonymous', priority=10, config=None, max_cells=None):
+        """Encola un trabajo; lanza ``QueueFull`` si no hay cupo.
+
+        Con ``config`` (por ejemplo, cargada de una instantánea) el trabajo
+        continúa desde ahí en vez de empezar con ``text``. ``max_cells`` se
+        revisa entre tramos, así que la cinta puede pasarlo en lo que crece
+        durante un tramo.
+        """
+        if tm.tapes > 1 or not tm.deterministic:
+            raise ValueError('Los trabajos en segundo plano solo admiten máquinas deterministas de una cinta')
+        with self.cond:
+            if len(self.heap) >= self.max_queued:
+                raise QueueFull('La cola de trabajos está llena')
+            if self.active_by_client.get(client, 0) >= self.per_client:
+                raise QueueFull(f'El cliente ya tiene {self.per_client} trabajos activos')
+            job = Job(tm, text, max_steps, client, priority, config, max_cells=max_cells)
+            # Los archivos se escriben antes de encolar, así ``_finish`` siempre los encuentra
+            if self.checkpoint_dir:
+                self._write_meta(job)
+                if config is not None:
+                    self._checkpoint(job)
+            self._enqueue(job)
+        return job
+
+    def _enqueue(self, job):
+        # Se llama con ``self.cond`` tomado
+        self.jobs[job.id] = job
+        self.active_by_client[job.client] = self.active_by_client.get(job.client, 0) + 1
+        heapq.heappush(self.heap, (job.priority, next(self.counter), job))
+        self.cond.notify()
+
+    def _path(self, job_id, ext):
+        return os.path.join(self.checkpoint_dir, f'{job_id}.{ext}')
+
+    def _write_meta(self, job):
+        meta = {'machine': job.tm.definition, 'input': job.text, 'max_steps': job.max_steps,
+                'max_cells': job.max_cells, 'client': job.client, 'priority': job.priority}
+        tmp = self._path(job.id, 'tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, self._path(job.id, 'json'))
+
+    def _checkpoint(self, job):
+        save_snapshot(self._path(job.id, 'snap'), job.tm, job.config)
+        job.checkpoint_steps = job.config.steps
+
+    def _recover(self):
+        """Reencola los trabajos que quedaron sin terminar en ``checkpoint_dir``."""
+        for name in sorted(os.listdir(self.checkpoint_dir)):
+            job_id, ext = os.path.splitext(name)
+            if ext != '.json':
+                continue
+            try:
+                with open(self._path(job_id, 'json'), encoding='utf-8') as f:
+                    meta = json.load(f)
+                tm = compile_machine(meta['machine'])
+                config = None
+                if os.path.exists(self._path(job_id, 'snap')):
+                    config = read_snapshot(self._path(job_id, 'snap'), tm)
+            except (OSError, KeyError, ValueError):
+                continue  # un archivo dañado no debe impedir que arranque la cola
+            job = Job(tm, meta['input'], meta['max_steps'], meta['client'], meta['priority'],
+                      config, job_id=job_id, max_cells=meta.get('max_cells'))
+            job.checkpoint_steps = config.steps if config is not None else None
+            with self.cond:
+                self._enqueue(job)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancela un trabajo en espera o pide detener uno en ejecución tras el tramo actual."""
+        with self.cond:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status == QUEUED:
+                self.heap = [item for item in self.heap if item[2] is not job]
+                heapq.heapify(self.heap)
+                self._finish(job, CANCELLED)
+            elif job.status == RUNNING:
+                job.cancel_requested = True
+            return job
+
+    def stats(self):
+        with self.cond:
+            return {'queued': len(self.heap), 'running': self.running, 'jobs': len(self.jobs)}
+
+    def _finish(self, job, status):
+        # Se llama con ``self.cond`` tomado
+        job.status = status
+        job.finished = time.time()
+        if status != CANCELLED:
+            # Un trabajo cancelado conserva su configuración para poder descargarla y reanudarlo
+            job.tm = job.config = None
+        if self.checkpoint_dir:
+            for ext in ('json', 'snap'):
+                try:
+                    os.remove(self._path(job.id, ext))
+                except FileNotFoundError:
+                    pass
+        self.active_by_client[job.client] -= 1
+        if not self.active_by_client[job.client]:
+            del self.active_by_client[job.client]
+        self.finished.append(job.id)
+        while len(self.finished) > self.keep_finished:
+            self.jobs.pop(self.finished.pop(0), None)
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                while not self.heap:
+                    self.cond.wait()
+                job = heapq.heappop(self.heap)[2]
+                job.status = RUNNING
+                job.started = time.time()
+                self.running += 1
+            try:
+                status = self._execute(job)
+            except Exception as exc:
+                job.error = str(exc)
+                status = FAILED
+            with self.cond:
+                self.running -= 1
+                self._finish(job, status)
+
+    def _execute(self, job):
+        tm = job.tm
+        if job.config is None:
+            job.config = tm.initial_config(job.text)
+        config = job.config
+        pool = get_pool()
+        last_checkpoint = time.monotonic()
+        while not config.halt and config.steps < job.max_steps:
+            if job.cancel_requested:
+                job.result = tm.result(config)
+                return CANCELLED
+            if job.max_cells is not None and len(config.tape.cells) > job.max_cells:
+                job.result = tm.result(config, budget='tape')
+                return DONE
+            steps = min(self.slice_steps, job.max_steps - config.steps)
+            # El pool devuelve una copia nueva: ``job.config`` nunca se ve a medio avanzar
+            config = job.config = pool.submit(_advance_slice, tm, config, steps).result()
+            job.steps = config.steps
+            if self.checkpoint_dir and time.monotonic() - last_checkpoint >= self.checkpoint_every:
+                self._checkpoint(job)
+                last_checkpoint = time.monotonic()
+        job.result = tm.result(config)
+        return DONE
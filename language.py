@@ -0,0 +1,267 @@
+"""Enumeración exhaustiva del lenguaje aceptado hasta una longitud dada.
+
+Se recorren todas las cadenas sobre el alfabeto de la máquina de longitud
+``0..N`` como un árbol de prefijos. La ejecución sobre ``p·s`` coincide con
+la ejecución sobre ``p`` hasta que el cabezal lee por primera vez la
+posición ``len(p)`` (antes de eso la celda nunca se leyó, así que nunca se
+escribió), por lo que cada nodo del árbol retoma la configuración de su
+padre en vez de simular desde el principio. Si la máquina se detiene antes
+de llegar a esa posición, todas las extensiones comparten el resultado.
+
+Los subárboles de una profundidad fija se reparten en el pool de procesos
+de ``batch``. Con un alfabeto de un símbolo el árbol es un camino, así que
+se reparten las longitudes y cada cadena se simula desde el principio.
+
+Uso como script::
+
+    python language.py anbn 12 -o anbn.txt.gz
+    python language.py maquina.json 10 --alphabet 01
+"""
+
+import argparse
+import gzip
+import itertools
+import json
+import os
+import sys
+import time
+
+from batch import get_pool
+from engine import CLOCK_EVERY, HALT_ACCEPT, HALT_REJECT, NO_RULE, compile_machine
+from tape import Tape
+
+DEFAULT_MAX_STEPS = 100_000
+
+# Resultado de ``_advance`` cuando el cabezal llegó a la posición de parada
+PAUSED = 0
+UNDECIDED = -1
+
+
+def _advance(tm, tape, row, head, steps, stop, max_steps, max_cells=float('inf'), deadline=None):
+    """Ejecuta hasta que el cabezal llegue a la posición ``stop``, la máquina pare o se agote el presupuesto.
+
+    Retorna ``(estado, fila, cabezal, pasos)`` donde ``estado`` es
+    ``PAUSED``, ``HALT_ACCEPT``, ``HALT_REJECT`` o ``UNDECIDED``. Los límites
+    de celdas y tiempo se revisan como en ``CompiledMachine._run_guarded``.
+    """
+    cells = tape.cells
+    n = len(cells)
+    table = tm.table
+    target = stop + tape.origin if stop is not None else -1
+    if deadline is not None and time.monotonic() > deadline:
+        return UNDECIDED, row, head, steps
+    next_clock = steps + CLOCK_EVERY if deadline is not None else max_steps
+    while steps < max_steps:
+        if head == target:
+            return PAUSED, row, head, steps
+        write, move, nxt = table[row + cells[head]]
+        if nxt < 0:
+            if nxt == NO_RULE:
+                return HALT_REJECT, row, head, steps
+            cells[head] = write
+            return tm.halt[-2 - nxt], row, head + move, steps + 1
+        steps += 1
+        cells[head] = write
+        head += move
+        row = nxt
+        if not 0 <= head < n:
+            if 2 * n > max_cells:
+                return UNDECIDED, row, head, steps
+            head = tape.grow(head)
+            n = len(cells)
+            if stop is not None:
+                target = stop + tape.origin
+        if steps >= next_clock:
+            if time.monotonic() > deadline:
+                return UNDECIDED, row, head, steps
+            next_clock = steps + CLOCK_EVERY
+    return UNDECIDED, row, head, steps
+
+
+class LanguageStats:
+    """Conteos por longitud y estadísticas de pasos, combinables entre procesos."""
+
+    def __init__(self, max_length):
+        self.max_length = max_length
+        size = max_length + 1
+        self.accepted = [0] * size
+        self.rejected = [0] * size
+        self.undecided = [0] * size
+        self.steps_min = [None] * size
+        self.steps_max = [0] * size
+        self.steps_sum = [0] * size
+        self.accepted_strings = []
+
+    def record(self, length, verdict, steps, count=1):
+        counts = {HALT_ACCEPT: self.accepted, HALT_REJECT: self.rejected}.get(verdict, self.undecided)
+        counts[length] += count
+        if self.steps_min[length] is None or steps < self.steps_min[length]:
+            self.steps_min[length] = steps
+        self.steps_max[length] = max(self.steps_max[length], steps)
+        self.steps_sum[length] += steps * count
+
+    def merge(self, other):
+        for i in range(len(self.accepted)):
+            self.accepted[i] += other.accepted[i]
+            self.rejected[i] += other.rejected[i]
+            self.undecided[i] += other.undecided[i]
+            self.steps_sum[i] += other.steps_sum[i]
+            self.steps_max[i] = max(self.steps_max[i], other.steps_max[i])
+            if other.steps_min[i] is not None and (self.steps_min[i] is None or other.steps_min[i] < self.steps_min[i]):
+                self.steps_min[i] = other.steps_min[i]
+        self.accepted_strings.extend(other.accepted_strings)
+
+    def summary(self):
+        lengths = []
+        for i in range(self.max_length + 1):
+            total = self.accepted[i] + self.rejected[i] + self.undecided[i]
+            lengths.append({
+                'length': i,
+                'total': total,
+                'accepted': self.accepted[i],
+                'rejected': self.rejected[i],
+                'undecided': self.undecided[i],
+                'steps_min': self.steps_min[i],
+                'steps_max': self.steps_max[i],
+                'steps_mean': self.steps_sum[i] / total if total else None,
+            })
+        return {
+            'max_length': self.max_length,
+            'total': sum(x['total'] for x in lengths),
+            'accepted': sum(self.accepted),
+            'lengths': lengths,
+        }
+
+
+def _explore(tm, alphabet, prefix, max_length, max_steps, stats_length=None, max_cells=None, deadline=None):
+    """Recorre el subárbol de ``prefix`` y registra las cadenas de longitud ``len(prefix)..max_length``."""
+    stats = LanguageStats(stats_length or max_length)
+    budget = {'max_cells': max_cells or float('inf'), 'deadline': deadline}
+    codes = list(tm.encode(''.join(alphabet)))
+
+    def record_subtree(word, verdict, steps):
+        # La máquina paró antes de leer más allá de ``word``: todas sus extensiones dan lo mismo
+        for k in range(max_length - len(word) + 1):
+            stats.record(len(word) + k, verdict, steps, count=len(alphabet) ** k)
+            if verdict == HALT_ACCEPT:
+                stats.accepted_strings.extend(word + ''.join(s) for s in itertools.product(alphabet, repeat=k))
+
+    def visit(word, tape, row, head, steps):
+        # Pila explícita: con un alfabeto de un símbolo la profundidad llega a ``max_length``
+        stack = [(word, tape, row, head, steps)]
+        while stack:
+            # Configuración detenida justo antes de leer la posición len(word)
+            word, tape, row, head, steps = stack.pop()
+            end = _advance(tm, tape.copy(), row, head, steps, None, max_steps, **budget)
+            stats.record(len(word), end[0], end[3])
+            if end[0] == HALT_ACCEPT:
+                stats.accepted_strings.append(word)
+            if len(word) == max_length:
+                continue
+            for ch, code in zip(alphabet, codes):
+                child = tape.copy()
+                child.cells[head] = code
+                status, crow, chead, csteps = _advance(tm, child, row, head, steps, len(word) + 1, max_steps,
+                                                       **budget)
+                if status == PAUSED:
+                    stack.append((word + ch, child, crow, chead, csteps))
+                else:
+                    record_subtree(word + ch, status, csteps)
+
+    tape = Tape(tm.encode(prefix))
+    if tm.halt[tm.start]:
+        record_subtree(prefix, tm.halt[tm.start], 0)
+        return stats
+    status, row, head, steps = _advance(tm, tape, tm.start * tm.nsym, 0, 0, len(prefix), max_steps, **budget)
+    if status == PAUSED:
+        visit(prefix, tape, row, head, steps)
+    else:
+        record_subtree(prefix, status, steps)
+    return stats
+
+
+def enumerate_language(tm, alphabet, max_length, max_steps=DEFAULT_MAX_STEPS, workers=None,
+                       max_cells=None, max_seconds=None):
+    """Ejecuta ``tm`` sobre todas las cadenas de longitud <= ``max_length`` sobre ``alphabet``.
+
+    Retorna un ``LanguageStats`` con los conteos y las cadenas aceptadas
+    (ordenadas por longitud y luego lexicográficamente según ``alphabet``).
+    ``max_cells`` limita la cinta de cada cadena y ``max_seconds`` toda la
+    enumeración; lo que no se decide a tiempo cuenta como indeciso.
+    """
+    alphabet = list(alphabet)
+    if tm.tapes > 1 or not tm.deterministic:
+        raise ValueError('La enumeración de lenguajes solo admite máquinas deterministas de una cinta')
+    if not all(isinstance(ch, str) and len(ch) == 1 for ch in alphabet):
+        raise ValueError('Cada símbolo del alfabeto debe ser un solo carácter')
+    workers = workers or 1
+    # Profundidad de corte: suficientes subárboles para repartir entre los procesos
+    depth = 0
+    while workers > 1 and len(alphabet) > 1 and len(alphabet) ** depth < workers * 4 and depth < max_length:
+        depth += 1
+
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    if workers > 1 and len(alphabet) == 1 and max_length > 0:
+        # Cada cadena es un subárbol de un solo nodo (su longitud es el límite)
+        n = max_length + 1
+        stats = LanguageStats(max_length)
+        for part in get_pool().map(_explore, [tm] * n, [alphabet] * n, [alphabet[0] * k for k in range(n)],
+                                   range(n), [max_steps] * n, [max_length] * n, [max_cells] * n,
+                                   [deadline] * n, chunksize=max(1, n // (workers * 4))):
+            stats.merge(part)
+    elif depth == 0:
+        stats = _explore(tm, alphabet, '', max_length, max_steps, max_cells=max_cells, deadline=deadline)
+    else:
+        stats = _explore(tm, alphabet, '', depth - 1, max_steps, stats_length=max_length,
+                         max_cells=max_cells, deadline=deadline)
+        prefixes = [''.join(p) for p in itertools.product(alphabet, repeat=depth)]
+        n = len(prefixes)
+        for part in get_pool().map(_explore, [tm] * n, [alphabet] * n, prefixes, [max_length] * n,
+                                   [max_steps] * n, [None] * n, [max_cells] * n, [deadline] * n):
+            stats.merge(part)
+
+    order = {ch: i for i, ch in enumerate(alphabet)}
+    stats.accepted_strings.sort(key=lambda w: (len(w), [order[ch] for ch in w]))
+    return stats
+
+
+def write_accepted(stats, path):
+    """Escribe las cadenas aceptadas, una por línea (gzip si el nombre termina en ``.gz``)."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        for word in stats.accepted_strings:
+            f.write(word + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Enumera el lenguaje aceptado por una máquina hasta longitud N')
+    parser.add_argument('machine', help='clave de MACHINE_LIBRARY o archivo JSON con la definición')
+    parser.add_argument('max_length', type=int)
+    parser.add_argument('--alphabet', help='símbolos de entrada (por defecto, el alfabeto de la biblioteca)')
+    parser.add_argument('--max-steps', type=int, default=DEFAULT_MAX_STEPS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('-o', '--output', help='archivo de cadenas aceptadas (.txt o .txt.gz)')
+    args = parser.parse_args(argv)
+
+    if args.machine.endswith('.json'):
+        with open(args.machine, encoding='utf-8') as f:
+            definition = json.load(f)
+        alphabet = args.alphabet
+    else:
+        from app import MACHINE_LIBRARY
+        entry = MACHINE_LIBRARY[args.machine]
+        definition = entry['machine']
+        alphabet = args.alphabet or entry['alphabet']
+    if not alphabet:
+        parser.error('--alphabet es obligatorio para definiciones en archivo')
+
+    stats = enumerate_language(compile_machine(definition), alphabet, args.max_length,
+                               max_steps=args.max_steps, workers=args.workers or os.cpu_count())
+    if args.output:
+        write_accepted(stats, args.output)
+    json.dump(stats.summary(), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
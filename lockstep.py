@@ -0,0 +1,227 @@
+"""Motor vectorizado con NumPy: muchas entradas de la misma máquina a la vez.
+
+Todas las cintas viven en un arreglo ``uint8`` de dos dimensiones (una fila
+por entrada) y cada carril tiene su cabezal y su estado en vectores. En cada
+iteración todos los carriles activos dan un paso con búsquedas por índices
+en la tabla compilada (``escribir``, ``mover``, ``siguiente`` como arreglos
+paralelos), y los que se detienen salen del conjunto activo. Cuando quedan
+menos de la mitad de los carriles se compacta el arreglo de cintas.
+
+Los veredictos y pasos son los de ``CompiledMachine.run`` (sin detección de
+ciclos). NumPy es opcional (``pip install -r requirements-optional.txt``):
+sin él ``available()`` es falso y los lotes usan el intérprete entrada por
+entrada.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from engine import (ACCEPT, BUDGET_EXCEEDED, DEFAULT_MAX_STEPS, HALT_ACCEPT, HALT_LOOP, HALT_REJECT, LOOP,
+                    NO_RULE, REJECT, VERDICTS, Configuration)
+from tape import Tape
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional; sin él los lotes usan el intérprete por entrada
+    np = None
+
+# Por debajo de esta cantidad de entradas el costo fijo por iteración no se amortiza
+MIN_LANES = 64
+# Si el arreglo de cintas pasaría de este tamaño, los carriles restantes terminan en el intérprete
+MAX_BYTES = 1 << 28
+# Celdas en blanco a cada lado de la entrada al empezar
+PAD = 8
+
+_tables = OrderedDict()
+_lock = threading.Lock()
+
+
+def available():
+    return np is not None
+
+
+def _compiled_tables(tm):
+    """``(escribir, mover, siguiente, halt, barrido)`` como arreglos, guardados por hash de máquina.
+
+    ``barrido[fila]`` es la dirección del autolazo sobre blanco del estado de
+    esa fila (0 si no tiene): con presupuestos, salir de la cinta en esa
+    dirección es ``LOOP``, como en ``CompiledMachine._run_guarded``.
+    """
+    with _lock:
+        tables = _tables.get(tm.hash)
+        if tables is not None:
+            return tables
+    write = np.array([t[0] for t in tm.table], dtype=np.uint8)
+    move = np.array([t[1] for t in tm.table], dtype=np.int64)
+    nxt = np.array([t[2] for t in tm.table], dtype=np.int64)
+    halt = np.frombuffer(bytes(tm.halt), dtype=np.uint8)
+    sweep = np.array([s[0] if s is not None else 0 for s in tm.sweeps], dtype=np.int64)
+    with _lock:
+        _tables[tm.hash] = tables = (write, move, nxt, halt, sweep)
+        while len(_tables) > 64:
+            _tables.popitem(last=False)
+    return tables
+
+
+def _encode(tm, inputs, origin):
+    """Arreglo de cintas con cada entrada a partir de la columna ``origin``.
+
+    Todas las entradas se traducen juntas: se concatenan, se pasan a puntos
+    de código y se traducen con una tabla indexada por punto de código.
+    """
+    lengths = np.fromiter(map(len, inputs), dtype=np.int64, count=len(inputs))
+    tapes = np.zeros((len(inputs), int(lengths.max(initial=0)) + 2 * origin), dtype=np.uint8)
+    text = ''.join(inputs)
+    try:
+        points = np.frombuffer(text.encode('latin-1'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        points = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    if not points.size:
+        return tapes
+    # Los puntos de código que no son símbolos de la máquina van a la columna sin reglas, como en ``tm.encode``
+    index = tm.symbol_index
+    lookup = np.full(max(int(points.max()), *map(ord, index)) + 1, tm.nsym - 1, dtype=np.uint8)
+    lookup[[ord(sym) for sym in index]] = list(index.values())
+    codes = lookup.take(points)
+    rows = np.repeat(np.arange(len(inputs)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    tapes[rows, np.arange(points.size) - np.repeat(starts, lengths) + origin] = codes
+    return tapes
+
+
+def run_lockstep(tm, inputs, max_steps=DEFAULT_MAX_STEPS, max_cells=None, deadline=None):
+    """Retorna ``[(veredicto, pasos), ...]`` de ``tm`` sobre ``inputs``, en el mismo orden.
+
+    Sin presupuestos los resultados son los de ``tm.run(texto, max_steps)``.
+    Con ``max_cells`` o ``deadline`` (instante de ``time.monotonic`` para
+    todo el lote) son los de ``tm.run`` con ``max_cells`` y el tiempo que
+    queda: cada carril lleva el tamaño que tendría su cinta en el intérprete
+    para cortar en el mismo paso, y los que siguen vivos al vencer el plazo
+    quedan ``BUDGET_EXCEEDED``.
+    """
+    count = len(inputs)
+    origin = PAD
+    tapes = _encode(tm, inputs, origin)
+    if tm.halt[tm.start]:
+        return [(VERDICTS[tm.halt[tm.start]], 0)] * count
+    write_t, move_t, next_t, halt_t, sweep_t = _compiled_tables(tm)
+    nsym = tm.nsym
+    width = tapes.shape[1]
+    guarded = max_cells is not None or deadline is not None
+    max_cells = max_cells or float('inf')
+
+    halt_out = np.zeros(count, dtype=np.uint8)   # RUNNING: se agotó algún presupuesto
+    steps_out = np.zeros(count, dtype=np.int64)
+    lane = np.arange(count)                 # entrada de cada carril activo
+    row = np.arange(count)                  # fila de ``tapes`` de cada carril activo
+    head = np.full(count, origin, dtype=np.int64)
+    state = np.full(count, tm.start * nsym, dtype=np.int64)
+    # Celdas que tendría la cinta del intérprete, como posiciones relativas a la entrada
+    low_cell = np.zeros(count, dtype=np.int64)
+    high_cell = np.maximum(np.fromiter(map(len, inputs), dtype=np.int64, count=count), 1)
+
+    # Las celdas se leen y escriben por índice plano (fila * ancho + cabezal), que en NumPy
+    # es varias veces más rápido que indexar el arreglo de dos dimensiones
+    cells = tapes.reshape(-1)
+    pos = row * width + head
+    t = 0
+    while lane.size and t < max_steps:
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        cur = state + cells.take(pos)
+        nxt = next_t.take(cur)
+        stopped = nxt < 0
+        if stopped.any():
+            code = nxt[stopped]
+            ruled = code != NO_RULE
+            # Sin regla se rechaza sin contar el paso; al entrar en un estado de parada sí cuenta
+            halt_out[lane[stopped]] = np.where(ruled, halt_t[np.where(ruled, -2 - code, 0)], HALT_REJECT)
+            steps_out[lane[stopped]] = t + ruled
+            keep = ~stopped
+            lane, row, head, pos, cur, nxt = lane[keep], row[keep], head[keep], pos[keep], cur[keep], nxt[keep]
+            low_cell, high_cell = low_cell[keep], high_cell[keep]
+            if not lane.size:
+                break
+        cells[pos] = write_t.take(cur)
+        move = move_t.take(cur)
+        head += move
+        pos += move
+        state = nxt
+        t += 1
+
+        if guarded:
+            cell = head - origin
+            out = (cell < low_cell) | (cell >= high_cell)
+            if out.any():
+                size = high_cell - low_cell
+                looping = out & (sweep_t.take(state) == move)
+                over = out & ~looping & (2 * size > max_cells)
+                stopped = looping | over
+                if stopped.any():
+                    halt_out[lane[looping]] = HALT_LOOP
+                    steps_out[lane[stopped]] = t
+                grow = out & ~stopped
+                # Mismo crecimiento que ``Tape.grow``: al menos duplica el tamaño
+                left = grow & (cell < low_cell)
+                right = grow & ~left
+                low_cell = np.where(left, low_cell - np.maximum(size, low_cell - cell), low_cell)
+                high_cell = np.where(right, high_cell + np.maximum(size, cell - high_cell + 1), high_cell)
+                if stopped.any():
+                    keep = ~stopped
+                    lane, row, head, pos, state = lane[keep], row[keep], head[keep], pos[keep], state[keep]
+                    low_cell, high_cell = low_cell[keep], high_cell[keep]
+                    if not lane.size:
+                        break
+
+        low, high = int(head.min()), int(head.max())
+        if low < 0 or high >= width:
+            left = max(width, -low) if low < 0 else 0
+            right = max(width, high - width + 1) if high >= width else 0
+            if (width + left + right) * tapes.shape[0] > MAX_BYTES:
+                _finish_interpreted(tm, inputs, tapes, lane, row, head, state, origin, t, max_steps,
+                                    max_cells if guarded else None, deadline, halt_out, steps_out)
+                lane = lane[:0]
+                break
+            tapes = np.pad(tapes, ((0, 0), (left, right)))
+            head += left
+            origin += left
+            width += left + right
+        elif 2 * lane.size < tapes.shape[0] and tapes.shape[0] > MIN_LANES:
+            tapes = tapes[row]
+            row = np.arange(lane.size)
+        else:
+            continue
+        cells = tapes.reshape(-1)
+        pos = row * width + head
+
+    steps_out[lane] = t
+    verdicts = [VERDICTS.get(code, BUDGET_EXCEEDED) for code in range(4)]
+    return [(verdicts[code], steps) for code, steps in zip(halt_out.tolist(), steps_out.tolist())]
+
+
+def _finish_interpreted(tm, inputs, tapes, lane, row, head, state, origin, t, max_steps, max_cells, deadline,
+                        halt_out, steps_out):
+    """Termina los carriles activos uno por uno en el intérprete.
+
+    Sin presupuestos se sigue con ``tm.advance`` desde donde quedó cada
+    carril. Con presupuestos la entrada se ejecuta de nuevo con ``tm.run``,
+    que es el único ciclo que los revisa.
+    """
+    if max_cells is not None or deadline is not None:
+        for i in lane.tolist():
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                steps_out[i] = t
+                continue
+            r = tm.run(inputs[i], max_steps=max_steps, max_cells=max_cells, max_seconds=remaining)
+            halt_out[i] = {ACCEPT: HALT_ACCEPT, REJECT: HALT_REJECT, LOOP: HALT_LOOP}.get(r['result'], 0)
+            steps_out[i] = r['steps']
+        return
+    for i, r, h, s in zip(lane.tolist(), row.tolist(), head.tolist(), state.tolist()):
+        tape = Tape(tapes[r].tobytes())
+        tape.origin = origin
+        # El paso que trajo aquí dejó el cabezal fuera del arreglo sin ampliarlo
+        h = tape.grow(h)
+        config = tm.advance(Configuration(s // tm.nsym, h, tape, t), max_steps - t)
+        halt_out[i], steps_out[i] = config.halt, config.steps
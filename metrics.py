@@ -0,0 +1,300 @@
+"""Métricas con formato de exposición de Prometheus para ``/metrics``.
+
+Registrar una medición no toma locks: cada hilo escribe en su propio
+fragmento (contadores e histogramas en diccionarios que solo ese hilo
+modifica) y la lectura los suma al momento de exponer. Los fragmentos de
+hilos terminados se fusionan en uno retirado para que la lista no crezca.
+
+Con gunicorn cada worker es un proceso aparte. Si ``TM_METRICS_DIR`` está
+definido, cada proceso publica cada ``FLUSH_EVERY`` segundos (y al atender
+``/metrics``) su resumen en ``worker-<pid>.json`` dentro de ese directorio, y
+el worker que atiende la consulta suma los de todos. Los contadores de
+workers que ya terminaron se conservan (Prometheus espera que sean
+monótonos); los indicadores solo se suman de procesos vivos. Sin el
+directorio se exponen solo las métricas del proceso que responde.
+
+Las razones útiles se calculan en PromQL, por ejemplo pasos por segundo con
+``rate(tm_simulated_steps_total[1m])``; además se exponen ya calculadas la
+tasa de aciertos por caché y los pasos por segundo de simulación.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+FLUSH_EVERY = 5.0
+# Valores distintos de la etiqueta 'machine' por proceso; el resto se agrupa en 'other'
+MACHINE_LABELS = 256
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STEP_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# nombre: (tipo, ayuda, límites de los buckets para histogramas)
+METRICS = {
+    'tm_http_request_duration_seconds': ('histogram', 'Latencia de las peticiones HTTP por ruta', LATENCY_BUCKETS),
+    'tm_run_steps': ('histogram', 'Pasos por ejecución, por máquina', STEP_BUCKETS),
+    'tm_simulated_steps_total': ('counter', 'Pasos simulados por el motor, por máquina', None),
+    'tm_simulation_seconds_total': ('counter', 'Tiempo de simulación, por máquina', None),
+    'tm_simulation_steps_per_second': ('gauge', 'Pasos simulados por segundo de simulación, por máquina', None),
+    'tm_cache_requests_total': ('counter', 'Consultas a cada caché, por resultado (hit/miss)', None),
+    'tm_cache_hit_ratio': ('gauge', 'Fracción de aciertos de cada caché', None),
+    'tm_jobs_running': ('gauge', 'Trabajos en segundo plano ejecutándose', None),
+    'tm_jobs_queued': ('gauge', 'Trabajos en segundo plano en cola', None),
+}
+
+
+class _Shard:
+    __slots__ = ('thread', 'counters', 'histograms')
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.counters = {}
+        self.histograms = {}
+
+
+_local = threading.local()
+_shards = []
+_retired = _Shard(None)
+_collectors = []
+_machine_labels = set()
+_lock = threading.Lock()
+_publisher = None
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        # Solo la primera medición de cada hilo toma el lock
+        shard = _local.shard = _Shard(threading.current_thread())
+        with _lock:
+            _shards.append(shard)
+        _start_publisher()
+    return shard
+
+
+def inc(name, labels=(), value=1):
+    """Suma ``value`` al contador ``name``; ``labels`` es una tupla de pares (nombre, valor)."""
+    counters = _shard().counters
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + value
+
+
+def observe(name, labels, value):
+    """Registra ``value`` en el histograma ``name``."""
+    histograms = _shard().histograms
+    key = (name, labels)
+    counts = histograms.get(key)
+    if counts is None:
+        # Un contador por bucket (el último es +Inf), luego la suma y la cantidad
+        counts = histograms[key] = [0] * (len(METRICS[name][2]) + 3)
+    counts[bisect_left(METRICS[name][2], value)] += 1
+    counts[-2] += value
+    counts[-1] += 1
+
+
+def machine_label(key):
+    """Valor de la etiqueta 'machine', acotado a ``MACHINE_LABELS`` valores por proceso."""
+    if key in _machine_labels:
+        return key
+    if len(_machine_labels) >= MACHINE_LABELS:
+        return 'other'
+    with _lock:
+        _machine_labels.add(key)
+    return key
+
+
+def record_run(machine, steps, seconds=None):
+    """Una ejecución de ``machine``; con ``seconds`` se simuló (no salió de un caché)."""
+    labels = (('machine', machine),)
+    observe('tm_run_steps', labels, steps)
+    if seconds is not None:
+        inc('tm_simulated_steps_total', labels, steps)
+        inc('tm_simulation_seconds_total', labels, seconds)
+
+
+def register_collector(collect):
+    """``collect()`` retorna ``[(nombre, etiquetas, valor)]`` con valores absolutos, leídos al exponer."""
+    _collectors.append(collect)
+
+
+def _merge_into(target, shard):
+    for key, value in list(shard.counters.items()):
+        target.counters[key] = target.counters.get(key, 0) + value
+    for key, counts in list(shard.histograms.items()):
+        total = target.histograms.setdefault(key, [0] * len(counts))
+        for i, c in enumerate(list(counts)):
+            total[i] += c
+
+
+def snapshot():
+    """Resumen de este proceso: ``{'pid', 'counters', 'histograms', 'gauges'}``."""
+    merged = _Shard(None)
+    with _lock:
+        alive = []
+        for shard in _shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+            else:
+                _merge_into(_retired, shard)
+        _shards[:] = alive
+        _merge_into(merged, _retired)
+        for shard in alive:
+            _merge_into(merged, shard)
+    gauges = []
+    for collect in _collectors:
+        for name, labels, value in collect():
+            if METRICS[name][0] == 'gauge':
+                gauges.append([name, labels, value])
+            else:
+                merged.counters[(name, labels)] = merged.counters.get((name, labels), 0) + value
+    return {
+        'pid': os.getpid(),
+        'counters': [[name, labels, value] for (name, labels), value in merged.counters.items()],
+        'histograms': [[name, labels, counts] for (name, labels), counts in merged.histograms.items()],
+        'gauges': gauges,
+    }
+
+
+def publish(directory):
+    """Escribe el resumen de este proceso de forma atómica."""
+    path = os.path.join(directory, f'worker-{os.getpid()}.json')
+    # El publicador y una consulta pueden escribir a la vez: cada hilo usa su propio temporal
+    tmp = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp, path)
+
+
+def _start_publisher():
+    global _publisher
+    directory = os.environ.get('TM_METRICS_DIR')
+    if not directory or _publisher is not None:
+        return
+    with _lock:
+        if _publisher is not None:
+            return
+        os.makedirs(directory, exist_ok=True)
+
+        def loop():
+            while True:
+                time.sleep(FLUSH_EVERY)
+                try:
+                    publish(directory)
+                except OSError:
+                    pass  # se reintenta en la próxima vuelta
+
+        _publisher = threading.Thread(target=loop, name='metrics-publisher', daemon=True)
+        _publisher.start()
+
+
+def _reset_after_fork():
+    # El hijo no hereda el hilo publicador, y sus contadores empiezan de cero con su propio pid
+    global _local, _retired, _publisher, _lock
+    _local, _retired, _publisher, _lock = threading.local(), _Shard(None), None, threading.Lock()
+    _shards.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _collect_workers():
+    directory = os.environ.get('TM_METRICS_DIR')
+    if not directory:
+        return [snapshot()]
+    os.makedirs(directory, exist_ok=True)
+    publish(directory)
+    reports = []
+    for name in os.listdir(directory):
+        if not (name.startswith('worker-') and name.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # un archivo a medio borrar o corrupto no debe romper la consulta
+    return reports
+
+
+def _labels(labels):
+    return tuple(tuple(pair) for pair in labels)
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value) if value == value and abs(value) != float('inf') else str(value)
+    return str(value)
+
+
+def render():
+    """Texto de exposición de Prometheus con las métricas de todos los workers."""
+    counters, histograms, gauges = {}, {}, {}
+    for report in _collect_workers():
+        for name, labels, value in report['counters']:
+            key = (name, _labels(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts in report['histograms']:
+            total = histograms.setdefault((name, _labels(labels)), [0] * len(counts))
+            for i, c in enumerate(counts):
+                total[i] += c
+        if report['pid'] == os.getpid() or _alive(report['pid']):
+            for name, labels, value in report['gauges']:
+                key = (name, _labels(labels))
+                gauges[key] = gauges.get(key, 0) + value
+
+    # Razones derivadas de los totales de todos los workers
+    cache_totals = {}
+    for (name, labels), value in counters.items():
+        if name == 'tm_cache_requests_total':
+            fields = dict(labels)
+            entry = cache_totals.setdefault(fields['cache'], [0, 0])
+            entry[fields['outcome'] != 'hit'] += value
+    for cache, (hits, misses) in cache_totals.items():
+        gauges[('tm_cache_hit_ratio', (('cache', cache),))] = hits / (hits + misses) if hits + misses else 0.0
+    for (name, labels), seconds in counters.items():
+        if name == 'tm_simulation_seconds_total' and seconds:
+            steps = counters.get(('tm_simulated_steps_total', labels), 0)
+            gauges[('tm_simulation_steps_per_second', labels)] = steps / seconds
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        if kind == 'histogram':
+            series = sorted((k, v) for k, v in histograms.items() if k[0] == name)
+        else:
+            source = counters if kind == 'counter' else gauges
+            series = sorted((k, v) for k, v in source.items() if k[0] == name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (_, labels), value in series:
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), value):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(float(bound))
+                lines.append(f'{name}_bucket{_format_labels(labels, (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_number(value[-2])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,365 @@
+"""Máquinas de Turing no deterministas: búsqueda en anchura sobre configuraciones.
+
+En la definición, una regla puede ser una lista de ternas alternativas:
+``δ(q, "a") = [["a", "R", "q"], ["X", "L", "p"]]``. La máquina acepta si
+alguna rama llega a un estado de aceptación; la búsqueda avanza por niveles
+(un nivel = un paso de todas las ramas) y se detiene en la primera rama que
+acepta, así que los pasos reportados son los del camino de aceptación más
+corto.
+
+Las cintas se representan como un cierre (zipper): el símbolo bajo el cabezal
+y dos listas enlazadas con lo que hay a la izquierda y a la derecha, del más
+cercano al más lejano. Un paso crea a lo sumo un nodo nuevo y comparte el
+resto con la configuración padre, así que miles de ramas con un prefijo común
+ocupan poco más que una. Los nodos se internan (un nodo por par ``(símbolo,
+cola)``) y las listas nunca terminan en blanco, de modo que dos cintas iguales
+son el mismo nodo: una configuración es la tupla ``(estado, símbolo, izquierda,
+derecha)`` de enteros y el conjunto de visitadas la deduplica de forma exacta
+por hash. La posición absoluta del cabezal no es parte de la clave porque el
+comportamiento no depende de ella.
+
+Con ``workers`` > 1 y una frontera grande, cada nivel de la frontera se reparte
+en el pool de procesos de ``batch``: cada bloque viaja con sus cintas
+serializadas, se expande ``POOL_LEVELS`` niveles con su propia tabla de nodos
+y la frontera resultante se deduplica contra las visitadas en el proceso
+principal.
+"""
+
+import time
+
+from engine import DEFAULT_MAX_STEPS, FOREIGN, HALT_ACCEPT, HALT_REJECT, MOVES, CompiledMachine, machine_hash
+from tape import Tape
+from validate import alternatives, analyze_definition
+
+DEFAULT_MAX_FRONTIER = 100_000
+DEFAULT_MAX_CONFIGS = 1_000_000
+# Desde este tamaño de frontera conviene repartirla entre procesos
+MIN_PARALLEL_FRONTIER = 4096
+# Niveles que expande cada bloque antes de volver al proceso principal
+POOL_LEVELS = 8
+
+
+class TapeNodes:
+    """Listas enlazadas internadas: el nodo 0 es la lista vacía (blancos hasta el infinito)."""
+
+    def __init__(self):
+        self.sym = [0]
+        self.tail = [0]
+        self.length = [0]
+        self.index = {}
+
+    def push(self, sym, tail):
+        if not tail and not sym:
+            return 0  # un blanco al final no cambia la cinta
+        key = tail << 8 | sym
+        node = self.index.get(key)
+        if node is None:
+            node = self.index[key] = len(self.sym)
+            self.sym.append(sym)
+            self.tail.append(tail)
+            self.length.append(self.length[tail] + 1)
+        return node
+
+    def pack(self, node):
+        """Símbolos de la lista, del más cercano al más lejano."""
+        out = bytearray()
+        sym, tail = self.sym, self.tail
+        while node:
+            out.append(sym[node])
+            node = tail[node]
+        return bytes(out)
+
+    def unpack(self, data):
+        node = 0
+        for s in reversed(data):
+            node = self.push(s, node)
+        return node
+
+
+class NondeterministicMachine:
+    """Máquina de una cinta cuyas reglas pueden tener varias alternativas.
+
+    ``table[estado * nsym + símbolo]`` es una tupla de ``(escribir, mover,
+    estado_siguiente)``; la tupla vacía significa que no hay regla y esa rama
+    rechaza.
+    """
+
+    tapes = 1
+    deterministic = False
+
+    def __init__(self, definition):
+        self.analysis = analyze_definition(definition)
+        if not self.analysis['valid']:
+            raise ValueError('Definición de máquina inválida: ' + '; '.join(self.analysis['errors']))
+        blank = definition.get('blank', '_')
+        transitions = definition.get('transitions', {})
+
+        states = list(definition.get('states', []))
+        for name in [definition['start'], *definition.get('accept', []), *definition.get('reject', [])]:
+            if name not in states:
+                states.append(name)
+        symbols = [blank]
+        for state, rules in transitions.items():
+            if state not in states:
+                states.append(state)
+            for sym, rule in rules.items():
+                for write, _, nxt in alternatives(rule):
+                    for s in (sym, write):
+                        if s not in symbols:
+                            symbols.append(s)
+                    if nxt not in states:
+                        states.append(nxt)
+        if len(symbols) > 255:
+            raise ValueError('La máquina usa más de 255 símbolos de cinta')
+
+        self.definition = definition
+        self.hash = machine_hash(definition)
+        self.blank = blank
+        self.states = states
+        # Última columna: símbolos de entrada fuera del alfabeto, sin reglas (ver ``CompiledMachine.encode``)
+        self.symbols = symbols + [FOREIGN]
+        self.state_index = {s: i for i, s in enumerate(states)}
+        self.symbol_index = {s: i for i, s in enumerate(symbols)}
+        self.nsym = nsym = len(self.symbols)
+        self.start = self.state_index[definition['start']]
+
+        self.halt = bytearray(len(states))
+        for name in definition.get('accept', []):
+            self.halt[self.state_index[name]] = HALT_ACCEPT
+        for name in definition.get('reject', []):
+            self.halt[self.state_index[name]] = HALT_REJECT
+
+        self.table = [()] * (len(states) * nsym)
+        for state, rules in transitions.items():
+            base = self.state_index[state] * nsym
+            for sym, rule in rules.items():
+                self.table[base + self.symbol_index[sym]] = tuple(
+                    (self.symbol_index[write], MOVES[move], self.state_index[nxt])
+                    for write, move, nxt in alternatives(rule))
+
+    encode = CompiledMachine.encode
+    decode = CompiledMachine.decode
+
+    def run(self, text, max_steps=DEFAULT_MAX_STEPS, rle=False, accelerate=False, detect_loops=False,
+            max_cells=None, max_seconds=None, codegen=False, max_frontier=DEFAULT_MAX_FRONTIER,
+            max_configs=DEFAULT_MAX_CONFIGS, workers=None):
+        """Busca en anchura una rama que acepte ``text``.
+
+        ``max_steps`` limita la profundidad, ``max_frontier`` las ramas vivas
+        en un nivel, ``max_configs`` las configuraciones distintas visitadas y
+        ``max_cells`` el largo de cada cinta. ``REJECT`` significa que se
+        agotaron las configuraciones alcanzables sin aceptar. La cinta del
+        resultado es la de la rama que aceptó o, si ninguna aceptó, la de la
+        última que se detuvo. Los ciclos siempre se descartan (``detect_loops``
+        se ignora); ``rle``, ``accelerate`` y ``codegen`` no aplican.
+
+        El resultado agrega ``configurations`` (configuraciones expandidas) y
+        ``max_frontier`` (la frontera más ancha). En modo paralelo los niveles
+        intermedios de cada bloque no se deduplican contra los demás bloques,
+        así que esos conteos pueden ser algo mayores.
+        """
+        if rle or accelerate or codegen:
+            raise ValueError('Los modos RLE, acelerado y de código generado solo admiten máquinas deterministas')
+        nodes = TapeNodes()
+        cells = self.encode(text)
+        first = (self.start, cells[0] if cells else 0, 0, nodes.unpack(cells[1:]), 0)
+        if self.halt[self.start]:
+            return self._result(nodes, first, self.halt[self.start], 0, {'configurations': 0, 'max_frontier': 1})
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        search = _Search(self, nodes, max_cells or float('inf'))
+        search.visited.add(first[:4])
+        frontier = [first]
+        budget = None
+        while True:
+            if search.depth >= max_steps:
+                budget = 'steps'
+                break
+            if workers and workers > 1 and len(frontier) >= MIN_PARALLEL_FRONTIER:
+                levels = min(POOL_LEVELS, max_steps - search.depth)
+                frontier = self._expand_parallel(search, frontier, levels, max_frontier, workers)
+            else:
+                frontier = search.level(frontier, max_frontier)
+            if search.accepted is not None:
+                break
+            if search.budget or not frontier:
+                budget = search.budget
+                break
+            if len(frontier) > max_frontier:
+                budget = 'frontier'
+                break
+            if len(search.visited) > max_configs:
+                budget = 'configs'
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                budget = 'time'
+                break
+        stats = {'configurations': search.expanded, 'max_frontier': max([1, *search.widths])}
+        if search.accepted is not None:
+            return self._result(nodes, search.accepted, HALT_ACCEPT, search.accepted_steps, stats)
+        if budget is not None:
+            return self._result(nodes, frontier[0] if frontier else first, None, search.depth, stats, budget)
+        if search.halted is None:
+            # Todas las ramas terminaron en ciclos: la última frontera no vacía era la inicial
+            return self._result(nodes, first, HALT_REJECT, search.depth, stats)
+        return self._result(nodes, search.halted, HALT_REJECT, search.halted_steps, stats)
+
+    def _expand_parallel(self, search, frontier, levels, max_frontier, workers):
+        """Expande ``levels`` niveles repartiendo ``frontier`` en el pool; retorna la nueva frontera."""
+        from batch import get_pool
+
+        nodes = search.nodes
+        base = len(search.widths)
+        size = max(1, -(-len(frontier) // (workers * 4)))
+        chunks = [[_pack_config(nodes, c) for c in frontier[i:i + size]] for i in range(0, len(frontier), size)]
+        count = len(chunks)
+        parts = list(get_pool().map(_expand_chunk, [self] * count, chunks, [search.depth] * count,
+                                    [levels] * count, [max_frontier] * count, [search.max_cells] * count))
+        # Anchos por nivel: suma de los de cada bloque (sin deduplicar entre bloques)
+        for part in parts:
+            search.expanded += part['expanded']
+            for i, width in enumerate(part['widths']):
+                if i < len(search.widths) - base:
+                    search.widths[base + i] += width
+                else:
+                    search.widths.append(width)
+        accepted = [p for p in parts if p['accepted'] is not None]
+        if accepted:
+            best = min(accepted, key=lambda p: p['accepted_steps'])
+            search.accepted = _unpack_config(nodes, best['accepted'])
+            search.accepted_steps = best['accepted_steps']
+            return []
+        merged = []
+        visited = search.visited
+        for part in parts:
+            if part['halted'] is not None and part['halted_steps'] >= search.halted_steps:
+                search.halted = _unpack_config(nodes, part['halted'])
+                search.halted_steps = part['halted_steps']
+            search.budget = search.budget or part['budget']
+            search.depth = max(search.depth, part['depth'])
+            for packed in part['frontier']:
+                config = _unpack_config(nodes, packed)
+                if config[:4] not in visited:
+                    visited.add(config[:4])
+                    merged.append(config)
+        return merged
+
+    def _result(self, nodes, config, halt, steps, stats, budget='steps'):
+        """Resultado con el formato de ``CompiledMachine.run`` para la rama ``config``."""
+        state, sym, left, right, pos = config
+        before = nodes.pack(left)[::-1]
+        tape = Tape(before + bytes((sym,)) + nodes.pack(right))
+        tape.origin = len(before) - pos
+        result = CompiledMachine._result(self, halt, steps, state, tape, pos, budget)
+        result.update(stats)
+        return result
+
+    def _deterministic_only(self, *args, **kwargs):
+        raise ValueError('Esta operación solo admite máquinas deterministas')
+
+    profile = trace = initial_config = advance = result = _deterministic_only
+
+
+class _Search:
+    """Estado de la búsqueda: tabla de nodos, configuraciones visitadas y desenlace.
+
+    ``depth`` es la profundidad de la frontera que se está expandiendo;
+    ``halted`` es la última rama que se detuvo sin aceptar.
+    """
+
+    def __init__(self, tm, nodes, max_cells, depth=0):
+        self.tm = tm
+        self.nodes = nodes
+        self.max_cells = max_cells
+        self.depth = depth
+        self.visited = set()
+        self.accepted = None
+        self.accepted_steps = 0
+        self.halted = None
+        self.halted_steps = 0
+        self.budget = None
+        self.expanded = 0
+        self.widths = []
+
+    def level(self, frontier, max_frontier):
+        """Un paso de todas las ramas de ``frontier``; retorna la frontera siguiente."""
+        tm = self.tm
+        table, nsym, halt = tm.table, tm.nsym, tm.halt
+        nodes = self.nodes
+        push, syms, tails, length = nodes.push, nodes.sym, nodes.tail, nodes.length
+        visited = self.visited
+        max_cells = self.max_cells
+        depth = self.depth
+        out = []
+        for config in frontier:
+            state, sym, left, right, pos = config
+            options = table[state * nsym + sym]
+            if not options:
+                # Sin regla la rama rechaza sin contar el paso, como en ``CompiledMachine.run``
+                self.halted, self.halted_steps = config, depth
+                continue
+            for write, move, target in options:
+                if move > 0:
+                    l2 = push(write, left)
+                    s2, r2 = syms[right], tails[right]
+                elif move < 0:
+                    r2 = push(write, right)
+                    s2, l2 = syms[left], tails[left]
+                else:
+                    s2, l2, r2 = write, left, right
+                child = (target, s2, l2, r2, pos + move)
+                h = halt[target]
+                if h == HALT_ACCEPT:
+                    self.accepted, self.accepted_steps = child, depth + 1
+                    return []
+                if h:
+                    self.halted, self.halted_steps = child, depth + 1
+                    continue
+                key = child[:4]
+                if key in visited:
+                    continue
+                if length[l2] + length[r2] >= max_cells:
+                    self.budget = 'tape'
+                    return out
+                visited.add(key)
+                out.append(child)
+            if len(out) > max_frontier:
+                break
+        self.expanded += len(frontier)
+        self.widths.append(len(out))
+        self.depth = depth + 1
+        return out
+
+
+def _unpack_config(nodes, packed):
+    state, sym, left, right, pos = packed
+    return state, sym, nodes.unpack(left), nodes.unpack(right), pos
+
+
+def _pack_config(nodes, config):
+    state, sym, left, right, pos = config
+    return state, sym, nodes.pack(left), nodes.pack(right), pos
+
+
+def _expand_chunk(tm, packed, depth, levels, max_frontier, max_cells):
+    """Expande un bloque de la frontera ``levels`` niveles en un proceso del pool."""
+    nodes = TapeNodes()
+    search = _Search(tm, nodes, max_cells, depth)
+    frontier = [_unpack_config(nodes, p) for p in packed]
+    search.visited.update(c[:4] for c in frontier)
+    while search.depth < depth + levels and frontier and not search.budget:
+        frontier = search.level(frontier, max_frontier)
+        if search.accepted is not None:
+            return {'accepted': _pack_config(nodes, search.accepted), 'accepted_steps': search.accepted_steps,
+                    'expanded': search.expanded, 'widths': search.widths}
+        if len(frontier) > max_frontier:
+            search.budget = 'frontier'
+    return {
+        'accepted': None,
+        'depth': search.depth,
+        'frontier': [_pack_config(nodes, c) for c in frontier],
+        'halted': _pack_config(nodes, search.halted) if search.halted else None,
+        'halted_steps': search.halted_steps,
+        'budget': search.budget,
+        'expanded': search.expanded,
+        'widths': search.widths,
+    }
@@ -0,0 +1,51 @@
+"""Respuestas inmutables servidas desde bytes precomprimidos.
+
+Un cuerpo que no cambia entre peticiones (la página principal, el catálogo)
+se serializa y comprime una sola vez; cada petición solo elige la variante
+según ``Accept-Encoding`` y responde ``304`` si el cliente ya tiene la
+versión actual (ETag fuerte o ``If-Modified-Since``).
+"""
+
+import gzip
+import hashlib
+from datetime import datetime, timezone
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él solo se ofrece gzip
+    brotli = None
+
+
+class PrecompressedBody:
+    """Cuerpo de respuesta con ETag de contenido y variantes gzip/brotli."""
+
+    def __init__(self, body, mimetype, cache_control='no-cache'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self.variants = {'identity': body, 'gzip': gzip.compress(body, 9)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body)
+
+    def response(self, request):
+        """Construye la respuesta para ``request``, condicional si corresponde."""
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in self.variants and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+
+        resp = Response(self.variants[encoding], mimetype=self.mimetype)
+        if encoding != 'identity':
+            resp.headers['Content-Encoding'] = encoding
+        resp.headers['Vary'] = 'Accept-Encoding'
+        resp.headers['Cache-Control'] = self.cache_control
+        # Cada codificación es una representación distinta: ETag fuerte propio
+        resp.set_etag(self.etag if encoding == 'identity' else f'{self.etag}-{encoding}')
+        resp.last_modified = self.last_modified
+        return resp.make_conditional(request)
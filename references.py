@@ -0,0 +1,40 @@
+"""Predicados de referencia del lenguaje de cada máquina de la biblioteca.
+
+Son funciones de nivel de módulo (no lambdas) para que se puedan enviar al
+pool de procesos con pickle.
+"""
+
+
+def _blocks(word, letters):
+    """True si ``word`` es ``letters[0]^n letters[1]^n ...`` para algún n >= 0."""
+    n, rem = divmod(len(word), len(letters))
+    return rem == 0 and word == ''.join(ch * n for ch in letters)
+
+
+def anbn(word):
+    return _blocks(word, 'ab')
+
+
+def palindrome(word):
+    return word == word[::-1]
+
+
+def zerononen(word):
+    return _blocks(word, '01')
+
+
+def even_ones(word):
+    return word.count('1') % 2 == 0
+
+
+def odd_ones(word):
+    return word.count('1') % 2 == 1
+
+
+def ww(word):
+    half, rem = divmod(len(word), 2)
+    return rem == 0 and word[:half] == word[half:]
+
+
+def anbncn(word):
+    return word != '' and _blocks(word, 'abc')
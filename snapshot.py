@@ -0,0 +1,98 @@
+"""Formato binario compacto de una configuración en curso.
+
+Una instantánea guarda el hash de la máquina, el índice de estado, el código
+de detención, los pasos, el cabezal y la cinta recortada de blancos y
+comprimida con zlib. Sirve para pausar una corrida larga y continuarla en
+otro proceso u otro servidor: basta tener la misma definición de máquina.
+
+Disposición (little-endian)::
+
+    'TMSN' versión(1) hash(32) estado(u32) halt(u8) pasos(u64)
+    cabezal(i64) primera_celda(i64) celdas_zlib...
+
+El cabezal y la primera celda son posiciones relativas al primer símbolo de
+la entrada, así que no dependen del tamaño del buffer en memoria.
+"""
+
+import os
+import struct
+import zlib
+
+from engine import HALT_REJECT, RUNNING, Configuration
+from tape import Tape
+
+MAGIC = b'TMSN'
+VERSION = 1
+# Celdas que puede ocupar la cinta reconstruida, contando los blancos hasta el cabezal
+MAX_CELLS = 1 << 26
+_HEADER = struct.Struct('<4sB32sIBQqq')
+
+
+def dump_snapshot(tm, config):
+    """Serializa ``config`` (de la máquina compilada ``tm``) a bytes."""
+    cells = config.tape.cells
+    origin = config.tape.origin
+    stripped = cells.lstrip(b'\0')
+    first = len(cells) - len(stripped)
+    stripped = stripped.rstrip(b'\0')
+    header = _HEADER.pack(MAGIC, VERSION, bytes.fromhex(tm.hash), config.state, config.halt,
+                          config.steps, config.head - origin, first - origin)
+    return header + zlib.compress(bytes(stripped))
+
+
+def snapshot_hash(data):
+    """Hash (hex) de la máquina a la que pertenece la instantánea."""
+    if len(data) < _HEADER.size or data[:4] != MAGIC:
+        raise ValueError('No es una instantánea de máquina de Turing')
+    return data[5:37].hex()
+
+
+def load_snapshot(tm, data, max_cells=MAX_CELLS):
+    """Reconstruye la ``Configuration`` de ``data``; ``tm`` debe ser la misma máquina.
+
+    Cualquier campo inconsistente con ``tm`` o una cinta de más de
+    ``max_cells`` celdas es ``ValueError``.
+    """
+    if snapshot_hash(data) != tm.hash:
+        raise ValueError('La instantánea pertenece a otra máquina')
+    _, version, _, state, halt, steps, head, first = _HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f'Versión de instantánea no soportada: {version}')
+    # Descomprimir con tope para que unos pocos bytes no se expandan sin límite
+    inflater = zlib.decompressobj()
+    try:
+        stored = inflater.decompress(data[_HEADER.size:], max_cells + 1)
+    except zlib.error:
+        raise ValueError('Instantánea corrupta') from None
+    if len(stored) > max_cells:
+        raise ValueError(f'La cinta de la instantánea supera {max_cells} celdas')
+    if not inflater.eof or inflater.unconsumed_tail or inflater.unused_data:
+        raise ValueError('Instantánea corrupta')
+    if state >= len(tm.states) or max(stored, default=0) >= tm.nsym:
+        raise ValueError('La instantánea no corresponde a la máquina')
+    # Sin regla para el símbolo leído se detiene rechazando en un estado que no es final
+    if halt != tm.halt[state] and not (halt == HALT_REJECT and tm.halt[state] == RUNNING):
+        raise ValueError('El código de detención no corresponde al estado')
+    # El buffer cubre las celdas guardadas y el cabezal
+    lo = min(first, head)
+    hi = max(first + len(stored), head + 1)
+    if hi - lo > max_cells:
+        raise ValueError(f'El cabezal está a más de {max_cells} celdas de la cinta')
+    cells = bytearray(hi - lo)
+    cells[first - lo:first - lo + len(stored)] = stored
+    tape = Tape(cells)
+    tape.origin = -lo
+    return Configuration(state, head - lo, tape, steps, halt)
+
+
+def save_snapshot(path, tm, config):
+    """Escribe la instantánea de forma atómica: un lector nunca ve un archivo a medias."""
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(dump_snapshot(tm, config))
+    os.replace(tmp, path)
+
+
+def read_snapshot(path, tm):
+    with open(path, 'rb') as f:
+        return load_snapshot(tm, f.read())
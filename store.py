@@ -0,0 +1,159 @@
+"""Almacén persistente de máquinas en SQLite.
+
+Cada máquina es una fila con su definición y su ficha (nombre, descripción,
+ejemplos, alfabeto) serializadas en JSON, y columnas indexadas para buscar
+por clave, alfabeto, autor y hash. El catálogo se pagina por clave (``WHERE
+key > ?``), así que una página cuesta lo mismo con diez máquinas que con
+cien mil, y solo se devuelven fichas: la definición completa se pide por
+clave cuando hace falta.
+
+Cada hilo usa su propia conexión. Sin ruta, la base vive en memoria y la
+comparten los hilos del proceso; con ``TM_STORE_PATH`` es un archivo (en
+modo WAL) que comparten todos los workers de gunicorn. Una base en memoria
+se pierde al reiniciar y cada worker tendría la suya, así que la aplicación
+solo acepta máquinas nuevas cuando el almacén es ``persistent``.
+"""
+
+import itertools
+import json
+import os
+import sqlite3
+import threading
+
+import references
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS machines (
+    key TEXT PRIMARY KEY,
+    author TEXT,
+    alphabet TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    reference TEXT,
+    summary TEXT NOT NULL,
+    definition TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS machines_alphabet ON machines (alphabet, key);
+CREATE INDEX IF NOT EXISTS machines_author ON machines (author, key);
+CREATE INDEX IF NOT EXISTS machines_hash ON machines (hash);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('version', 0);
+'''
+
+_memory_ids = itertools.count()
+
+
+class DuplicateKey(Exception):
+    """La clave ya existe y no se pidió reemplazarla."""
+
+
+def alphabet_key(alphabet):
+    """Forma indexada de un alfabeto: sus símbolos ordenados y sin repetir."""
+    return ''.join(sorted(set(alphabet)))
+
+
+class MachineStore:
+    def __init__(self, path=None):
+        self.persistent = path is not None
+        if path is None:
+            self.uri = f'file:tm-store-{os.getpid()}-{next(_memory_ids)}?mode=memory&cache=shared'
+        else:
+            self.uri = 'file:' + os.path.abspath(path)
+        self._local = threading.local()
+        # Mantiene viva la base en memoria mientras exista el almacén
+        self._keeper = self._connect()
+        if path is not None:
+            self._keeper.execute('PRAGMA journal_mode=WAL')
+        with self._keeper:
+            self._keeper.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls):
+        """Almacén en el archivo ``TM_STORE_PATH``, o en memoria si la variable no está definida."""
+        return cls(os.environ.get('TM_STORE_PATH') or None)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.uri, uri=True, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def version(self):
+        """Número que cambia con cada escritura; sirve para invalidar cachés de páginas."""
+        return self.conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()[0]
+
+    def put(self, key, entry, digest, author=None, replace=True):
+        """Agrega o reemplaza la máquina ``key``; ``digest`` es el hash de su definición compilada.
+
+        Con ``replace=False`` una clave existente no se toca y se lanza
+        ``DuplicateKey``; la comprobación y la escritura son una sola sentencia.
+        """
+        reference = entry.get('reference')
+        if callable(reference):
+            reference = reference.__name__
+        summary = {field: entry[field] for field in ('name', 'description', 'examples', 'alphabet')}
+        summary['tapes'] = entry['machine'].get('tapes', 1)
+        with self.conn as conn:
+            written = conn.execute(f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO machines "
+                                   'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                   (key, author, alphabet_key(entry['alphabet']), digest, reference,
+                                    json.dumps(summary, ensure_ascii=False),
+                                    json.dumps(entry['machine'], ensure_ascii=False))).rowcount
+            if not written:
+                raise DuplicateKey(key)
+            conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'version'")
+
+    def seed(self, library, compile_machine):
+        """Carga las máquinas de ``library`` que falten o cuya definición haya cambiado."""
+        for key, entry in library.items():
+            digest = compile_machine(entry['machine']).hash
+            if self.hash_of(key) != digest:
+                self.put(key, entry, digest)
+
+    def hash_of(self, key):
+        row = self.conn.execute('SELECT hash FROM machines WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def __contains__(self, key):
+        return self.hash_of(key) is not None
+
+    def key_for_hash(self, digest):
+        row = self.conn.execute('SELECT key FROM machines WHERE hash = ? LIMIT 1', (digest,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, key):
+        """Ficha, definición (``machine``) y predicado de referencia de ``key``, o ``None``."""
+        row = self.conn.execute('SELECT * FROM machines WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        entry = json.loads(row['summary'])
+        entry.update(key=key, author=row['author'], hash=row['hash'], machine=json.loads(row['definition']),
+                     reference=getattr(references, row['reference'] or '', None))
+        return entry
+
+    def page(self, after=None, limit=DEFAULT_PAGE_SIZE, alphabet=None, author=None):
+        """Fichas de hasta ``limit`` máquinas con clave mayor que ``after``, en orden de clave.
+
+        Retorna ``(fichas, siguiente)``; ``siguiente`` es el ``after`` de la
+        próxima página o ``None`` si no hay más.
+        """
+        where, params = ['key > ?'], [after or '']
+        if alphabet is not None:
+            where.append('alphabet = ?')
+            params.append(alphabet_key(alphabet))
+        if author is not None:
+            where.append('author = ?')
+            params.append(author)
+        rows = self.conn.execute(f"SELECT key, author, summary FROM machines WHERE {' AND '.join(where)} "
+                                 'ORDER BY key LIMIT ?', (*params, limit + 1)).fetchall()
+        summaries = [{'key': row['key'], 'author': row['author'], **json.loads(row['summary'])}
+                     for row in rows[:limit]]
+        return summaries, (summaries[-1]['key'] if len(rows) > limit else None)
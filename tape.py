@@ -0,0 +1,164 @@
+"""Cintas para el motor del servidor.
+
+Las celdas guardan índices de símbolo (el blanco es 0). Hay dos
+representaciones:
+
+* ``Tape``: buffer denso con origen móvil. Crece hacia ambos lados
+  duplicando su tamaño, así que extenderla es O(1) amortizado aunque la
+  máquina barra hacia la izquierda (a diferencia de ``unshift`` en JS).
+* ``RunLengthTape``: corridas ``(símbolo, longitud)``. Las corridas largas
+  de blancos o marcas (los barridos de ``X``/``Y``/``Z``) ocupan una sola
+  entrada, así que una cinta de millones de celdas ocupa poca memoria.
+"""
+
+
+class Tape:
+    """Cinta densa sobre un ``bytearray`` que crece en ambos sentidos.
+
+    ``cells[i]`` corresponde a la posición ``i - origin`` relativa al primer
+    símbolo de la entrada. El motor accede a ``cells`` directamente y solo
+    llama a ``grow`` cuando el cabezal sale del buffer.
+    """
+
+    __slots__ = ('cells', 'origin')
+
+    def __init__(self, cells=b''):
+        self.cells = bytearray(cells) or bytearray(1)
+        self.origin = 0
+
+    def grow(self, head):
+        """Amplía el buffer para que el índice ``head`` sea válido y retorna su nuevo valor."""
+        cells = self.cells
+        n = len(cells)
+        if head < 0:
+            extra = max(n, -head)
+            cells[:0] = bytes(extra)
+            self.origin += extra
+            return head + extra
+        if head >= n:
+            cells.extend(bytes(max(n, head - n + 1)))
+        return head
+
+    def copy(self):
+        tape = Tape.__new__(Tape)
+        tape.cells = bytearray(self.cells)
+        tape.origin = self.origin
+        return tape
+
+    def export(self):
+        """Retorna ``(celdas, posición de la primera celda)``."""
+        return bytes(self.cells), -self.origin
+
+
+class RunLengthTape:
+    """Cinta comprimida por corridas con un cursor ``(corrida, desplazamiento)``.
+
+    Leer y moverse son O(1); escribir un símbolo distinto parte una corrida
+    (O(número de corridas) por la inserción en la lista), lo que es barato
+    mientras la cinta tenga pocas corridas.
+    """
+
+    __slots__ = ('syms', 'lens', 'run', 'off', 'start', 'pos', 'size')
+
+    def __init__(self, cells=b''):
+        syms, lens = [], []
+        for c in cells:
+            if syms and syms[-1] == c:
+                lens[-1] += 1
+            else:
+                syms.append(c)
+                lens.append(1)
+        if not syms:
+            syms, lens = [0], [1]
+        self.syms, self.lens = syms, lens
+        self.run = self.off = 0
+        self.start = 0  # posición de la primera celda de la primera corrida
+        self.pos = 0    # posición absoluta del cabezal
+        self.size = sum(lens)  # celdas visitadas, para el presupuesto de celdas
+
+    def __len__(self):
+        """Número de corridas (no de celdas)."""
+        return len(self.syms)
+
+    def read(self):
+        return self.syms[self.run]
+
+    def write(self, sym):
+        syms, lens, r, off = self.syms, self.lens, self.run, self.off
+        old = syms[r]
+        if old == sym:
+            return
+        length = lens[r]
+        if length == 1:
+            syms[r] = sym
+            if r + 1 < len(syms) and syms[r + 1] == sym:
+                lens[r] += lens.pop(r + 1)
+                del syms[r + 1]
+            if r > 0 and syms[r - 1] == sym:
+                self.off = lens[r - 1]
+                lens[r - 1] += lens.pop(r)
+                del syms[r]
+                self.run = r - 1
+        elif off == 0:
+            if r > 0 and syms[r - 1] == sym:
+                lens[r - 1] += 1
+                lens[r] -= 1
+                self.run = r - 1
+                self.off = lens[r - 1] - 1
+            else:
+                lens[r] -= 1
+                syms.insert(r, sym)
+                lens.insert(r, 1)
+        elif off == length - 1:
+            lens[r] -= 1
+            if r + 1 < len(syms) and syms[r + 1] == sym:
+                lens[r + 1] += 1
+            else:
+                syms.insert(r + 1, sym)
+                lens.insert(r + 1, 1)
+            self.run = r + 1
+            self.off = 0
+        else:
+            lens[r] = off
+            syms[r + 1:r + 1] = [sym, old]
+            lens[r + 1:r + 1] = [1, length - off - 1]
+            self.run = r + 1
+            self.off = 0
+
+    def move(self, d):
+        if d > 0:
+            self.pos += 1
+            self.off += 1
+            if self.off == self.lens[self.run]:
+                if self.run + 1 < len(self.syms):
+                    self.run += 1
+                    self.off = 0
+                elif self.syms[self.run] == 0:
+                    self.lens[self.run] += 1
+                    self.size += 1
+                else:
+                    self.syms.append(0)
+                    self.lens.append(1)
+                    self.run += 1
+                    self.off = 0
+                    self.size += 1
+        elif d < 0:
+            self.pos -= 1
+            self.off -= 1
+            if self.off < 0:
+                if self.run > 0:
+                    self.run -= 1
+                    self.off = self.lens[self.run] - 1
+                else:
+                    self.start -= 1
+                    self.off = 0
+                    self.size += 1
+                    if self.syms[0] == 0:
+                        self.lens[0] += 1
+                    else:
+                        self.syms.insert(0, 0)
+                        self.lens.insert(0, 1)
+
+    def export(self):
+        """Retorna ``(celdas, posición de la primera celda)`` materializando la cinta."""
+        return b''.join(bytes((s,)) * n for s, n in zip(self.syms, self.lens)), self.start
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Máquina mínima de una cinta: acepta las cadenas de 0 y 1 con una cantidad par de unos
+EVEN_ONES = {
+    'states': ['even', 'odd', 'yes', 'no'],
+    'start': 'even',
+    'accept': ['yes'],
+    'reject': ['no'],
+    'blank': '_',
+    'transitions': {
+        'even': {'0': ['0', 'R', 'even'], '1': ['1', 'R', 'odd'], '_': ['_', 'N', 'yes']},
+        'odd': {'0': ['0', 'R', 'odd'], '1': ['1', 'R', 'even'], '_': ['_', 'N', 'no']},
+    },
+}
+
+
+@pytest.fixture
+def even_ones():
+    from engine import compile_machine
+    return compile_machine(EVEN_ONES)
+
+
+@pytest.fixture(scope='session')
+def library():
+    pytest.importorskip('flask')
+    import app
+    return app.MACHINE_LIBRARY
+
+
+@pytest.fixture
+def client():
+    pytest.importorskip('flask')
+    import app
+    app.app.config['TESTING'] = True
+    return app.app.test_client()
+
+
+@pytest.fixture
+def persistent_store(tmp_path, monkeypatch):
+    """Almacén en un archivo temporal, como con ``TM_STORE_PATH``, para las rutas que lo exigen"""
+    from collections import OrderedDict
+
+    import app
+    from store import MachineStore
+    store = MachineStore(str(tmp_path / 'machines.db'))
+    store.seed(app.MACHINE_LIBRARY, app.compile_machine)
+    monkeypatch.setattr(app, '_machine_store', store)
+    # Las páginas guardadas se indexan por versión, que se repite entre almacenes
+    monkeypatch.setattr(app, '_catalog_pages', OrderedDict())
+    return store
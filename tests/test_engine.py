@@ -0,0 +1,136 @@
+import random
+import time
+
+import pytest
+
+from engine import ACCEPT, BUDGET_EXCEEDED, FOREIGN, LOOP, REJECT, compile_machine
+
+
+def test_even_ones(even_ones):
+    assert even_ones.run('0110')['result'] == ACCEPT
+    assert even_ones.run('010')['result'] == REJECT
+
+
+@pytest.mark.parametrize('options', [{}, {'rle': True}, {'accelerate': True}, {'codegen': True},
+                                     {'detect_loops': True, 'max_cells': 1 << 16, 'max_seconds': 5}])
+def test_foreign_symbol_rejects(even_ones, options):
+    # Un símbolo fuera del alfabeto no tiene reglas: la máquina rechaza al leerlo, no falla
+    result = even_ones.run('01x1', **options)
+    assert result['result'] == REJECT
+    assert result['steps'] == 2
+    assert result['tape'] == '01' + FOREIGN + '1'
+
+
+def test_foreign_symbol_never_read_is_kept(even_ones):
+    definition = dict(even_ones.definition, transitions={'even': {'0': ['0', 'N', 'yes']}})
+    result = compile_machine(definition).run('0x')
+    assert result['result'] == ACCEPT
+    assert result['tape'] == '0' + FOREIGN
+
+
+def random_inputs(alphabet, count, max_length, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choices(alphabet, k=rng.randint(0, max_length))) for _ in range(count)]
+
+
+MODES = [{'rle': True}, {'accelerate': True}, {'codegen': True}, {'detect_loops': True, 'max_cells': 1 << 20}]
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_modes_match_interpreter(library, options):
+    for key, entry in library.items():
+        tm = compile_machine(entry['machine'])
+        if tm.tapes > 1 or not tm.deterministic:
+            continue
+        for text in random_inputs(entry['alphabet'], 100, 12, seed=len(key)):
+            assert tm.run(text, max_steps=100_000, **options) == tm.run(text, max_steps=100_000), (key, text)
+
+
+# Escribe 1 sobre cada blanco y avanza: nunca para y la cinta crece en cada paso
+WRITER = {'states': ['q'], 'start': 'q', 'accept': [], 'reject': [], 'blank': '_',
+          'transitions': {'q': {'_': ['1', 'R', 'q']}}}
+# Alterna entre dos configuraciones en la misma celda: nunca para ni usa más cinta
+BLINKER = {'states': ['p', 'q'], 'start': 'p', 'accept': [], 'reject': [], 'blank': '_',
+           'transitions': {'p': {'_': ['1', 'N', 'q']}, 'q': {'1': ['_', 'N', 'p']}}}
+
+
+@pytest.mark.parametrize('options', [{}] + MODES[:3])
+def test_cell_budget_in_every_mode(options):
+    result = compile_machine(WRITER).run('', max_steps=10 ** 9, max_cells=1000, **options)
+    assert result['result'] == BUDGET_EXCEEDED
+    assert result['budget'] == 'tape'
+    assert result['steps'] < 1 << 15
+
+
+@pytest.mark.parametrize('options', [{}] + MODES[:3])
+def test_time_budget_in_every_mode(options):
+    started = time.monotonic()
+    result = compile_machine(BLINKER).run('', max_steps=10 ** 12, max_seconds=0.05, **options)
+    assert result['result'] == BUDGET_EXCEEDED
+    assert result['budget'] == 'time'
+    assert time.monotonic() - started < 2
+
+
+# Va y vuelve entre dos celdas sin cambiar la cinta
+PING_PONG = {'states': ['p', 'q'], 'start': 'p', 'accept': [], 'reject': [], 'blank': '_',
+             'transitions': {'p': {'_': ['_', 'R', 'q']}, 'q': {'_': ['_', 'L', 'p']}}}
+
+
+@pytest.mark.parametrize('options', MODES[:3])
+def test_detect_loops_takes_precedence_over_fast_modes(options):
+    result = compile_machine(PING_PONG).run('', max_steps=10 ** 9, detect_loops=True, **options)
+    assert result['result'] == 'LOOP'
+
+
+# Recorre blancos hacia la derecha sin escribir: sale de la cinta y nunca vuelve
+SWEEP = {'states': ['q'], 'start': 'q', 'accept': [], 'reject': [], 'blank': '_',
+         'transitions': {'q': {'_': ['_', 'R', 'q'], '1': ['1', 'R', 'q']}}}
+# Contador binario: vuelve al mismo estado y casilla con la cinta distinta, así que no es un ciclo
+COUNTER = {'states': ['inc', 'back'], 'start': 'inc', 'accept': [], 'reject': [], 'blank': '_',
+           'transitions': {'inc': {'1': ['0', 'L', 'inc'], '0': ['1', 'R', 'back'], '_': ['1', 'R', 'back']},
+                           'back': {'0': ['0', 'R', 'back'], '1': ['1', 'R', 'back'], '_': ['_', 'L', 'inc']}}}
+
+
+@pytest.mark.parametrize('definition', [PING_PONG, BLINKER])
+def test_loop_found_by_brent(definition):
+    # Con período 2, la configuración guardada en el paso 2 se repite en el paso 4
+    result = compile_machine(definition).run('', max_steps=10 ** 9, detect_loops=True)
+    assert result['result'] == LOOP
+    assert result['steps'] <= 4
+
+
+def test_loop_needs_the_same_tape():
+    result = compile_machine(COUNTER).run('', max_steps=100_000, detect_loops=True)
+    assert result['result'] == BUDGET_EXCEEDED
+    assert result['budget'] == 'steps'
+    assert result['steps'] == 100_000
+    assert result == compile_machine(COUNTER).run('', max_steps=100_000)
+
+
+@pytest.mark.parametrize('text', ['', '111'])
+def test_loop_sweeping_off_the_tape(text):
+    result = compile_machine(SWEEP).run(text, max_steps=10 ** 9, detect_loops=True)
+    assert result['result'] == LOOP
+    assert result['steps'] == max(len(text), 1)
+
+
+@pytest.mark.parametrize('text', ['', '111'])
+def test_accelerated_blank_sweep_exceeds_the_tape(text):
+    result = compile_machine(SWEEP).run(text, max_steps=10 ** 9, accelerate=True)
+    assert result['result'] == BUDGET_EXCEEDED
+    assert result['budget'] == 'tape'
+    assert result['steps'] == max(len(text), 1)
+
+
+@pytest.mark.parametrize('options', [{'max_cells': 1000}, {'detect_loops': True, 'max_cells': 1000}])
+def test_guarded_cell_budget(options):
+    result = compile_machine(WRITER).run('', max_steps=10 ** 9, **options)
+    assert (result['result'], result['budget']) == (BUDGET_EXCEEDED, 'tape')
+    assert 500 <= result['steps'] <= 1000
+
+
+@pytest.mark.parametrize('detect_loops', [False, True])
+def test_guarded_time_budget(detect_loops):
+    # COUNTER no repite configuraciones, así que solo lo detiene el reloj
+    result = compile_machine(COUNTER).run('', max_steps=10 ** 12, detect_loops=detect_loops, max_seconds=0.05)
+    assert (result['result'], result['budget']) == (BUDGET_EXCEEDED, 'time')
@@ -0,0 +1,48 @@
+from engine import REJECT, compile_machine
+from equivalence import check_equivalence, exhaustive_corpus
+
+
+def test_foreign_symbols_are_a_disagreement_not_an_error(library):
+    # zerononen no conoce 'a' ni 'b': para ella toda entrada no vacía de anbn se rechaza
+    a = compile_machine(library['anbn']['machine'])
+    b = compile_machine(library['zerononen']['machine'])
+    report = check_equivalence(a, b, exhaustive_corpus(['a', 'b'], 4), max_steps=10_000, workers=1)
+    assert not report['equivalent']
+    disagreement = report['first_disagreement']
+    assert disagreement['input'] == 'ab'
+    assert disagreement['b']['result'] == REJECT
+
+
+def test_equivalent_to_itself(library):
+    tm = compile_machine(library['anbn']['machine'])
+    report = check_equivalence(tm, tm, exhaustive_corpus(['a', 'b', 'x'], 4), max_steps=10_000, workers=1)
+    assert report['equivalent']
+    assert report['checked'] == sum(3 ** n for n in range(5))
+
+
+def test_route_reports_disagreement(client):
+    response = client.post('/equivalence', json={'a': 'anbn', 'b': 'zerononen', 'max_length': 3})
+    assert response.status_code == 200
+    assert response.get_json()['first_disagreement']['input'] == 'ab'
+
+
+def test_disagreement_reruns_get_the_remaining_time(library, monkeypatch):
+    a = compile_machine(library['anbn']['machine'])
+    b = compile_machine(library['zerononen']['machine'])
+    budgets = []
+    for tm in (a, b):
+        run = tm.run
+        monkeypatch.setattr(tm, 'run', lambda text, _run=run, **kwargs: budgets.append(kwargs) or _run(text, **kwargs))
+    report = check_equivalence(a, b, exhaustive_corpus(['a', 'b'], 4), max_steps=10_000, workers=1, max_seconds=5)
+    assert report['first_disagreement']['input'] == 'ab'
+    # Las dos últimas llamadas son las que arman el reporte de la discrepancia
+    assert all(0 < kwargs['max_seconds'] <= 5 for kwargs in budgets[-2:])
+
+
+def test_route_clamps_random_length(client, monkeypatch):
+    import app
+    lengths = []
+    monkeypatch.setattr(app, 'random_corpus', lambda alphabet, count, max_length, seed: lengths.append(max_length) or [])
+    response = client.post('/equivalence', json={'a': 'anbn', 'b': 'anbn', 'random': 10, 'max_length': 10 ** 9})
+    assert response.status_code == 200
+    assert lengths == [app.RANDOM_MAX_LENGTH]
@@ -0,0 +1,32 @@
+import pytest
+
+import history
+from engine import compile_machine
+from history import MIN_EVERY, RunHistory
+from test_engine import COUNTER
+
+
+def reconstructed(run, tm, steps):
+    """Compara cada paso reconstruido con una ejecución directa de ese largo."""
+    for n in steps:
+        view = run.view(n)
+        expected = tm.run('', max_steps=n)
+        assert {k: view[k] for k in ('steps', 'state', 'head', 'tape', 'offset')} == \
+            {k: expected[k] for k in ('steps', 'state', 'head', 'tape', 'offset')}, n
+
+
+@pytest.mark.parametrize('every', [1, 10, MIN_EVERY])
+def test_every_has_a_floor(every):
+    run = RunHistory(compile_machine(COUNTER), '', 1000, every)
+    assert run.every == MIN_EVERY
+    assert run.summary()['checkpoints'] == 1000 // MIN_EVERY + 1
+
+
+def test_checkpoints_are_thinned_past_the_byte_limit(monkeypatch):
+    monkeypatch.setattr(history, 'MAX_CHECKPOINT_BYTES', 200)
+    tm = compile_machine(COUNTER)
+    run = RunHistory(tm, '', 5000, MIN_EVERY)
+    assert run.every > MIN_EVERY
+    assert sum(len(c.tape.cells) for c in run.checkpoints) <= 200
+    assert [c.steps for c in run.checkpoints] == [i * run.every for i in range(len(run.checkpoints))]
+    reconstructed(run, tm, [0, 1, run.every - 1, run.every, 2345, 4999, 5000, 17])
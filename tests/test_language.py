@@ -0,0 +1,76 @@
+import itertools
+import time
+
+import pytest
+
+from engine import ACCEPT, REJECT, compile_machine
+from conftest import EVEN_ONES
+from language import enumerate_language
+
+
+def brute_force(tm, alphabet, max_length, max_steps):
+    """Conteos por longitud y cadenas aceptadas ejecutando cada cadena desde cero."""
+    counts, accepted = {}, []
+    for length in range(max_length + 1):
+        for word in map(''.join, itertools.product(alphabet, repeat=length)):
+            result = tm.run(word, max_steps=max_steps)
+            verdict = {ACCEPT: 'accepted', REJECT: 'rejected'}.get(result['result'], 'undecided')
+            counts[length, verdict] = counts.get((length, verdict), 0) + 1
+            if verdict == 'accepted':
+                accepted.append(word)
+    return counts, accepted
+
+
+def counts_of(stats):
+    return {(x['length'], verdict): x[verdict] for x in stats.summary()['lengths']
+            for verdict in ('accepted', 'rejected', 'undecided') if x[verdict]}
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_matches_brute_force(library, workers):
+    for key, entry in library.items():
+        tm = compile_machine(entry['machine'])
+        if tm.tapes > 1 or not tm.deterministic:
+            continue
+        alphabet = entry['alphabet']
+        max_length = 6 if len(alphabet) <= 2 else 4
+        stats = enumerate_language(tm, alphabet, max_length, max_steps=10_000, workers=workers)
+        counts, accepted = brute_force(tm, alphabet, max_length, 10_000)
+        assert counts_of(stats) == counts, key
+        assert stats.accepted_strings == accepted, key
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_one_symbol_alphabet(even_ones, workers):
+    stats = enumerate_language(even_ones, '1', 9, workers=workers)
+    counts, accepted = brute_force(even_ones, '1', 9, 10_000)
+    assert counts_of(stats) == counts
+    assert stats.accepted_strings == accepted
+
+
+def test_long_unary_input_does_not_recurse(even_ones):
+    stats = enumerate_language(even_ones, '1', 3000)
+    assert stats.accepted_strings == ['1' * n for n in range(0, 3001, 2)]
+    assert sum(stats.rejected) == 1500
+
+
+@pytest.mark.parametrize('route, body', [
+    ('/language', {'machine': EVEN_ONES, 'alphabet': ['1'], 'max_length': 10 ** 18}),
+    ('/language', {'machine': EVEN_ONES, 'alphabet': ['0', '1'], 'max_length': 10 ** 9}),
+    ('/language', {'machine': EVEN_ONES, 'alphabet': ['0', '1'], 'max_length': -1}),
+    ('/machines/anbn/language', {'max_length': 10 ** 9}),
+    ('/machines/anbn/verify', {'max_length': 10 ** 9}),
+    ('/equivalence', {'a': 'anbn', 'b': 'anbn', 'max_length': 10 ** 9}),
+])
+def test_oversized_corpus_is_rejected_quickly(client, route, body):
+    started = time.monotonic()
+    response = client.post(route, json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert time.monotonic() - started < 1
+
+
+def test_unary_language_route(client):
+    response = client.post('/language', json={'machine': EVEN_ONES, 'alphabet': ['1'], 'max_length': 3000})
+    assert response.status_code == 200
+    assert response.get_json()['accepted'] == 1501
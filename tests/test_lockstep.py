@@ -0,0 +1,87 @@
+import random
+import time
+
+import pytest
+
+from engine import BUDGET_EXCEEDED, compile_machine
+
+np = pytest.importorskip('numpy')
+import lockstep  # noqa: E402
+
+EXCURSION = 30
+
+
+def excursion_machine(direction):
+    """Sale ``EXCURSION`` celdas de la entrada hacia ``direction``, vuelve y acepta si el último símbolo es 1."""
+    back = 'L' if direction == 'R' else 'R'
+    same = lambda move, nxt: {s: [s, move, nxt] for s in '01_'}  # noqa: E731
+    transitions = {}
+    for i in range(EXCURSION):
+        transitions[f'out{i}'] = same(direction, f'out{i + 1}' if i + 1 < EXCURSION else 'back0')
+        transitions[f'back{i}'] = same(back, f'back{i + 1}' if i + 1 < EXCURSION else 'scan')
+    transitions['scan'] = {'0': ['0', 'R', 'scan'], '1': ['1', 'R', 'scan'], '_': ['_', 'L', 'last']}
+    transitions['last'] = {'0': ['0', 'N', 'no'], '1': ['1', 'N', 'yes']}
+    return compile_machine({'states': list(transitions) + ['yes', 'no'], 'start': 'out0',
+                            'accept': ['yes'], 'reject': ['no'], 'blank': '_', 'transitions': transitions})
+
+
+def random_inputs(alphabet, count, max_length, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choices(alphabet, k=rng.randint(0, max_length))) for _ in range(count)]
+
+
+def per_input(tm, inputs, max_steps):
+    return [(r['result'], r['steps']) for r in (tm.run(text, max_steps=max_steps) for text in inputs)]
+
+
+def test_matches_interpreter_on_library(library):
+    for key, entry in library.items():
+        tm = compile_machine(entry['machine'])
+        if tm.tapes > 1 or not tm.deterministic:
+            continue
+        inputs = random_inputs(entry['alphabet'], 300, 12, seed=len(key))
+        assert lockstep.run_lockstep(tm, inputs, 10_000) == per_input(tm, inputs, 10_000), key
+
+
+def test_foreign_symbols_reject(even_ones):
+    inputs = ['0110', '01x', 'x', ''] * 20
+    assert lockstep.run_lockstep(even_ones, inputs, 1000) == per_input(even_ones, inputs, 1000)
+
+
+@pytest.mark.parametrize('direction', ['L', 'R'])
+@pytest.mark.parametrize('max_bytes', [0, 1 << 30])
+def test_lanes_overrunning_the_tape(direction, max_bytes, monkeypatch):
+    # Con ``MAX_BYTES = 0`` la primera vez que un carril sale del arreglo todos terminan en el intérprete
+    monkeypatch.setattr(lockstep, 'MAX_BYTES', max_bytes)
+    tm = excursion_machine(direction)
+    inputs = random_inputs('01', 200, 10)
+    assert lockstep.run_lockstep(tm, inputs, 10_000) == per_input(tm, inputs, 10_000)
+
+
+def test_budget_exhausted_after_fallback(monkeypatch):
+    monkeypatch.setattr(lockstep, 'MAX_BYTES', 0)
+    tm = excursion_machine('R')
+    inputs = random_inputs('01', 100, 10)
+    assert lockstep.run_lockstep(tm, inputs, EXCURSION + 5) == per_input(tm, inputs, EXCURSION + 5)
+
+
+# Recorre la entrada y sigue hacia la derecha sobre blancos: el intérprete lo detecta como bucle
+SWEEPER = {'states': ['scan', 'yes'], 'start': 'scan', 'accept': ['yes'], 'reject': [], 'blank': '_',
+           'transitions': {'scan': {'0': ['0', 'R', 'scan'], '1': ['1', 'R', 'yes'], '_': ['_', 'R', 'scan']}}}
+
+
+@pytest.mark.parametrize('max_bytes', [0, 1 << 30])
+@pytest.mark.parametrize('max_cells', [8, 40, 1 << 20])
+def test_cell_budget_matches_interpreter(max_bytes, max_cells, monkeypatch):
+    monkeypatch.setattr(lockstep, 'MAX_BYTES', max_bytes)
+    inputs = random_inputs('01', 200, 12)
+    for tm in (excursion_machine('L'), excursion_machine('R'), compile_machine(SWEEPER)):
+        expected = [(r['result'], r['steps']) for r in (tm.run(text, max_steps=10_000, max_cells=max_cells)
+                                                        for text in inputs)]
+        assert lockstep.run_lockstep(tm, inputs, 10_000, max_cells=max_cells) == expected
+
+
+def test_expired_deadline():
+    tm = excursion_machine('R')
+    results = lockstep.run_lockstep(tm, ['01', '1'], 10_000, deadline=time.monotonic() - 1)
+    assert [verdict for verdict, _ in results] == [BUDGET_EXCEEDED] * 2
@@ -0,0 +1,76 @@
+import re
+import threading
+
+import pytest
+
+import metrics
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse(text):
+    """``{(nombre, etiquetas): valor}`` del formato de texto de Prometheus; falla ante líneas inválidas."""
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith('# HELP '):
+            continue
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ')
+            types[name] = kind
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name, _, labels, value = match.groups()
+        pairs = tuple(LABEL.findall(labels or ''))
+        assert ','.join(f'{k}="{v}"' for k, v in pairs) == (labels or ''), line
+        assert re.sub(r'_(bucket|sum|count)$', '', name) in types, line
+        samples[(name, pairs)] = float(value)
+    return samples, types
+
+
+def test_render_is_valid_exposition_text():
+    metrics.inc('tm_cache_requests_total', (('cache', 'test'), ('outcome', 'hit')), 3)
+    metrics.inc('tm_cache_requests_total', (('cache', 'test'), ('outcome', 'miss')))
+    metrics.observe('tm_run_steps', (('machine', 'quote"\\name'),), 50)
+    samples, types = parse(metrics.render())
+    assert types['tm_run_steps'] == 'histogram'
+    assert samples[('tm_cache_hit_ratio', (('cache', 'test'),))] == pytest.approx(0.75)
+    buckets = [v for (name, labels), v in samples.items()
+               if name == 'tm_run_steps_bucket' and labels[0] == ('machine', 'quote\\"\\\\name')]
+    assert buckets == sorted(buckets) and buckets[-1] >= 1
+
+
+def test_threads_are_summed():
+    def record():
+        for _ in range(1000):
+            metrics.inc('tm_simulated_steps_total', (('machine', 'threads'),))
+
+    before = parse(metrics.render())[0].get(('tm_simulated_steps_total', (('machine', 'threads'),)), 0)
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Los fragmentos de hilos terminados se fusionan sin perder cuentas
+    assert parse(metrics.render())[0][('tm_simulated_steps_total', (('machine', 'threads'),))] == before + 4000
+
+
+def test_counters_grow_after_run(client):
+    def scrape():
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        return parse(response.get_data(as_text=True))[0]
+
+    before = scrape()
+    # Una entrada nueva para que no salga del caché de veredictos
+    response = client.post('/run', json={'key': 'anbn', 'input': 'a' * 37 + 'b' * 37})
+    steps = response.get_json()['steps']
+    after = scrape()
+    machine = (('machine', 'anbn'),)
+    assert after[('tm_simulated_steps_total', machine)] == before.get(('tm_simulated_steps_total', machine), 0) + steps
+    assert after[('tm_run_steps_count', machine)] == before.get(('tm_run_steps_count', machine), 0) + 1
+    assert after[('tm_simulation_seconds_total', machine)] > before.get(('tm_simulation_seconds_total', machine), 0)
+    requests = [v for (name, labels), v in after.items() if name == 'tm_http_request_duration_seconds_count']
+    assert sum(requests) > sum(v for (name, _), v in before.items() if name == 'tm_http_request_duration_seconds_count')
@@ -0,0 +1,58 @@
+import itertools
+
+import pytest
+
+from conftest import EVEN_ONES
+from engine import ACCEPT, REJECT, compile_machine
+
+# Adivina dónde empieza el sufijo 01: acepta las cadenas de 0 y 1 que terminan en 01
+ENDS_01 = {
+    'states': ['q', 'p', 'r', 'yes'], 'start': 'q', 'accept': ['yes'], 'reject': [], 'blank': '_',
+    'transitions': {
+        'q': {'0': [['0', 'R', 'q'], ['0', 'R', 'p']], '1': ['1', 'R', 'q']},
+        'p': {'1': ['1', 'R', 'r']},
+        'r': {'_': ['_', 'N', 'yes']},
+    },
+}
+
+
+def corpus(max_length):
+    for n in range(max_length + 1):
+        for letters in itertools.product('01', repeat=n):
+            yield ''.join(letters)
+
+
+def test_accepts_exactly_the_language():
+    tm = compile_machine(ENDS_01)
+    assert not tm.deterministic
+    for text in corpus(7):
+        result = tm.run(text, max_steps=1000)
+        assert result['result'] == (ACCEPT if text.endswith('01') else REJECT), text
+
+
+def test_foreign_symbols_reject():
+    assert compile_machine(ENDS_01).run('0x01', max_steps=1000)['result'] == REJECT
+
+
+def test_cycles_are_discarded():
+    spin = {'states': ['q', 'p', 'yes'], 'start': 'q', 'accept': ['yes'], 'reject': [], 'blank': '_',
+            'transitions': {'q': {'_': [['_', 'N', 'q'], ['_', 'N', 'p']]}, 'p': {'_': ['_', 'N', 'q']}}}
+    assert compile_machine(spin).run('', max_steps=1000)['result'] == REJECT
+    spin['transitions']['p'] = {'_': [['_', 'N', 'q'], ['_', 'R', 'yes']]}
+    assert compile_machine(spin).run('', max_steps=1000)['result'] == ACCEPT
+
+
+def test_single_alternatives_are_deterministic():
+    nested = {**EVEN_ONES, 'transitions': {state: {sym: [rule] for sym, rule in row.items()}
+                                           for state, row in EVEN_ONES['transitions'].items()}}
+    tm = compile_machine(nested)
+    assert tm.deterministic
+    for text in corpus(5):
+        assert tm.run(text) == compile_machine(EVEN_ONES).run(text)
+
+
+@pytest.mark.parametrize('text, verdict', [('1101', ACCEPT), ('110', REJECT), ('', REJECT)])
+def test_run_route(client, text, verdict):
+    response = client.post('/run', json={'machine': ENDS_01, 'input': text})
+    assert response.status_code == 200
+    assert response.get_json()['result'] == verdict
@@ -0,0 +1,84 @@
+import gzip
+
+import pytest
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def get(client, path, **headers):
+    return client.get(path, headers=headers)
+
+
+@pytest.mark.parametrize('path', ['/', '/machines', '/machines?limit=2'])
+def test_identity_and_gzip_variants(client, path):
+    plain = get(client, path, **{'Accept-Encoding': 'identity'})
+    assert plain.status_code == 200
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    zipped = get(client, path, **{'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert zipped.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(zipped.get_data()) == plain.get_data()
+    # Cada codificación tiene su propio ETag fuerte
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+    assert not zipped.headers['ETag'].startswith('W/')
+
+
+@pytest.mark.parametrize('path', ['/', '/machines', '/machines?limit=2'])
+def test_negotiation_respects_quality(client, path):
+    assert 'Content-Encoding' not in get(client, path, **{'Accept-Encoding': 'gzip;q=0'}).headers
+    assert 'Content-Encoding' not in get(client, path).headers
+    if brotli is not None:
+        response = get(client, path, **{'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == 'br'
+        assert brotli.decompress(response.get_data()) == get(client, path).get_data()
+    else:
+        assert get(client, path, **{'Accept-Encoding': 'gzip, br'}).headers['Content-Encoding'] == 'gzip'
+
+
+@pytest.mark.parametrize('path', ['/', '/machines', '/machines?limit=2'])
+def test_if_none_match(client, path):
+    for encoding in ('identity', 'gzip'):
+        first = get(client, path, **{'Accept-Encoding': encoding})
+        etag = first.headers['ETag']
+        again = get(client, path, **{'Accept-Encoding': encoding, 'If-None-Match': etag})
+        assert again.status_code == 304
+        assert again.get_data() == b''
+        assert again.headers['ETag'] == etag
+        assert again.headers['Vary'] == 'Accept-Encoding'
+    # El ETag de otra codificación no valida esta representación
+    gzip_etag = get(client, path, **{'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert get(client, path, **{'Accept-Encoding': 'identity', 'If-None-Match': gzip_etag}).status_code == 200
+    assert get(client, path, **{'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_index_is_not_cached_without_revalidation(client):
+    response = get(client, '/')
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.mimetype == 'text/html'
+    assert 'Last-Modified' in response.headers
+
+
+def test_catalog_etag_changes_with_the_store(client, persistent_store):
+    from conftest import EVEN_ONES
+    before = get(client, '/machines?limit=500')
+    assert before.headers['Cache-Control'] == 'public, max-age=60'
+    assert before.mimetype == 'application/json'
+    body = {'key': 'zz_etag_test', 'name': 'n', 'description': 'd', 'examples': [], 'alphabet': ['0', '1'],
+            'machine': EVEN_ONES}
+    assert client.post('/machines', json=body).status_code == 201
+    after = get(client, '/machines?limit=500', **{'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != before.headers['ETag']
+    assert 'zz_etag_test' in [m['key'] for m in after.get_json()['machines']]
+
+
+def test_machine_detail_is_conditional(client):
+    first = get(client, '/machines/anbn')
+    assert first.status_code == 200
+    again = get(client, '/machines/anbn', **{'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
@@ -0,0 +1,55 @@
+import pytest
+
+from engine import BUDGET_EXCEEDED, compile_machine
+from test_engine import BLINKER, WRITER
+
+
+def single_tape(library):
+    for key, entry in library.items():
+        tm = compile_machine(entry['machine'])
+        if tm.tapes == 1 and tm.deterministic:
+            yield key, tm, entry
+
+
+@pytest.mark.parametrize('max_steps', [10 ** 6, 7])
+def test_counters_add_up_to_steps(library, max_steps):
+    for key, tm, entry in single_tape(library):
+        for text in [*entry['examples'], entry['alphabet'][0] * 5]:
+            profile = tm.profile(text, max_steps=max_steps)
+            steps = profile['steps']
+            assert sum(t['count'] for t in profile['transitions']) == steps, (key, text)
+            assert sum(s['steps'] for s in profile['states'].values()) == steps
+            assert profile['travel'] == sum(s['travel'] for s in profile['states'].values())
+            if steps:
+                assert sum(t['share'] for t in profile['transitions']) == pytest.approx(1)
+                assert max(v for row in profile['heatmap'].values() for v in row.values()) == 1
+
+
+def test_result_matches_run(library):
+    for key, tm, entry in single_tape(library):
+        for text in entry['examples']:
+            profile = tm.profile(text)
+            assert {k: profile[k] for k in tm.run(text)} == tm.run(text), (key, text)
+
+
+def test_rejection_without_rule(even_ones):
+    profile = even_ones.profile('1x')
+    assert profile['result'] == 'REJECT'
+    assert profile['steps'] == 1
+    assert profile['transitions'] == [{'state': 'even', 'symbol': '1', 'count': 1, 'share': 1.0}]
+
+
+def test_route(client):
+    response = client.post('/profile', json={'key': 'anbn', 'input': 'aabb'})
+    profile = response.get_json()
+    assert response.status_code == 200
+    assert sum(t['count'] for t in profile['transitions']) == profile['steps']
+
+
+def test_cell_and_time_budgets():
+    profile = compile_machine(WRITER).profile('', max_steps=10 ** 9, max_cells=1000)
+    assert (profile['result'], profile['budget']) == (BUDGET_EXCEEDED, 'tape')
+    assert sum(t['count'] for t in profile['transitions']) == profile['steps']
+    profile = compile_machine(BLINKER).profile('', max_steps=10 ** 12, max_seconds=0.05)
+    assert (profile['result'], profile['budget']) == (BUDGET_EXCEEDED, 'time')
+    assert sum(t['count'] for t in profile['transitions']) == profile['steps']
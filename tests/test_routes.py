@@ -0,0 +1,171 @@
+import pytest
+
+from conftest import EVEN_ONES
+
+
+@pytest.mark.parametrize('body', [{'inputs': 5}, {'inputs': 'ab'}, {'inputs': [1, 2]}, {'inputs': None}, [1, 2]])
+def test_batch_rejects_malformed_inputs(client, body):
+    response = client.post('/machines/anbn/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_batch_rejects_too_many_inputs(client, monkeypatch):
+    import app
+    monkeypatch.setattr(app, 'BATCH_MAX_INPUTS', 3)
+    response = client.post('/machines/anbn/batch', data='a\nb\nab\nba\n', content_type='text/plain')
+    assert response.status_code == 400
+
+
+def test_batch_adhoc(client):
+    response = client.post('/batch', json={'machine': EVEN_ONES, 'inputs': ['11', '1', '2']})
+    assert [r['result'] for r in response.get_json()['results']] == ['ACCEPT', 'REJECT', 'REJECT']
+
+
+@pytest.mark.parametrize('field', ['max_steps', 'max_cells', 'priority'])
+@pytest.mark.parametrize('value', ['many', None, [1]])
+def test_jobs_rejects_malformed_limits(client, field, value):
+    response = client.post('/jobs', json={'key': 'anbn', 'input': 'ab', field: value})
+    assert response.status_code == 400
+
+
+def test_jobs_caps_limits(client):
+    import app
+    response = client.post('/jobs', json={'key': 'anbn', 'input': 'ab', 'max_steps': 10 ** 15, 'max_cells': 10 ** 15})
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['max_steps'] == app.JOB_MAX_STEPS
+    assert job['max_cells'] == app.JOB_MAX_CELLS
+
+
+class RecordingQueue:
+    """Cola falsa que guarda los argumentos de ``submit`` en vez de ejecutar"""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, tm, text, max_steps, **kwargs):
+        from jobs import Job
+        self.calls.append(kwargs)
+        return Job(tm, text, max_steps, kwargs['client'], kwargs['priority'], job_id='fake')
+
+
+@pytest.mark.parametrize('priority, expected', [(None, 10), (0, 10), (-5, 10), (50, 50)])
+def test_jobs_client_is_the_address_and_priority_only_goes_down(client, monkeypatch, priority, expected):
+    import app
+    queue = RecordingQueue()
+    monkeypatch.setattr(app, '_job_queue', queue)
+    body = {'key': 'anbn', 'input': 'ab', **({'priority': priority} if priority is not None else {})}
+    for address, spoofed in [('10.0.0.1', 'a'), ('10.0.0.1', 'b'), ('10.0.0.2', 'a')]:
+        response = client.post('/jobs', json=body, headers={'X-Client-Id': spoofed},
+                               environ_base={'REMOTE_ADDR': address})
+        assert response.status_code == 202
+    assert [call['client'] for call in queue.calls] == ['10.0.0.1', '10.0.0.1', '10.0.0.2']
+    assert {call['priority'] for call in queue.calls} == {expected}
+
+
+@pytest.mark.parametrize('route', ['/machines/anbn/batch', '/batch'])
+@pytest.mark.parametrize('query', ['max_seconds=0', 'max_seconds=nan', 'max_seconds=soon', 'max_cells=lots'])
+def test_batch_rejects_malformed_budgets(client, route, query):
+    response = client.post(f'{route}?{query}', json={'machine': EVEN_ONES, 'inputs': ['1']})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('query', ['head=100000000000', 'head=-65', 'head=68', 'head=x',
+                                   'rate=0', 'rate=-5', 'rate=nan', 'rate=inf', 'rate=fast',
+                                   'state=nowhere'])
+def test_stream_rejects_malformed_parameters(client, query):
+    response = client.get(f'/stream?key=anbn&tape=["a","b","a","b"]&{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('head', [-64, 0, 3, 67])
+def test_stream_runs_to_completion(client, head):
+    response = client.get(f'/stream?key=anbn&tape=["a","b","a","b"]&head={head}&rate=100000')
+    assert response.status_code == 200
+    assert 'event: done' in response.get_data(as_text=True)
+
+
+def test_job_queue_created_once(monkeypatch):
+    import threading
+    import time
+
+    import app
+    created = []
+
+    def slow_queue(**kwargs):
+        time.sleep(0.01)
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setattr(app, '_job_queue', None)
+    monkeypatch.setattr(app, 'JobQueue', slow_queue)
+    queues = []
+    threads = [threading.Thread(target=lambda: queues.append(app.get_job_queue())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(queue is created[0] for queue in queues)
+
+
+@pytest.mark.parametrize('route, body', [
+    ('/run', {'key': 'anbn', 'max_steps': None}),
+    ('/run', {'key': 'anbn', 'max_cells': [1]}),
+    ('/run', {'key': 'anbn', 'max_seconds': None}),
+    ('/run', [1, 2]),
+    ('/profile', {'key': 'anbn', 'max_steps': None}),
+    ('/trace', {'key': 'anbn', 'every': None}),
+    ('/runs', {'key': 'anbn', 'max_steps': {}}),
+    ('/jobs', [1, 2]),
+    ('/validate', [1, 2]),
+    ('/machines', [1, 2]),
+    ('/batch', [1, 2]),
+    ('/language', {'machine': EVEN_ONES, 'alphabet': 5}),
+    ('/language', {'machine': EVEN_ONES, 'alphabet': ['0', '1'], 'max_length': None}),
+    ('/machines/anbn/language', [1, 2]),
+    ('/machines/anbn/verify', {'seed': None}),
+    ('/equivalence', {'a': 'anbn', 'b': 'anbn', 'slowdown': None}),
+    ('/equivalence', {'a': 'anbn', 'b': 'anbn', 'slowdown': 'Infinity'}),
+    ('/equivalence', {'a': 'anbn', 'b': 'anbn', 'inputs': 5}),
+    ('/equivalence', {'a': 'anbn', 'b': 'anbn', 'alphabet': 5}),
+])
+def test_malformed_parameters_are_400(client, route, body, request):
+    if route == '/machines':
+        # Sin almacén persistente la ruta responde 503 antes de mirar el cuerpo
+        request.getfixturevalue('persistent_store')
+    response = client.post(route, json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('mode', ['rle', 'accelerate', 'codegen'])
+def test_run_detects_loops_in_fast_modes(client, mode):
+    from test_engine import PING_PONG
+    response = client.post('/run', json={'machine': PING_PONG, mode: True})
+    assert response.get_json()['result'] == 'LOOP'
+    # Sin detección de ciclos el modo pedido corre hasta agotar un presupuesto
+    response = client.post('/run', json={'machine': PING_PONG, mode: True, 'detect_loops': False,
+                                         'max_steps': 1000})
+    assert response.get_json()['result'] == 'BUDGET_EXCEEDED'
+
+
+@pytest.mark.parametrize('route', ['/profile', '/runs'])
+def test_cell_budget_on_single_runs(client, route):
+    from test_engine import WRITER
+    response = client.post(route, json={'machine': WRITER, 'max_cells': 1000})
+    assert response.status_code in (200, 201)
+    assert response.get_json()['budget'] == 'tape'
+
+
+def test_history_stops_at_cell_budget():
+    from engine import compile_machine
+    from history import RunHistory
+    from test_engine import BLINKER, WRITER
+    history = RunHistory(compile_machine(WRITER), '', 10 ** 9, max_cells=1000)
+    assert history.result['budget'] == 'tape'
+    assert history.at(history.steps).steps == history.steps
+    history = RunHistory(compile_machine(BLINKER), '', 10 ** 12, max_seconds=0.05)
+    assert history.result['budget'] == 'time'
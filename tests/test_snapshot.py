@@ -0,0 +1,91 @@
+import base64
+import zlib
+
+import pytest
+
+from conftest import EVEN_ONES
+from engine import HALT_ACCEPT, HALT_REJECT, RUNNING, compile_machine
+from history import RunHistory
+from snapshot import _HEADER, MAGIC, VERSION, dump_snapshot, load_snapshot
+
+
+def single_tape(library):
+    for key, entry in library.items():
+        tm = compile_machine(entry['machine'])
+        if tm.tapes == 1 and tm.deterministic:
+            yield key, tm, entry['examples'][0]
+
+
+def test_round_trip_resumes_the_same_run(library):
+    for key, tm, text in single_tape(library):
+        expected = tm.run(text, max_steps=10_000)
+        for pause in (0, 1, 7, expected['steps']):
+            config = tm.advance(tm.initial_config(text), pause)
+            resumed = load_snapshot(tm, dump_snapshot(tm, config))
+            assert tm.result(tm.advance(resumed, 10_000 - pause)) == expected, (key, pause)
+
+
+def test_history_matches_direct_execution(library):
+    for key, tm, text in single_tape(library):
+        history = RunHistory(tm, text, 10_000, every=4)
+        # En orden, al revés y salteado, para pasar por el cursor y por los puntos de control
+        order = list(range(history.steps + 1))
+        for n in order + order[::-1] + order[::3]:
+            view = history.view(n)
+            direct = tm.result(tm.advance(tm.initial_config(text), n))
+            for field in ('result', 'step', 'budget'):
+                view.pop(field, None)
+                direct.pop(field, None)
+            assert view == direct, (key, n)
+
+
+def header(tm, state=0, halt=RUNNING, steps=0, head=0, first=0, version=VERSION):
+    return _HEADER.pack(MAGIC, version, bytes.fromhex(tm.hash), state, halt, steps, head, first)
+
+
+def malformed(tm):
+    cells = zlib.compress(bytes([1, 1]))
+    return {
+        'magic': b'XXXX' + header(tm)[4:] + cells,
+        'short': header(tm)[:20],
+        'version': header(tm, version=VERSION + 1) + cells,
+        'zlib': header(tm) + b'not zlib',
+        'truncated': header(tm) + cells[:-3],
+        'trailing': header(tm) + cells + b'extra',
+        'bomb': header(tm) + zlib.compress(bytes(2000)),
+        'state': header(tm, state=len(tm.states)) + cells,
+        'symbol': header(tm) + zlib.compress(bytes([tm.nsym])),
+        'halt': header(tm, halt=7) + cells,
+        'accepting halt': header(tm, halt=HALT_ACCEPT) + cells,
+        'head': header(tm, head=1 << 40) + cells,
+        'first': header(tm, first=-(1 << 40)) + cells,
+    }
+
+
+@pytest.mark.parametrize('case', ['magic', 'short', 'version', 'zlib', 'truncated', 'trailing', 'bomb', 'state',
+                                  'symbol', 'halt', 'accepting halt', 'head', 'first'])
+def test_rejects_malformed(even_ones, case):
+    with pytest.raises(ValueError):
+        load_snapshot(even_ones, malformed(even_ones)[case], max_cells=1000)
+
+
+def test_rejects_other_machine(even_ones, library):
+    other = compile_machine(library['anbn']['machine'])
+    with pytest.raises(ValueError):
+        load_snapshot(other, dump_snapshot(even_ones, even_ones.initial_config('11')))
+
+
+def test_rejecting_halt_without_rule(even_ones):
+    config = even_ones.initial_config('12')
+    even_ones.advance(config, 100)
+    assert config.halt == HALT_REJECT
+    assert load_snapshot(even_ones, dump_snapshot(even_ones, config)).halt == HALT_REJECT
+
+
+@pytest.mark.parametrize('case', ['bomb', 'head', 'halt', 'trailing'])
+def test_jobs_rejects_malformed_snapshot(client, even_ones, case):
+    blob = malformed(even_ones)[case]
+    if case == 'bomb':
+        blob = header(even_ones) + zlib.compress(bytes((1 << 26) + 1))
+    response = client.post('/jobs', json={'machine': EVEN_ONES, 'snapshot': base64.b64encode(blob).decode()})
+    assert response.status_code == 400
@@ -0,0 +1,84 @@
+import pytest
+
+from conftest import EVEN_ONES
+from store import DuplicateKey, MachineStore
+
+
+def entry(name='Unos pares', alphabet=('0', '1')):
+    return {'name': name, 'description': 'Cantidad par de 1', 'examples': ['11'],
+            'alphabet': list(alphabet), 'machine': EVEN_ONES}
+
+
+@pytest.fixture
+def store():
+    store = MachineStore()
+    for i in range(23):
+        store.put(f'm{i:02d}', entry(alphabet='01' if i % 2 else 'ab'), f'hash{i}',
+                  author='ana' if i % 3 == 0 else None)
+    return store
+
+
+def walk(store, limit, **filters):
+    keys, after = [], None
+    while True:
+        page, after = store.page(after, limit, **filters)
+        assert len(page) <= limit
+        keys.extend(m['key'] for m in page)
+        if after is None:
+            return keys
+
+
+@pytest.mark.parametrize('limit', [1, 5, 23, 50])
+def test_pages_cover_every_key_once_in_order(store, limit):
+    assert walk(store, limit) == [f'm{i:02d}' for i in range(23)]
+
+
+def test_pages_filter_by_alphabet_and_author(store):
+    assert walk(store, 4, alphabet='10') == [f'm{i:02d}' for i in range(1, 23, 2)]
+    assert walk(store, 4, author='ana') == [f'm{i:02d}' for i in range(0, 23, 3)]
+    assert walk(store, 4, alphabet='ba', author='ana') == [f'm{i:02d}' for i in range(0, 23, 6)]
+
+
+def test_page_holds_summaries_only(store):
+    page, _ = store.page(limit=1)
+    assert page[0]['name'] == 'Unos pares'
+    assert 'machine' not in page[0]
+
+
+def test_put_without_replace_keeps_existing(store):
+    version = store.version()
+    with pytest.raises(DuplicateKey):
+        store.put('m00', entry(name='Otra'), 'other', author='ana', replace=False)
+    assert store.get('m00')['name'] == 'Unos pares'
+    assert store.version() == version
+
+
+def test_catalog_route_pages(client):
+    keys, after = [], None
+    while True:
+        page = client.get('/machines?limit=2' + (f'&after={after}' if after else '')).get_json()
+        keys.extend(m['key'] for m in page['machines'])
+        after = page['next']
+        if after is None:
+            break
+    assert keys == sorted(keys) and len(keys) == len(set(keys)) >= 2
+
+
+def test_submit_cannot_overwrite(client, persistent_store):
+    body = {'key': 'even_ones_test', **entry(), 'author': 'ana'}
+    assert client.post('/machines', json=body).status_code == 201
+    # Declarar el mismo autor no basta para reemplazarla
+    replaced = client.post('/machines', json={**body, 'name': '<img src=x onerror=alert(1)>'})
+    assert replaced.status_code == 409
+    assert client.get('/machines/even_ones_test').get_json()['name'] == 'Unos pares'
+    assert client.post('/machines', json={**body, 'key': 'anbn'}).status_code == 409
+
+
+def test_submit_requires_a_persistent_store(client, monkeypatch):
+    import app
+    monkeypatch.setattr(app, '_machine_store', None)
+    monkeypatch.delenv('TM_STORE_PATH', raising=False)
+    response = client.post('/machines', json={'key': 'memory_only', **entry()})
+    assert response.status_code == 503
+    assert 'TM_STORE_PATH' in response.get_json()['error']
+    assert client.get('/machines/memory_only').status_code == 404
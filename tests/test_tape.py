@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from tape import RunLengthTape, Tape
+
+
+class Model:
+    """Cinta de referencia: un diccionario posición → símbolo."""
+
+    def __init__(self, cells):
+        self.cells = dict(enumerate(cells))
+        self.pos = 0
+        self.low, self.high = 0, max(len(cells), 1) - 1
+
+    def move(self, d):
+        self.pos += d
+        self.low, self.high = min(self.low, self.pos), max(self.high, self.pos)
+
+    def export(self):
+        return bytes(self.cells.get(i, 0) for i in range(self.low, self.high + 1)), self.low
+
+
+def check(tape, model):
+    assert tape.read() == model.cells.get(model.pos, 0)
+    assert tape.pos == model.pos
+    assert tape.export() == model.export()
+    assert tape.size == len(model.export()[0])
+    # Corridas canónicas: sin corridas vacías ni vecinas con el mismo símbolo
+    assert all(n > 0 for n in tape.lens)
+    assert all(a != b for a, b in zip(tape.syms, tape.syms[1:]))
+    assert sum(tape.lens[:tape.run]) + tape.off == tape.pos - tape.start
+    assert 0 <= tape.off < tape.lens[tape.run]
+
+
+def apply(cells, ops):
+    tape, model = RunLengthTape(bytes(cells)), Model(bytes(cells))
+    check(tape, model)
+    for op, value in ops:
+        if op == 'w':
+            tape.write(value)
+            model.cells[model.pos] = value
+        else:
+            tape.move(value)
+            model.move(value)
+        check(tape, model)
+    return tape
+
+
+def at(offset):
+    return [('m', 1)] * offset
+
+
+@pytest.mark.parametrize('cells, ops, runs', [
+    # Dentro de una corrida: se parte en tres
+    ([1, 1, 1, 1, 1], at(2) + [('w', 2)], [(1, 2), (2, 1), (1, 2)]),
+    # Primera celda de una corrida: se une a la corrida anterior si tiene el mismo símbolo
+    ([2, 1, 1, 1], at(1) + [('w', 2)], [(2, 2), (1, 2)]),
+    ([3, 1, 1, 1], at(1) + [('w', 2)], [(3, 1), (2, 1), (1, 2)]),
+    ([1, 1, 1], [('w', 2)], [(2, 1), (1, 2)]),
+    # Última celda de una corrida: se une a la siguiente si tiene el mismo símbolo
+    ([1, 1, 1, 2], at(2) + [('w', 2)], [(1, 2), (2, 2)]),
+    ([1, 1, 1, 3], at(2) + [('w', 2)], [(1, 2), (2, 1), (3, 1)]),
+    ([1, 1, 1], at(2) + [('w', 2)], [(1, 2), (2, 1)]),
+    # Corrida de una celda entre dos del mismo símbolo: las tres se funden
+    ([2, 2, 1, 2, 2], at(2) + [('w', 2)], [(2, 5)]),
+    ([2, 1, 3], at(1) + [('w', 2)], [(2, 2), (3, 1)]),
+    ([3, 1, 2], at(1) + [('w', 2)], [(3, 1), (2, 2)]),
+    # Escribir el mismo símbolo no cambia nada
+    ([1, 1], [('w', 1)], [(1, 2)]),
+    # Crecer a la izquierda y a la derecha sobre blancos, y escribir en los extremos
+    ([1], [('m', -1), ('m', -1)], [(0, 2), (1, 1)]),
+    ([1], [('m', -1), ('w', 1)], [(1, 2)]),
+    ([0], [('m', -1), ('w', 1)], [(1, 1), (0, 1)]),
+    ([1], [('m', 1), ('m', 1), ('w', 1)], [(1, 1), (0, 1), (1, 1)]),
+    ([1], [('m', 1), ('w', 1)], [(1, 2)]),
+    ([], [('m', 1), ('m', 1), ('m', -1), ('m', -1), ('m', -1)], [(0, 4)]),
+])
+def test_runs(cells, ops, runs):
+    tape = apply(cells, ops)
+    assert list(zip(tape.syms, tape.lens)) == runs
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_operations_match_a_dense_tape(seed):
+    rng = random.Random(seed)
+    cells = [rng.choice([0, 1, 1, 2]) for _ in range(rng.randint(0, 12))]
+    ops = [('w', rng.randrange(3)) if rng.random() < 0.5 else ('m', rng.choice([-1, 1])) for _ in range(400)]
+    apply(cells, ops)
+
+
+def test_dense_tape_grows_both_ways():
+    tape = Tape(bytearray(b'\x01\x02'))
+    head = tape.grow(-3)
+    assert head == 0
+    assert tape.export() == (b'\x00\x00\x00\x01\x02', -3)
+    head = tape.grow(len(tape.cells) + 4)
+    assert head == 9
+    # Crece al menos al doble para que extender sea O(1) amortizado
+    assert len(tape.cells) == 10
+    assert tape.export() == (b'\x00\x00\x00\x01\x02' + bytes(5), -3)
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from engine import BUDGET_EXCEEDED, compile_machine
+from test_engine import BLINKER, WRITER
+
+MOVES = {'L': -1, 'N': 0, 'R': 1}
+
+
+def replay(records, text, blank):
+    """Aplica los cambios de un trazo a la entrada; retorna ``(celdas, cabezal, estado, veredicto)``."""
+    start, *steps, end = records
+    cells = dict(enumerate(text))
+    head, state = start['head'], start['state']
+    for record in steps:
+        cells[record['pos']] = record['write']
+        head, state = record['pos'] + MOVES[record['move']], record['state']
+    return {pos: sym for pos, sym in cells.items() if sym != blank}, head, state, end
+
+
+def expected(tm, text, max_steps):
+    result = tm.run(text, max_steps=max_steps)
+    blank = tm.symbols[0]
+    cells = {result['offset'] + i: sym for i, sym in enumerate(result['tape']) if sym != blank}
+    return cells, result['offset'] + result['head'], result['state'], result
+
+
+def test_replay_reaches_the_final_tape(library):
+    for key, entry in library.items():
+        tm = compile_machine(entry['machine'])
+        if tm.tapes > 1 or not tm.deterministic:
+            continue
+        for text in [*entry['examples'], entry['alphabet'][-1] * 3]:
+            cells, head, state, end = replay(list(tm.trace(text)), text, tm.symbols[0])
+            want_cells, want_head, want_state, result = expected(tm, text, 10 ** 6)
+            assert (cells, head, state) == (want_cells, want_head, want_state), (key, text)
+            assert (end['result'], end['steps']) == (result['result'], result['steps'])
+
+
+def test_every_skips_steps_but_keeps_the_verdict(library):
+    tm = compile_machine(library['anbn']['machine'])
+    full = list(tm.trace('aabb'))
+    sparse = list(tm.trace('aabb', every=3))
+    # El paso que lleva a un estado final se produce siempre
+    last = full[-2]['step']
+    assert [r['step'] for r in sparse[1:-1]] == [r['step'] for r in full[1:-1] if r['step'] % 3 == 0 or r['step'] == last]
+    assert sparse[-1] == full[-1]
+
+
+def test_budget(library):
+    tm = compile_machine(library['anbn']['machine'])
+    assert list(tm.trace('aaabbb', max_steps=5))[-1] == {'result': BUDGET_EXCEEDED, 'steps': 5, 'budget': 'steps'}
+
+
+def test_cell_and_time_budgets(library):
+    writer = compile_machine(WRITER)
+    end = list(writer.trace(max_steps=10 ** 9, max_cells=1000))[-1]
+    assert (end['result'], end['budget']) == (BUDGET_EXCEEDED, 'tape')
+    assert end['steps'] < 1 << 15
+    # El plazo corre mientras el consumidor no pide más registros
+    records = compile_machine(BLINKER).trace(max_steps=10 ** 12, every=10 ** 6, max_seconds=0.05)
+    end = next(record for record in records if 'result' in record)
+    assert (end['result'], end['budget']) == (BUDGET_EXCEEDED, 'time')
+
+
+@pytest.mark.parametrize('text', ['aabb', 'aab', ''])
+def test_route_streams_ndjson(client, library, text):
+    response = client.post('/trace', json={'key': 'anbn', 'input': text})
+    assert response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    tm = compile_machine(library['anbn']['machine'])
+    assert replay(records, text, '_') == replay(list(tm.trace(text)), text, '_')
+    cells, head, state, end = replay(records, text, '_')
+    want_cells, want_head, want_state, result = expected(tm, text, 10 ** 6)
+    assert (cells, head, state, end['result']) == (want_cells, want_head, want_state, result['result'])
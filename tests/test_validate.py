@@ -0,0 +1,86 @@
+import pytest
+
+from conftest import EVEN_ONES
+from engine import compile_machine
+from validate import analyze_definition
+
+
+def with_changes(**changes):
+    return {**EVEN_ONES, **changes}
+
+
+@pytest.mark.parametrize('definition, message', [
+    ([], 'objeto JSON'),
+    (with_changes(tapes=0), "'tapes'"),
+    (with_changes(start=None), "'start'"),
+    (with_changes(blank='__'), 'blanco'),
+    (with_changes(accept='yes'), "'accept'"),
+    (with_changes(reject=['yes']), 'aceptación y de rechazo'),
+    (with_changes(transitions=[]), "'transitions'"),
+    (with_changes(transitions={'even': []}), "'even'"),
+    (with_changes(transitions={'even': {'01': ['0', 'R', 'even']}}), 'lo leído'),
+    (with_changes(transitions={'even': {'0': ['0', 'R']}}), '[escribe, mueve, siguiente]'),
+    (with_changes(transitions={'even': {'0': ['00', 'R', 'even']}}), 'lo escrito'),
+    (with_changes(transitions={'even': {'0': ['0', 'X', 'even']}}), 'movimiento inválido'),
+    (with_changes(transitions={'even': {'0': ['0', 'R', 3]}}), 'estado siguiente'),
+    (with_changes(transitions={'even': {'0': ['0', 'R', 'elsewhere']}}), "'elsewhere' no está declarado"),
+    (with_changes(tapes=2, transitions={'even': {'0_': [['0_', 'RN', 'even'], ['0_', 'NN', 'yes']]}}),
+     'solo se admiten con una cinta'),
+])
+def test_errors(definition, message):
+    report = analyze_definition(definition)
+    assert not report['valid']
+    assert any(message in error for error in report['errors']), report['errors']
+    with pytest.raises(ValueError):
+        compile_machine(definition)
+
+
+@pytest.mark.parametrize('alphabet, message', [(['01'], 'un solo carácter'), (['0', '_'], 'blanco')])
+def test_alphabet_errors(alphabet, message):
+    report = analyze_definition(EVEN_ONES, alphabet)
+    assert any(message in error for error in report['errors'])
+
+
+def test_dead_transitions_and_unreachable_states():
+    definition = {
+        'states': ['even', 'odd', 'yes', 'no', 'island'], 'start': 'even', 'accept': ['yes'], 'reject': ['no'],
+        'blank': '_',
+        'transitions': {
+            **EVEN_ONES['transitions'],
+            'yes': {'_': ['_', 'N', 'no']},
+            'island': {'0': ['0', 'R', 'yes']},
+            'odd': {**EVEN_ONES['transitions']['odd'], 'x': ['x', 'R', 'odd']},
+        },
+    }
+    report = analyze_definition(definition, ['0', '1'])
+    assert report['valid']
+    assert report['unreachable'] == ['island']
+    assert sorted((d['state'], d['symbol'], d['reason']) for d in report['dead_transitions']) == [
+        ('island', '0', 'el estado no es alcanzable'),
+        ('odd', 'x', 'el símbolo nunca aparece en la cinta'),
+        ('yes', '_', 'sale de un estado de parada'),
+    ]
+    assert report['tape_alphabet'] == ['0', '1', '_']
+    assert any('island' in w for w in report['warnings'])
+    # Sin alfabeto de entrada cualquier símbolo leído puede aparecer
+    assert 'x' not in [d['symbol'] for d in analyze_definition(definition)['dead_transitions']]
+
+
+def test_library_is_clean(library):
+    for key, entry in library.items():
+        report = analyze_definition(entry['machine'], entry['alphabet'])
+        assert report['valid'] and not report['errors'], key
+        assert not report['dead_transitions'], key
+
+
+def test_nondeterminism_is_reported():
+    definition = with_changes(transitions={'even': {'0': [['0', 'R', 'even'], ['0', 'R', 'odd']]}})
+    assert analyze_definition(definition)['deterministic'] is False
+    assert analyze_definition(EVEN_ONES)['deterministic'] is True
+
+
+def test_route(client):
+    response = client.post('/validate', json={'machine': with_changes(start=None)})
+    assert response.get_json()['valid'] is False
+    response = client.post('/validate', json={'key': 'anbn'})
+    assert response.get_json()['valid'] is True
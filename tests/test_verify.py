@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from engine import ACCEPT, REJECT, compile_machine
+from equivalence import exhaustive_corpus
+from verify import verify_machine
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_matches_running_each_input(library, workers):
+    for key, entry in library.items():
+        if not entry.get('reference'):
+            continue
+        tm = compile_machine(entry['machine'])
+        report = verify_machine(tm, entry['reference'], entry['alphabet'], max_length=5, random_count=0,
+                                max_steps=100_000, workers=workers)
+        corpus = list(exhaustive_corpus(entry['alphabet'], 5))
+        mismatches = [text for text in corpus
+                      if tm.run(text, max_steps=100_000)['result'] != (ACCEPT if entry['reference'](text) else REJECT)]
+        assert report['checked'] == len(corpus), key
+        assert report['mismatch_count'] == len(mismatches), key
+        assert [m['input'] for m in report['mismatches']] == mismatches[:len(report['mismatches'])], key
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_corpus_generation_stops_at_the_deadline(library, workers):
+    entry = library['anbn']
+    started = time.monotonic()
+    report = verify_machine(compile_machine(entry['machine']), entry['reference'], entry['alphabet'],
+                            max_length=0, random_count=10 ** 9, random_max_length=64, workers=workers,
+                            max_seconds=0.2)
+    assert time.monotonic() - started < 3
+    assert report['budget'] == 'time'
+    assert report['checked'] < 10 ** 9
+
+
+def test_route_clamps_random_length(client, monkeypatch):
+    import app
+    lengths = []
+
+    def fake_verify(*args, random_max_length, **kwargs):
+        lengths.append(random_max_length)
+        return {'ok': True}
+
+    monkeypatch.setattr(app, 'verify_machine', fake_verify)
+    response = client.post('/machines/anbn/verify', json={'random_max_length': 10 ** 9})
+    assert response.status_code == 200
+    assert lengths == [app.RANDOM_MAX_LENGTH]
@@ -0,0 +1,197 @@
+"""Validación y análisis estático de definiciones de máquina.
+
+``compile_machine`` llama a ``analyze_definition`` una sola vez y rechaza la
+definición si tiene errores, así que ninguna ruta ni proceso del pool llega
+a simular una máquina mal formada. Además del diagnóstico se calculan los
+estados alcanzables desde el inicial, las transiciones muertas (que nunca se
+pueden usar) y el alfabeto de cinta efectivo.
+"""
+
+MOVE_LETTERS = ('L', 'R', 'N')
+MAX_TAPES = 8
+# Se reportan a lo sumo estos errores, para no devolver miles si la definición está muy rota
+MAX_ERRORS = 20
+
+
+def _is_symbol(value):
+    return isinstance(value, str) and len(value) == 1
+
+
+def alternatives(rule):
+    """Lista de ``[escribe, mueve, siguiente]`` de una regla.
+
+    Una regla es una sola terna o, en máquinas no deterministas, una lista de
+    ternas alternativas (la lista vacía equivale a no tener regla).
+    """
+    if isinstance(rule, (list, tuple)) and all(isinstance(alt, (list, tuple)) for alt in rule):
+        return list(rule)
+    return [rule]
+
+
+def is_nondeterministic(definition):
+    """Indica si alguna regla de ``definition`` tiene más de una alternativa."""
+    transitions = definition.get('transitions') if isinstance(definition, dict) else None
+    if not isinstance(transitions, dict):
+        return False
+    return any(len(alternatives(rule)) > 1
+               for row in transitions.values() if isinstance(row, dict) for rule in row.values())
+
+
+def analyze_definition(definition, alphabet=None):
+    """Valida ``definition`` y retorna el diagnóstico.
+
+    Con ``alphabet`` (símbolos de entrada) el alfabeto de cinta es el
+    conjunto de símbolos que realmente pueden aparecer partiendo de una
+    entrada sobre él; sin él se supone que cualquier símbolo leído puede
+    aparecer.
+    """
+    errors = []
+    warnings = []
+    report = {'valid': False, 'errors': errors, 'warnings': warnings}
+    if not isinstance(definition, dict):
+        errors.append('La definición debe ser un objeto JSON')
+        return report
+
+    k = definition.get('tapes', 1)
+    if not isinstance(k, int) or isinstance(k, bool) or not 1 <= k <= MAX_TAPES:
+        errors.append(f"'tapes' debe ser un entero entre 1 y {MAX_TAPES}")
+        return report
+    # Con k cintas lo que se lee, escribe y mueve son palabras de k caracteres
+    word = 'un solo carácter' if k == 1 else f'una palabra de {k} símbolos'
+
+    def is_word(value):
+        return isinstance(value, str) and len(value) == k
+
+    start = definition.get('start')
+    if not isinstance(start, str):
+        errors.append("Falta el estado inicial 'start'")
+    blank = definition.get('blank', '_')
+    if not _is_symbol(blank):
+        errors.append(f"El blanco debe ser un solo carácter, no {blank!r}")
+
+    halting = {}
+    for field in ('accept', 'reject'):
+        names = definition.get(field, [])
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            errors.append(f"'{field}' debe ser una lista de estados")
+            continue
+        for name in names:
+            if halting.get(name, field) != field:
+                errors.append(f"El estado '{name}' es de aceptación y de rechazo a la vez")
+            halting[name] = field
+
+    transitions = definition.get('transitions', {})
+    rules = {}
+    deterministic = True
+    if not isinstance(transitions, dict):
+        errors.append("'transitions' debe ser un objeto {estado: {símbolo: [escribe, mueve, siguiente]}}")
+        transitions = {}
+    for state, row in transitions.items():
+        if not isinstance(row, dict):
+            errors.append(f"Las transiciones de '{state}' deben ser un objeto {{símbolo: regla}}")
+            continue
+        for sym, rule in row.items():
+            where = f'δ({state}, {sym})'
+            if not is_word(sym):
+                errors.append(f'{where}: lo leído debe ser {word}')
+            options = alternatives(rule)
+            if len(options) > 1:
+                deterministic = False
+                if k > 1:
+                    errors.append(f'{where}: las alternativas no deterministas solo se admiten con una cinta')
+            for alt in options:
+                if not isinstance(alt, (list, tuple)) or len(alt) != 3:
+                    errors.append(f'{where}: la regla debe ser [escribe, mueve, siguiente] o una lista de ellas')
+                    continue
+                write, move, nxt = alt
+                if not is_word(write):
+                    errors.append(f'{where}: lo escrito {write!r} debe ser {word}')
+                if not is_word(move) or any(m not in MOVE_LETTERS for m in move):
+                    errors.append(f"{where}: movimiento inválido {move!r} (debe ser {word} entre L, R y N)")
+                if not isinstance(nxt, str):
+                    errors.append(f'{where}: el estado siguiente debe ser un nombre de estado')
+                    continue
+                rules.setdefault(state, {}).setdefault(sym, []).append((write, move, nxt))
+
+    referenced = {start, *halting, *transitions, *(n for row in rules.values() for alts in row.values()
+                                                    for _, _, n in alts)}
+    referenced.discard(None)
+    declared = definition.get('states')
+    if declared is not None:
+        if not isinstance(declared, list):
+            errors.append("'states' debe ser una lista de estados")
+        else:
+            for name in sorted(referenced - set(declared), key=str):
+                errors.append(f"El estado '{name}' no está declarado en 'states'")
+            referenced.update(declared)
+
+    if alphabet is not None:
+        for sym in alphabet:
+            if not _is_symbol(sym):
+                errors.append(f'El símbolo de entrada {sym!r} debe ser un solo carácter')
+            elif sym == blank:
+                errors.append('El blanco no puede ser parte del alfabeto de entrada')
+    if errors:
+        del errors[MAX_ERRORS:]
+        return report
+
+    # Punto fijo: un estado es alcanzable si alguna transición usable llega a él, y una
+    # transición es usable si su estado es alcanzable y su símbolo puede estar en la cinta
+    if alphabet is not None:
+        tape_alphabet = {blank, *alphabet}
+    else:
+        tape_alphabet = {blank, *(s for row in rules.values() for r in row for s in r),
+                         *(s for row in rules.values() for alts in row.values() for w, _, _ in alts for s in w)}
+    reachable = {start}
+    changed = True
+    while changed:
+        changed = False
+        for state in list(reachable):
+            if state in halting:
+                continue
+            for sym, alts in rules.get(state, {}).items():
+                if not tape_alphabet.issuperset(sym):
+                    continue
+                for write, _, nxt in alts:
+                    if not (tape_alphabet.issuperset(write) and nxt in reachable):
+                        tape_alphabet.update(write)
+                        reachable.add(nxt)
+                        changed = True
+
+    dead = []
+    for state, row in rules.items():
+        for sym in row:
+            if state in halting:
+                reason = 'sale de un estado de parada'
+            elif state not in reachable:
+                reason = 'el estado no es alcanzable'
+            elif not tape_alphabet.issuperset(sym):
+                reason = 'el símbolo nunca aparece en la cinta'
+            else:
+                continue
+            dead.append({'state': state, 'symbol': sym, 'reason': reason})
+
+    unreachable = sorted(referenced - reachable)
+    accept = sorted(n for n, f in halting.items() if f == 'accept')
+    if not accept:
+        warnings.append('La máquina no tiene estados de aceptación')
+    if start in halting:
+        warnings.append('El estado inicial es de parada: la máquina se detiene sin leer la entrada')
+    if unreachable:
+        warnings.append(f"Estados inalcanzables: {', '.join(unreachable)}")
+    for d in dead:
+        warnings.append(f"Transición muerta δ({d['state']}, {d['symbol']}): {d['reason']}")
+
+    report.update({
+        'valid': True,
+        'tapes': k,
+        'deterministic': deterministic,
+        'states': sorted(referenced),
+        'reachable': sorted(reachable),
+        'unreachable': unreachable,
+        'accept': accept,
+        'reject': sorted(n for n, f in halting.items() if f == 'reject'),
+        'tape_alphabet': sorted(tape_alphabet),
+        'dead_transitions': dead,
+    })
+    return report
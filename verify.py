@@ -0,0 +1,125 @@
+"""Verificación de máquinas contra su predicado de referencia.
+
+Cada entrada de ``MACHINE_LIBRARY`` puede tener ``'reference'``: una función
+de Python que decide el mismo lenguaje. La verificación ejecuta la máquina
+compilada y el predicado sobre un corpus exhaustivo (todas las cadenas
+hasta una longitud) más uno aleatorio con cadenas más largas, repartidos en
+el pool de procesos de ``batch``, y reporta discrepancias y rendimiento.
+
+Uso como script (sin claves verifica todo el catálogo)::
+
+    python verify.py
+    python verify.py anbn ww --max-length 14 --random 200000
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from batch import get_pool, run_verdicts
+from engine import ACCEPT, REJECT
+from equivalence import CHUNK_SIZE, exhaustive_corpus, random_corpus
+
+DEFAULT_MAX_STEPS = 1_000_000
+# Cuántas discrepancias se reportan como ejemplo
+MAX_MISMATCHES = 20
+
+
+def _verify_chunk(tm, predicate, inputs, max_steps, max_cells=None, deadline=None):
+    report = {'checked': 0, 'steps': 0, 'undecided': 0, 'mismatch_count': 0, 'mismatches': []}
+    for text, (result, steps) in zip(inputs, run_verdicts(tm, inputs, max_steps, max_cells, deadline)):
+        report['checked'] += 1
+        report['steps'] += steps
+        if result not in (ACCEPT, REJECT):
+            report['undecided'] += 1
+            continue
+        expected = ACCEPT if predicate(text) else REJECT
+        if result != expected:
+            report['mismatch_count'] += 1
+            if len(report['mismatches']) < MAX_MISMATCHES:
+                report['mismatches'].append({'input': text, 'expected': expected,
+                                             'result': result, 'steps': steps})
+    return report
+
+
+def verify_machine(tm, predicate, alphabet, max_length=10, random_count=10_000, random_max_length=64,
+                   seed=0, max_steps=DEFAULT_MAX_STEPS, workers=None, max_cells=None, max_seconds=None):
+    """Compara ``tm`` con ``predicate`` y retorna discrepancias, pasos y cadenas por segundo.
+
+    ``max_cells`` limita la cinta de cada entrada y ``max_seconds`` toda la
+    verificación; las entradas que no terminan a tiempo cuentan como
+    indecisas, al vencer el plazo no se generan más bloques del corpus y el
+    reporte agrega ``'budget': 'time'``.
+    """
+    started = time.perf_counter()
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    alphabet = list(alphabet)
+    corpus = itertools.chain(exhaustive_corpus(alphabet, max_length),
+                             random_corpus(alphabet, random_count, random_max_length, seed))
+    workers = workers or os.cpu_count() or 1
+    pool = get_pool() if workers > 1 else None
+
+    total = {'checked': 0, 'steps': 0, 'undecided': 0, 'mismatch_count': 0, 'mismatches': []}
+    pending = deque()
+    in_flight = workers * 4 if pool is not None else 1
+    while True:
+        # Como en ``check_equivalence``: bloques acotados en vuelo y ninguno nuevo después del plazo
+        while len(pending) < in_flight and (deadline is None or time.monotonic() <= deadline):
+            chunk = list(itertools.islice(corpus, CHUNK_SIZE))
+            if not chunk:
+                break
+            if pool is None:
+                pending.append(_verify_chunk(tm, predicate, chunk, max_steps, max_cells, deadline))
+            else:
+                pending.append(pool.submit(_verify_chunk, tm, predicate, chunk, max_steps, max_cells, deadline))
+        if not pending:
+            break
+        item = pending.popleft()
+        report = item if pool is None else item.result()
+        for key in ('checked', 'steps', 'undecided', 'mismatch_count'):
+            total[key] += report[key]
+        total['mismatches'].extend(report['mismatches'][:MAX_MISMATCHES - len(total['mismatches'])])
+
+    elapsed = time.perf_counter() - started
+    return {
+        'ok': total['mismatch_count'] == 0,
+        **total,
+        'seconds': elapsed,
+        'inputs_per_second': total['checked'] / elapsed if elapsed else None,
+        'steps_per_second': total['steps'] / elapsed if elapsed else None,
+        **({'budget': 'time'} if deadline is not None and time.monotonic() > deadline else {}),
+    }
+
+
+def main(argv=None):
+    from app import MACHINE_LIBRARY, get_compiled
+
+    parser = argparse.ArgumentParser(description='Verifica máquinas de la biblioteca contra su predicado de referencia')
+    parser.add_argument('keys', nargs='*', help='claves a verificar (por defecto, todas las que tienen referencia)')
+    parser.add_argument('--max-length', type=int, default=10)
+    parser.add_argument('--random', type=int, default=10_000, help='cantidad de cadenas aleatorias')
+    parser.add_argument('--random-max-length', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-steps', type=int, default=DEFAULT_MAX_STEPS)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    keys = args.keys or [key for key, entry in MACHINE_LIBRARY.items() if entry.get('reference')]
+    results = {}
+    for key in keys:
+        entry = MACHINE_LIBRARY[key]
+        results[key] = verify_machine(get_compiled(key), entry['reference'], entry['alphabet'],
+                                      max_length=args.max_length, random_count=args.random,
+                                      random_max_length=args.random_max_length, seed=args.seed,
+                                      max_steps=args.max_steps, workers=args.workers)
+    json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    sys.exit(0 if all(r['ok'] for r in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()